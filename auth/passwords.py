@@ -0,0 +1,139 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Password hashing.
+
+bcrypt is deliberately slow, tens to hundreds of milliseconds of CPU per hash or verify, so it
+never runs on the event loop or the DB threads: every call goes to a process pool sized to the
+cores, where it neither blocks other requests nor holds the GIL.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, Optional, Tuple
+import asyncio
+import hmac
+import os
+
+from passlib.context import CryptContext
+
+# Hashes made with a deprecated scheme or cost are replaced on the next successful login.
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+HASH_WORKERS = int(os.environ.get("SONZO_HASH_WORKERS", "0")) or os.cpu_count()
+
+# Verified against when the username doesn't exist, so a miss takes as long as a wrong password.
+_DUMMY_HASH = "$2b$12$Yc79DUMo/MbueUkXfA3Nse5KLmyAhfwdwEf1LYBwnU5TougUQtQ6."
+
+
+def is_hashed(stored: str) -> bool:
+    """
+    Tell a password hash from a legacy plain text password.
+
+    :param stored: The stored password column.
+    :return: True if it is a hash this context can verify.
+    """
+    return pwd_context.identify(stored, required=False) is not None
+
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def verify_password(password: str, stored: str) -> Tuple[bool, Optional[str]]:
+    """
+    Check a password, upgrading the stored value if it needs it.
+
+    Runs in the worker processes.
+
+    :param password: The password given at login.
+    :param stored: The stored password column, a hash or legacy plain text.
+    :return: Whether it matched, and a new hash to store if the match was against plain text
+             or an outdated hash.
+    """
+    if not is_hashed(stored):
+        matched = hmac.compare_digest(password.encode(), stored.encode())
+        return matched, pwd_context.hash(password) if matched else None
+    return pwd_context.verify_and_update(password, stored)
+
+
+class PasswordHasher:
+    """
+    Hashes and verifies passwords on a process pool created on first use.
+    """
+
+    def __init__(self, workers: int = HASH_WORKERS):
+        self.workers = workers
+        self.hashes = 0
+        self.verifies = 0
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    async def hash(self, password: str) -> str:
+        """
+        Hash a password for storage.
+
+        :param password: The plain text password.
+        :return: The hash.
+        """
+        self.hashes += 1
+        return await asyncio.get_running_loop().run_in_executor(self._get_pool(), hash_password, password)
+
+    async def verify(self, password: Optional[str], stored: Optional[str]) -> Tuple[bool, Optional[str]]:
+        """
+        Check a password against a stored hash or legacy plain text password.
+
+        Pass stored=None for an unknown user; the dummy verify keeps its timing the same.
+
+        :param password: The password given at login.
+        :param stored: The stored password column, or None.
+        :return: Whether it matched, and a replacement hash to store if one is needed.
+        """
+        self.verifies += 1
+        matched, new_hash = await asyncio.get_running_loop().run_in_executor(
+            self._get_pool(), verify_password, password or "", stored or _DUMMY_HASH)
+        return (matched, new_hash) if stored else (False, None)
+
+    def hash_many(self, passwords: Iterable[str]) -> List[str]:
+        """
+        Hash passwords in bulk from a worker thread, spread over every process.
+
+        :param passwords: Plain text passwords.
+        :return: Their hashes, in order.
+        """
+        passwords = list(passwords)
+        self.hashes += len(passwords)
+        chunksize = max(1, len(passwords) // (self.workers * 4))
+        return list(self._get_pool().map(hash_password, passwords, chunksize=chunksize))
+
+    def close(self) -> None:
+        """
+        Shut down the hashing process pool.
+
+        :return:
+        """
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+
+password_hasher = PasswordHasher()
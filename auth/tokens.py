@@ -0,0 +1,178 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Access tokens.
+
+Tokens are HS256 JWTs.  Decoded and validated claims are kept in a bounded TTL cache keyed by
+the token, so an authenticated request only checks a signature the first time a token is seen.
+An entry never outlives its token's own expiry.
+"""
+
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from threading import Lock
+from typing import Optional, Tuple
+import os
+import secrets
+import time
+
+from jose import jwt, JWTError
+
+# Without SONZO_SECRET_KEY, a random key is generated once and kept in this file, outside the repo.
+SECRET_KEY_FILE = os.environ.get("SONZO_SECRET_KEY_FILE", os.path.join(os.path.expanduser("~"), ".sonzo_secret_key"))
+ALGORITHM = "HS256"
+ACCESS_TOKEN_EXPIRE_MINUTES = 30
+
+
+def load_secret_key(path: str = SECRET_KEY_FILE) -> str:
+    """
+    Read the token signing key from a file, creating it with a fresh random key on first use.
+
+    The file is written whole under a temporary name and linked into place, so workers starting
+    together all end up with the key of whichever linked first.
+
+    :param path: The key file.
+    :return: The key, as hex.
+    """
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        descriptor = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(descriptor, "w") as file:
+            file.write(secrets.token_hex(32))
+        try:
+            os.link(temporary, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(temporary)
+    with open(path) as file:
+        return file.read().strip()
+
+
+SECRET_KEY = os.environ.get("SONZO_SECRET_KEY") or load_secret_key()
+
+CLAIMS_CACHE_SIZE = int(os.environ.get("SONZO_CLAIMS_CACHE_SIZE", "10000"))
+CLAIMS_CACHE_TTL = float(os.environ.get("SONZO_CLAIMS_CACHE_TTL", "300"))
+
+
+class ClaimsCache:
+    """
+    A bounded LRU of decoded token claims, each entry expiring after a TTL or with its token.
+    """
+
+    def __init__(self, max_entries: int = CLAIMS_CACHE_SIZE, ttl: float = CLAIMS_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._claims: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, token: str) -> Optional[dict]:
+        """
+        Return the cached claims for a token, or None on a miss or once the entry has expired.
+
+        :param token: The encoded token.
+        :return: The claims if cached.
+        """
+        with self._lock:
+            entry = self._claims.get(token)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._claims[token]
+                self.misses += 1
+                return None
+            self._claims.move_to_end(token)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, token: str, claims: dict) -> None:
+        """
+        Cache validated claims until the TTL or the token's exp, whichever is sooner.
+
+        :param token: The encoded token.
+        :param claims: Its decoded claims.
+        :return:
+        """
+        lifetime = self.ttl
+        if "exp" in claims:
+            lifetime = min(lifetime, claims["exp"] - time.time())
+        if lifetime <= 0:
+            return
+        with self._lock:
+            self._claims[token] = (time.monotonic() + lifetime, claims)
+            self._claims.move_to_end(token)
+            while len(self._claims) > self.max_entries:
+                self._claims.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._claims.clear()
+
+    def stats(self) -> dict:
+        """
+        Return the cache counters.
+
+        :return: A dictionary of counters and the current size.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._claims),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+claims_cache = ClaimsCache()
+
+
+def create_access_token(username: str, player_id: int, expires: Optional[timedelta] = None) -> str:
+    """
+    Issue a signed access token for a player.
+
+    :param username: The player's username, stored as the subject.
+    :param player_id: The player's id.
+    :param expires: Lifetime of the token, ACCESS_TOKEN_EXPIRE_MINUTES by default.
+    :return: The encoded token.
+    """
+    expire = datetime.now(timezone.utc) + (expires or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+    return jwt.encode({"sub": username, "pid": player_id, "exp": expire}, SECRET_KEY, algorithm=ALGORITHM)
+
+
+def decode_access_token(token: str) -> dict:
+    """
+    Return a token's validated claims, from the cache when possible.
+
+    :param token: The encoded token.
+    :return: The claims.
+    :raises JWTError: If the signature is bad, the token has expired or has no subject.
+    """
+    claims = claims_cache.get(token)
+    if claims is None:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        if not claims.get("sub"):
+            raise JWTError("Token has no subject.")
+        claims_cache.put(token, claims)
+    return claims
@@ -0,0 +1,103 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Catalog snapshot benchmark.
+
+Builds a synthetic catalog of --weapons, --armor and --monsters rows, both as model instances
+and as a catalog snapshot, then times turning --lookups random monster ids into arrays of combat
+numbers: once through the model instances, one Combatant.from_monster() per id, and once with
+a single CatalogSnapshot.monster_combatants() call.  Also reports how long a snapshot takes to
+build.  Nothing touches the database.  Usage:
+
+    python -m benchmarks.catalog --monsters 10000 --lookups 1000000
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from game.catalog import COLUMNS, CatalogSnapshot, CatalogTable
+from game.combat import Combatant
+from models.armor import Armor
+from models.monsters import Monster
+from models.weapons import Weapon
+
+
+def build_rows(weapons: int, armor: int, monsters: int, rng: random.Random) -> dict:
+    rows = {Weapon: [], Armor: [], Monster: []}
+    for item_id in range(1, weapons + 1):
+        low = rng.randint(1, 10)
+        rows[Weapon].append(Weapon(id=item_id, name=f"weapon {item_id}", weight=rng.randint(1, 20), min_damage=low,
+                                   max_damage=low + rng.randint(0, 10), description="", buy_value=10,
+                                   sell_value=5, monster_only=rng.random() < 0.2))
+    for item_id in range(1, armor + 1):
+        rows[Armor].append(Armor(id=item_id, name=f"armor {item_id}", ac=rng.randint(0, 40), weight=rng.randint(1, 20),
+                                 damage_buffer=rng.randint(0, 5), description="", buy_value=10, sell_value=5,
+                                 monster_only=rng.random() < 0.2))
+    for monster_id in range(1, monsters + 1):
+        rows[Monster].append(Monster(id=monster_id, name=f"monster {monster_id}", level=rng.randint(1, 50),
+                                     health=rng.randint(10, 500), exp=rng.randint(1, 1000),
+                                     weapon=rng.randint(1, weapons) if rng.random() < 0.9 else None,
+                                     armor=rng.randint(1, armor) if rng.random() < 0.9 else None,
+                                     description="", image_url=""))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--weapons", type=int, default=200)
+    parser.add_argument("--armor", type=int, default=200)
+    parser.add_argument("--monsters", type=int, default=10000)
+    parser.add_argument("--lookups", type=int, default=1000000)
+    args = parser.parse_args()
+    rng = random.Random(1)
+    rows = build_rows(args.weapons, args.armor, args.monsters, rng)
+
+    start = time.perf_counter()
+    tables = {model: CatalogTable.from_rows([(row.id, *(getattr(row, column) for column in COLUMNS[model]))
+                                             for row in rows[model]], COLUMNS[model])
+              for model in COLUMNS}
+    snapshot = CatalogSnapshot(tables[Weapon], tables[Armor], tables[Monster], 1)
+    build_s = time.perf_counter() - start
+
+    ids = np.random.default_rng(1).integers(1, args.monsters, args.lookups, endpoint=True)
+    monsters = {monster.id: monster for monster in rows[Monster]}
+    weapons = {weapon.id: weapon for weapon in rows[Weapon]}
+    armor = {item.id: item for item in rows[Armor]}
+
+    start = time.perf_counter()
+    combatants = [Combatant.from_monster(monster, weapons.get(monster.weapon), armor.get(monster.armor))
+                  for monster in (monsters[monster_id] for monster_id in ids.tolist())]
+    instances = Combatant(*(np.array(field, dtype=np.int64) for field in zip(*combatants)))
+    instances_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    columns = snapshot.monster_combatants(ids)
+    snapshot_s = time.perf_counter() - start
+
+    same = all(np.array_equal(a, b) for a, b in zip(instances, columns))
+    print(f"monsters={args.monsters} lookups={args.lookups} build={build_s * 1000:.1f}ms same={same}")
+    print(f"model instances: {instances_s * 1000:9.1f} ms")
+    print(f"snapshot:        {snapshot_s * 1000:9.1f} ms  ({instances_s / snapshot_s:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
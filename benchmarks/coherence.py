@@ -0,0 +1,132 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Cross-worker cache coherence check.
+
+Starts --workers processes against one scratch database, each with its own caches and change
+feed, exactly as uvicorn --workers would.  In every round one worker renames a monster's
+description through save_monster() while the others hold that monster, and one other, in their
+catalog caches.  Every other worker then reads the monster until it sees the new description.
+
+Reports how long the change took to reach the other workers.  Exits with status 1 if a worker
+never saw a change, or if a change dropped a cached row other than the one that changed.
+Usage:
+
+    python -m benchmarks.coherence --workers 4 --rounds 40
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+STALE_TIMEOUT = 5.0
+
+
+async def worker(number: int, workers: int, rounds: int, barrier, results) -> None:
+    from auth.passwords import password_hasher
+    from database import connections as db
+
+    await db.run_in_db_thread(db.init_database)
+    await db.change_feed.start()
+    changed_id, other_id = 1, 2
+    try:
+        for round_number in range(rounds):
+            await db.lookup_monster_by_id(changed_id)
+            await db.lookup_monster_by_id(other_id)
+            await asyncio.to_thread(barrier.wait)
+
+            description = f"round {round_number}"
+            if round_number % workers == number:
+                monster = await db.lookup_monster_by_id(changed_id)
+                await db.save_monster(monster.model_copy(update={"description": description}))
+                results.put(("saved", round_number, time.time()))
+            else:
+                deadline = time.time() + STALE_TIMEOUT
+                while (await db.lookup_monster_by_id(changed_id)).description != description:
+                    if time.time() > deadline:
+                        results.put(("stale", round_number, number))
+                        break
+                    await asyncio.sleep(0.002)
+                else:
+                    results.put(("seen", round_number, time.time()))
+                if db.monster_cache.get_by_id(other_id) is None:
+                    results.put(("collateral", round_number, number))
+            await asyncio.to_thread(barrier.wait)
+    finally:
+        await db.write_queue.close()
+        await db.change_feed.close()
+        password_hasher.close()
+
+
+def run_worker(number: int, workers: int, rounds: int, barrier, results) -> None:
+    asyncio.run(worker(number, workers, rounds, barrier, results))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=40)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="sonzo-coherence-"), "game_database.db")
+    os.environ["SONZO_DB_URL"] = f"sqlite:///{path}"
+    os.environ.setdefault("SONZO_DB_PROFILE", "wal")
+
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(args.workers)
+    results = context.Queue()
+    processes = [context.Process(target=run_worker, args=(number, args.workers, args.rounds, barrier, results))
+                 for number in range(args.workers)]
+    for process in processes:
+        process.start()
+
+    saved, lags, stale, collateral = {}, [], 0, 0
+    # One saved plus a seen or stale from every other worker per round.
+    remaining = args.rounds * args.workers
+    while remaining:
+        kind, round_number, value = results.get(timeout=STALE_TIMEOUT * 4)
+        if kind == "saved":
+            saved[round_number] = value
+        elif kind == "seen":
+            lags.append((round_number, value))
+        elif kind == "stale":
+            stale += 1
+        else:
+            collateral += 1
+            continue
+        remaining -= 1
+    for process in processes:
+        process.join()
+
+    lags = sorted((seen - saved[round_number]) * 1000 for round_number, seen in lags)
+    print(f"workers={args.workers} rounds={args.rounds} propagated={len(lags)} stale={stale} "
+          f"collateral={collateral}")
+    if lags:
+        print(f"propagation ms: p50={lags[len(lags) // 2]:.1f} p99={lags[int(len(lags) * 0.99)]:.1f} "
+              f"max={lags[-1]:.1f}")
+    if stale or collateral or any(process.exitcode for process in processes):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
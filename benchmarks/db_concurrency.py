@@ -0,0 +1,159 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Mixed read/write concurrency benchmark for the database layer.
+
+Runs the same workload twice against a throw-away database:
+
+  inline    - the old behaviour, blocking Session calls made directly inside the coroutine.
+  executor  - the async API in database.connections, which runs each call on the DB thread pool.
+
+Alongside the DB traffic a "ping" task stands in for requests that never touch the database
+and records how late the event loop wakes it up.  Usage:
+
+    python -m benchmarks.db_concurrency --clients 32 --ops 200 --players 20000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+
+def percentile(samples: list, pct: float) -> float:
+    """
+    Return the pct percentile of the samples in milliseconds.
+
+    :param samples: Latencies in seconds.
+    :param pct: Percentile between 0 and 100.
+    :return: The percentile in milliseconds.
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index] * 1000
+
+
+def add_players(engine, count: int) -> None:
+    """
+    Pad the player table so each lookup does real work.
+
+    :param engine: The SQLAlchemy engine.
+    :param count: Number of players to insert.
+    :return:
+    """
+    rows = [(f"bench_user_{i}", "password1", f"Bench_{i}", 1, 100, 0, 1, 1, 10, 100, "Benchmark player.", "")
+            for i in range(count)]
+    raw = engine.raw_connection()
+    try:
+        raw.cursor().executemany(
+            "INSERT INTO player (username, password, name, level, health, exp, armor, weapon, gold, bank, description, "
+            "image_url) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        raw.commit()
+    finally:
+        raw.close()
+
+
+async def run_workload(db, mode: str, clients: int, ops: int, write_ratio: float, players: int) -> dict:
+    """
+    Drive the mixed workload and collect latencies.
+
+    :param db: The database.connections module.
+    :param mode: "inline" or "executor".
+    :param clients: Number of concurrent clients.
+    :param ops: Operations per client.
+    :param write_ratio: Fraction of operations that are saves.
+    :param players: Number of padded players available for lookups.
+    :return: Latency samples keyed by operation type.
+    """
+    samples = {"read": [], "write": [], "ping": []}
+    template = db._lookup_player_by_name("Mock_Dave")
+
+    async def lookup(name):
+        if mode == "inline":
+            return db._lookup_player_by_name(name)
+        return await db.lookup_player_by_name(name)
+
+    async def save(player):
+        if mode == "inline":
+            return db._save_player(player)
+        return await db.save_player(player)
+
+    async def client(seed: int):
+        rng = random.Random(seed)
+        for _ in range(ops):
+            start = time.perf_counter()
+            if rng.random() < write_ratio:
+                updated = template.model_copy(update={"gold": rng.randint(0, 1000)})
+                await save(updated)
+                samples["write"].append(time.perf_counter() - start)
+            else:
+                await lookup(f"bench_{rng.randrange(players)}")
+                samples["read"].append(time.perf_counter() - start)
+            # Yield so other clients get a turn even in inline mode.
+            await asyncio.sleep(0)
+
+    done = asyncio.Event()
+
+    async def ping():
+        interval = 0.001
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            samples["ping"].append(time.perf_counter() - start - interval)
+
+    pinger = asyncio.create_task(ping())
+    await asyncio.gather(*(client(i) for i in range(clients)))
+    done.set()
+    await pinger
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--ops", type=int, default=100)
+    parser.add_argument("--players", type=int, default=20000)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="sonzo-bench-")
+    os.environ["SONZO_DB_URL"] = f"sqlite:///{os.path.join(workdir, 'game_database.db')}"
+    from database import connections as db
+
+    db.init_database()
+    add_players(db.engine, args.players)
+
+    print(f"database: {workdir}  clients={args.clients} ops/client={args.ops} write_ratio={args.write_ratio}")
+    print(f"{'mode':<10}{'op':<7}{'count':>8}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for mode in ("inline", "executor"):
+        start = time.perf_counter()
+        samples = asyncio.run(run_workload(db, mode, args.clients, args.ops, args.write_ratio, args.players))
+        elapsed = time.perf_counter() - start
+        for op, values in samples.items():
+            print(f"{mode:<10}{op:<7}{len(values):>8}{percentile(values, 50):>10.2f}"
+                  f"{percentile(values, 99):>10.2f}{percentile(values, 100):>10.2f}")
+        print(f"{mode:<10}total  {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Engine profile throughput benchmark.
+
+For each profile in database/engine.py, starts several worker processes against one scratch
+database, the same shape as `uvicorn main:app --workers N`: each process builds its own engine
+and pool from the profile and runs the database layer's async API.  Every worker runs a mixed
+read/write loop for a fixed time; the table reports aggregate throughput and lock errors.
+
+    python -m benchmarks.engine_profiles --workers 4 --seconds 5 --write-ratio 0.2
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from sqlmodel import SQLModel
+
+from database.engine import PROFILES, create_game_engine, load_engine_settings
+
+
+def worker(url: str, profile: str, seconds: float, write_ratio: float, players: int, seed: int, results) -> None:
+    """
+    Run the mixed workload in this process and report its counters.
+
+    :param url: Database URL.
+    :param profile: Engine profile name.
+    :param seconds: How long to run.
+    :param write_ratio: Fraction of operations that are saves.
+    :param players: Number of players available for lookups.
+    :param seed: RNG seed for this worker.
+    :param results: Queue to report counters on.
+    :return:
+    """
+    os.environ["SONZO_DB_URL"] = url
+    os.environ["SONZO_DB_PROFILE"] = profile
+    from sqlalchemy.exc import OperationalError
+    from database import connections as db
+    from models.players import Player
+
+    async def run():
+        rng = random.Random(seed)
+        counts = {"reads": 0, "writes": 0, "errors": 0}
+        deadline = time.perf_counter() + seconds
+
+        async def client():
+            while time.perf_counter() < deadline:
+                try:
+                    if rng.random() < write_ratio:
+                        await db.save_player(Player(id=rng.randrange(1, players), gold=rng.randrange(1000)))
+                        counts["writes"] += 1
+                    else:
+                        await db.lookup_player_by_name(f"Player_{rng.randrange(players)}")
+                        counts["reads"] += 1
+                except OperationalError:
+                    counts["errors"] += 1
+
+        await asyncio.gather(*(client() for _ in range(8)))
+        await db.write_queue.close()
+        return counts
+
+    results.put(asyncio.run(run()))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--players", type=int, default=100000)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--profiles", nargs="+", default=list(PROFILES))
+    args = parser.parse_args()
+
+    from benchmarks.name_lookup import grow_players
+    context = multiprocessing.get_context("spawn")
+
+    print(f"workers={args.workers} seconds={args.seconds} players={args.players} write_ratio={args.write_ratio}")
+    print(f"{'profile':<10}{'reads/s':>10}{'writes/s':>10}{'errors':>8}")
+    for profile in args.profiles:
+        # A fresh database per profile, since journal_mode=WAL persists in the file.
+        url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='sonzo-bench-'), 'game_database.db')}"
+        os.environ["SONZO_DB_URL"] = url
+        engine = create_game_engine(load_engine_settings(profile))
+        SQLModel.metadata.create_all(engine)
+        grow_players(engine, 0, args.players)
+        engine.dispose()
+
+        results = context.Queue()
+        processes = [context.Process(target=worker, args=(url, profile, args.seconds, args.write_ratio,
+                                                          args.players, seed, results))
+                     for seed in range(args.workers)]
+        for process in processes:
+            process.start()
+        totals = {"reads": 0, "writes": 0, "errors": 0}
+        for _ in processes:
+            for key, value in results.get().items():
+                totals[key] += value
+        for process in processes:
+            process.join()
+
+        print(f"{profile:<10}{totals['reads'] / args.seconds:>10.0f}{totals['writes'] / args.seconds:>10.0f}"
+              f"{totals['errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Equipment loading benchmark.
+
+Generates a scratch database, then loads pages of players with their weapon and armor three
+ways and reports statements and milliseconds per page:
+
+    n+1        the players, then one lookup per item as separate lookup_*_by_id calls would
+    joined     joinedload: one SELECT with both item tables joined
+    selectin   selectinload: the players, then one SELECT per item table for the whole page
+
+Usage:
+
+    python -m benchmarks.equipment --players 100000 --pages 1 100 --repeat 50
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import joinedload, selectinload
+from sqlmodel import SQLModel, Session, create_engine, select
+
+from mock_data.generator import generate
+from models.armor import Armor
+from models.players import Player
+from models.weapons import Weapon
+
+
+def load_n_plus_one(engine, ids: list) -> list:
+    with Session(engine) as session:
+        players = session.exec(select(Player).where(Player.id.in_(ids))).all()
+    items = []
+    for player in players:
+        # A fresh session per lookup, like every run_in_db_thread() call, so nothing is shared.
+        with Session(engine) as session:
+            items.append((session.get(Weapon, player.weapon), session.get(Armor, player.armor)))
+    return items
+
+
+def load_with(loader):
+    def load(engine, ids: list) -> list:
+        with Session(engine) as session:
+            statement = select(Player).where(Player.id.in_(ids)).options(
+                loader(Player.equipped_weapon), loader(Player.equipped_armor))
+            return [(player.equipped_weapon, player.equipped_armor) for player in session.exec(statement).all()]
+    return load
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=100000)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 100])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="sonzo-bench-"), "equipment.db")
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+    generate(engine, players=args.players, weapons=200, armor=200, seed=1)
+
+    statements = 0
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count(*_):
+        nonlocal statements
+        statements += 1
+
+    rng = random.Random(1)
+    modes = {"n+1": load_n_plus_one, "joined": load_with(joinedload), "selectin": load_with(selectinload)}
+    print(f"{'page':>6}{'mode':>10}{'statements':>12}{'ms':>9}")
+    for page in args.pages:
+        pages = [rng.sample(range(1, args.players + 1), page) for _ in range(args.repeat)]
+        for name, load in modes.items():
+            statements = 0
+            start = time.perf_counter()
+            for ids in pages:
+                loaded = load(engine, ids)
+                assert len(loaded) == page and all(weapon and armor for weapon, armor in loaded)
+            elapsed = (time.perf_counter() - start) / args.repeat * 1000
+            print(f"{page:>6}{name:>10}{statements / args.repeat:>12.0f}{elapsed:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Leaderboard benchmark.
+
+Builds an experience leaderboard over random player standings at each requested size and
+times an incremental update (one player's experience changes), a rank lookup and a top-10
+page, against re-sorting every standing as get_all_players() plus sorted() would.  Usage:
+
+    python -m benchmarks.leaderboard --sizes 100000 1000000 --operations 2000
+"""
+
+import argparse
+import random
+import time
+
+from game.leaderboard import Leaderboard, Standing
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--operations", type=int, default=2000)
+    args = parser.parse_args()
+    rng = random.Random(1)
+
+    print(f"{'players':>10}{'load s':>9}{'update us':>11}{'rank us':>9}{'top10 us':>10}{'resort ms':>11}")
+    for size in args.sizes:
+        standings = {entity_id: Standing(rng.randint(1, 50), rng.randrange(1000000), rng.randrange(10000),
+                                         rng.randrange(100000))
+                     for entity_id in range(1, size + 1)}
+        board = Leaderboard("exp", lambda standing: standing.exp)
+
+        start = time.perf_counter()
+        board.load(standings.items())
+        load_s = time.perf_counter() - start
+
+        ids = [rng.randint(1, size) for _ in range(args.operations)]
+        start = time.perf_counter()
+        for entity_id in ids:
+            current = standings[entity_id]
+            updated = standings[entity_id] = current._replace(exp=current.exp + rng.randrange(1000))
+            board.move(entity_id, current, updated)
+        update_us = (time.perf_counter() - start) / len(ids) * 1e6
+
+        start = time.perf_counter()
+        for entity_id in ids:
+            board.rank(standings[entity_id])
+        rank_us = (time.perf_counter() - start) / len(ids) * 1e6
+
+        start = time.perf_counter()
+        for offset in ids:
+            board.top(offset % 1000, 10)
+        top_us = (time.perf_counter() - start) / len(ids) * 1e6
+
+        start = time.perf_counter()
+        sorted(standings.items(), key=lambda item: (-item[1].exp, item[0]))
+        resort_ms = (time.perf_counter() - start) * 1000
+
+        print(f"{size:>10}{load_s:>9.2f}{update_us:>11.1f}{rank_us:>9.1f}{top_us:>10.1f}{resort_ms:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
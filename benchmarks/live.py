@@ -0,0 +1,119 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Live update fan-out benchmark.
+
+Subscribes --subscribers in-process clients to --rows monsters through the LiveHub, then saves
+random rows --saves times, one every --interval seconds, and reports what a save costs the
+event loop, how long diffs take to reach the clients and how many were dropped.  --slow percent
+of the clients take --slow-delay seconds to receive each message, standing in for clients on
+bad networks; with drop-oldest queues they lose messages instead of delaying anyone else.
+No sockets or database are involved, so this measures the hub alone.  Usage:
+
+    python -m benchmarks.live --subscribers 10000 --saves 100 --slow 5
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from models.monsters import Monster
+from web.live import LiveHub
+
+
+def percentile(samples: list, pct: float) -> float:
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))]
+
+
+async def run(args) -> None:
+    hub = LiveHub(args.queue)
+    rng = random.Random(1)
+    published = {}
+    fast, slow = [], []
+
+    async def load(entity_id):
+        return Monster(id=entity_id, name=f"Monster {entity_id}", level=1, health=10, exp=1, weapon=1, armor=1,
+                       description="A monster.", image_url="monster.webp")
+
+    def client(is_slow: bool):
+        latencies = slow if is_slow else fast
+
+        async def send(text: str) -> None:
+            if is_slow:
+                await asyncio.sleep(args.slow_delay)
+            sent = published.get(text)
+            if sent is not None:
+                latencies.append(time.perf_counter() - sent)
+        return send
+
+    start = time.perf_counter()
+    subscriptions = []
+    for number in range(args.subscribers):
+        entity_id = number % args.rows + 1
+        subscription = await hub.subscribe(Monster, entity_id, client(rng.random() * 100 < args.slow),
+                                           lambda entity_id=entity_id: load(entity_id))
+        subscriptions.append(subscription)
+    senders = [asyncio.create_task(subscription.run()) for subscription in subscriptions]
+    subscribe_s = time.perf_counter() - start
+
+    publish = []
+    for save in range(args.saves):
+        entity_id = rng.randint(1, args.rows)
+        started = time.perf_counter()
+        hub.on_save(Monster, entity_id, {"health": save, "description": "A monster.", "version": save + 2})
+        publish.append(time.perf_counter() - started)
+        # The diff that was just queued, so clients can look up when it was published.
+        for subscription in subscriptions:
+            if subscription.topic.entity_id == entity_id:
+                published[subscription.queue[-1]] = started
+                break
+        await asyncio.sleep(args.interval)
+    await asyncio.sleep(args.slow_delay * args.queue + 0.5)
+    for sender in senders:
+        sender.cancel()
+
+    stats = hub.stats()
+    fast.sort()
+    publish.sort()
+    print(f"subscribers={args.subscribers} rows={args.rows} saves={args.saves} slow={args.slow}% "
+          f"queue={args.queue}  subscribe {subscribe_s:.2f}s")
+    print(f"publish per save: mean {sum(publish) / len(publish) * 1e3:.2f}ms  p99 {percentile(publish, 99) * 1e3:.2f}ms")
+    print(f"fast clients: delivered {len(fast)}  p50 {percentile(fast, 50) * 1e3:.2f}ms  "
+          f"p99 {percentile(fast, 99) * 1e3:.2f}ms")
+    print(f"slow clients: delivered {len(slow)}  dropped {stats['dropped']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=10000)
+    parser.add_argument("--rows", type=int, default=1)
+    parser.add_argument("--saves", type=int, default=100)
+    parser.add_argument("--interval", type=float, default=0.1)
+    parser.add_argument("--slow", type=float, default=5.0, help="percent of clients that are slow")
+    parser.add_argument("--slow-delay", type=float, default=0.05)
+    parser.add_argument("--queue", type=int, default=64)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Compare two load-test result files.
+
+Prints throughput and p50/p99 for every operation in both runs with the relative change, and
+exits with status 1 if any operation's throughput dropped or p99 rose by more than
+--threshold percent, so it can gate a CI job:
+
+    python -m benchmarks.load.compare before.json after.json --threshold 10
+"""
+
+import argparse
+import json
+import sys
+
+
+def change(before: float, after: float) -> float:
+    """
+    Return the relative change in percent.
+
+    :param before: The baseline value.
+    :param after: The new value.
+    :return: Percent change, 0 if the baseline is 0.
+    """
+    return (after - before) / before * 100 if before else 0.0
+
+
+def compare(before: dict, after: dict, threshold: float) -> list:
+    """
+    Print the comparison table and collect regressions.
+
+    :param before: The baseline results.
+    :param after: The new results.
+    :param threshold: Percent change that counts as a regression.
+    :return: Descriptions of every regression.
+    """
+    regressions = []
+    print(f"{'operation':<16}{'req/s':>20}{'':>9}{'p50 ms':>18}{'p99 ms':>18}{'':>9}")
+    rows = [(name, before["operations"].get(name), after["operations"].get(name))
+            for name in sorted(set(before["operations"]) | set(after["operations"]))]
+    rows.append(("total", before["summary"], after["summary"]))
+    for name, old, new in rows:
+        if old is None or new is None:
+            print(f"{name:<16} only in {'after' if old is None else 'before'}")
+            continue
+        throughput = change(old["throughput"], new["throughput"])
+        p99 = change(old["p99_ms"], new["p99_ms"])
+        print(f"{name:<16}{old['throughput']:>9.0f} ->{new['throughput']:>7.0f}{throughput:>+8.1f}%"
+              f"{old['p50_ms']:>8.2f} ->{new['p50_ms']:>6.2f}"
+              f"{old['p99_ms']:>8.2f} ->{new['p99_ms']:>6.2f}{p99:>+8.1f}%")
+        if throughput < -threshold:
+            regressions.append(f"{name}: throughput {throughput:+.1f}%")
+        if p99 > threshold:
+            regressions.append(f"{name}: p99 {p99:+.1f}%")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=10.0)
+    args = parser.parse_args()
+
+    with open(args.before, "r") as f:
+        before = json.load(f)
+    with open(args.after, "r") as f:
+        after = json.load(f)
+
+    for label, results in (("before", before), ("after", after)):
+        meta = results.get("meta", {})
+        print(f"{label:<7}{meta.get('commit', '?'):>10}  {meta.get('time', '?')}  {meta.get('target', '?')}  "
+              f"mix={meta.get('mix', '?')} clients={meta.get('clients', '?')}")
+    if {key: before.get("meta", {}).get(key) for key in ("mix", "clients", "target")} != \
+            {key: after.get("meta", {}).get(key) for key in ("mix", "clients", "target")}:
+        print("Warning: the runs used different settings.")
+
+    regressions = compare(before, after, args.threshold)
+    if regressions:
+        print("Regressions:\n  " + "\n  ".join(regressions))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Explorer load test.
+
+Runs a weighted mix of explorer reads, edit-page renders and update POSTs from concurrent
+clients for a fixed time, then reports throughput and latency percentiles per operation.
+
+--target asgi (the default) drives the app in-process through httpx's ASGI transport, against
+a scratch database seeded with the mock data plus --players extra players; the app's lifespan
+is run around the test just as uvicorn would.  --target http://host:port drives a running
+server instead, e.g. one started with `uvicorn main:app --port 9001 --workers 4`.
+
+--out writes the results as JSON for benchmarks.load.compare.  Run from the repository root:
+
+    python -m benchmarks.load.runner --mix mixed --clients 32 --duration 15 --out before.json
+"""
+
+from datetime import datetime, timezone
+from typing import Dict, List
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.load.scenarios import MIXES, Catalog, build_operations, choose
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """
+    Return the pct percentile of the samples in milliseconds.
+
+    :param samples: Latencies in seconds, sorted.
+    :param pct: Percentile between 0 and 100.
+    :return: The percentile in milliseconds.
+    """
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+    return samples[index] * 1000
+
+
+def summarize(latencies: List[float], statuses: Dict[str, int], elapsed: float) -> dict:
+    """
+    Reduce one operation's samples to its report.
+
+    :param latencies: Latencies in seconds.
+    :param statuses: Response counts by status code.
+    :param elapsed: Length of the run in seconds.
+    :return: Requests, errors, throughput and percentiles.
+    """
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "errors": sum(count for status, count in statuses.items() if not status.startswith(("2", "3"))),
+        "statuses": dict(sorted(statuses.items())),
+        "throughput": len(ordered) / elapsed if elapsed else 0.0,
+        "mean_ms": sum(ordered) / len(ordered) * 1000 if ordered else 0.0,
+        "p50_ms": percentile(ordered, 50),
+        "p90_ms": percentile(ordered, 90),
+        "p99_ms": percentile(ordered, 99),
+        "max_ms": ordered[-1] * 1000 if ordered else 0.0,
+    }
+
+
+async def run_load(client: httpx.AsyncClient, mix: str, clients: int, duration: float, seed: int) -> dict:
+    """
+    Drive the mix from concurrent clients until the duration is up.
+
+    :param client: A client pointed at the app.
+    :param mix: A key of MIXES.
+    :param clients: Concurrent clients.
+    :param duration: Seconds to run.
+    :param seed: Seed for the clients' random choices.
+    :return: Summary and per-operation reports.
+    """
+    catalog = await Catalog.fetch(client)
+    operations = build_operations(catalog)
+    latencies: Dict[str, List[float]] = {}
+    statuses: Dict[str, Dict[str, int]] = {}
+
+    async def worker(number: int, deadline: float) -> None:
+        rng = random.Random(seed * 1000 + number)
+        while time.perf_counter() < deadline:
+            operation = choose(mix, operations, rng)
+            start = time.perf_counter()
+            try:
+                status = str(await operation(client, rng))
+            except httpx.HTTPError as error:
+                status = type(error).__name__
+            latencies.setdefault(operation.__name__, []).append(time.perf_counter() - start)
+            counts = statuses.setdefault(operation.__name__, {})
+            counts[status] = counts.get(status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(number, start + duration) for number in range(clients)))
+    elapsed = time.perf_counter() - start
+
+    every_status: Dict[str, int] = {}
+    for counts in statuses.values():
+        for status, count in counts.items():
+            every_status[status] = every_status.get(status, 0) + count
+    return {
+        "summary": summarize([sample for samples in latencies.values() for sample in samples], every_status, elapsed),
+        "operations": {name: summarize(latencies[name], statuses[name], elapsed) for name in sorted(latencies)},
+    }
+
+
+async def run_asgi(args) -> dict:
+    """
+    Run the load test in-process against a scratch database.
+
+    :param args: Parsed command line arguments.
+    :return: The results.
+    """
+    workdir = tempfile.mkdtemp(prefix="sonzo-load-")
+    os.environ.setdefault("SONZO_DB_URL", f"sqlite:///{os.path.join(workdir, 'game_database.db')}")
+    os.makedirs("logs", exist_ok=True)
+    import main
+    from database import connections as db
+    from benchmarks.name_lookup import grow_players, player_count
+
+    async with main.app.router.lifespan_context(main.app):
+        if args.players:
+            start = await db.run_in_db_thread(player_count, db.engine)
+            await db.run_in_db_thread(grow_players, db.engine, start, start + args.players)
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+            return await run_load(client, args.mix, args.clients, args.duration, args.seed)
+
+
+async def run_http(args) -> dict:
+    """
+    Run the load test against a running server.
+
+    :param args: Parsed command line arguments.
+    :return: The results.
+    """
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    async with httpx.AsyncClient(base_url=args.target, limits=limits, timeout=30) as client:
+        return await run_load(client, args.mix, args.clients, args.duration, args.seed)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_report(results: dict) -> None:
+    print(f"{'operation':<16}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>9}{'p90 ms':>9}"
+          f"{'p99 ms':>9}{'max ms':>9}")
+    rows = [*results["operations"].items(), ("total", results["summary"])]
+    for name, report in rows:
+        print(f"{name:<16}{report['requests']:>10}{report['errors']:>8}{report['throughput']:>10.0f}"
+              f"{report['p50_ms']:>9.2f}{report['p90_ms']:>9.2f}{report['p99_ms']:>9.2f}{report['max_ms']:>9.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", default="asgi", help="asgi, or the base URL of a running server")
+    parser.add_argument("--mix", choices=sorted(MIXES), default="mixed")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--players", type=int, default=0, help="extra players to add (asgi only)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_asgi(args) if args.target == "asgi" else run_http(args))
+    results["meta"] = {
+        "commit": git_commit(),
+        "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "target": args.target,
+        "mix": args.mix,
+        "clients": args.clients,
+        "duration": args.duration,
+        "players": args.players,
+        "seed": args.seed,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+    }
+    print_report(results)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.out}.")
+
+
+if __name__ == "__main__":
+    main()
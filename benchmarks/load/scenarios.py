@@ -0,0 +1,137 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Explorer load-test operations and the weighted mixes that combine them.
+
+Every operation picks a random row of its entity, sends one request and returns its status.
+Rows are fetched once from the bulk /api endpoints before the run starts.
+"""
+
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List
+import random
+
+import httpx
+
+# Entity -> (bulk API table, by_name read path, edit path, update path).  {name} is the row's name.
+ENTITIES = {
+    "player": ("players", "/explorer/player/by_name/", "/explorer/player/{name}/edit", "/explorer/player/by_name/{name}"),
+    "monster": ("monsters", "/explorer/monster/by_name/", "/explorer/monster/{name}/edit", "/explorer/monster/{name}"),
+    "weapon": ("weapons", "/explorer/weapon/by_name/", "/explorer/weapon/{name}/edit", "/explorer/weapon/{name}"),
+    "armor": ("armor", "/explorer/armor/by_name/", "/explorer/armor/{name}/edit", "/explorer/armor/{name}"),
+}
+# The bulk API never returns passwords; a player form posted without one keeps the stored hash.
+
+# Columns the explorer forms do not post.
+SERVER_COLUMNS = {"name_key", "username_key", "version"}
+
+# Operation weights for each mix.
+MIXES = {
+    "read": {"read": 1},
+    "edit": {"edit": 1},
+    "write": {"update": 1},
+    "mixed": {"read": 80, "edit": 10, "update": 10},
+}
+
+Operation = Callable[[httpx.AsyncClient, random.Random], Awaitable[int]]
+
+
+@dataclass
+class Catalog:
+    """
+    The rows available to the operations, keyed by entity.
+    """
+    rows: Dict[str, List[dict]] = field(default_factory=dict)
+
+    @classmethod
+    async def fetch(cls, client: httpx.AsyncClient, limit: int = 1000) -> "Catalog":
+        """
+        Load up to `limit` rows of every entity through the bulk API.
+
+        :param client: A client pointed at the app.
+        :param limit: Rows per entity.
+        :return: The catalog.
+        """
+        catalog = cls()
+        for entity, (table, *_) in ENTITIES.items():
+            response = await client.get(f"/api/{table}", params={"limit": limit})
+            response.raise_for_status()
+            catalog.rows[entity] = response.json()["items"]
+        return catalog
+
+    def pick(self, entity: str, rng: random.Random) -> dict:
+        return rng.choice(self.rows[entity])
+
+
+def _form(row: dict) -> dict:
+    return {key: "" if value is None else str(value)
+            for key, value in row.items() if key not in SERVER_COLUMNS and not (key == "monster_only" and not value)}
+
+
+def build_operations(catalog: Catalog) -> Dict[str, List[Operation]]:
+    """
+    Build every operation, grouped by kind: read, edit and update.
+
+    :param catalog: The rows to draw from.
+    :return: Operations by kind.
+    """
+    operations: Dict[str, List[Operation]] = {"read": [], "edit": [], "update": []}
+
+    for entity, (_, read_path, edit_path, update_path) in ENTITIES.items():
+        if not catalog.rows.get(entity):
+            continue
+
+        async def read(client, rng, entity=entity, path=read_path):
+            response = await client.get(path, params={"name": catalog.pick(entity, rng)["name"]})
+            return response.status_code
+
+        async def edit(client, rng, entity=entity, path=edit_path):
+            response = await client.post(path.format(name=catalog.pick(entity, rng)["name"]))
+            return response.status_code
+
+        read.__name__, edit.__name__ = f"read_{entity}", f"edit_{entity}"
+        operations["read"].append(read)
+        operations["edit"].append(edit)
+
+        if update_path is not None:
+            async def update(client, rng, entity=entity, path=update_path):
+                row = catalog.pick(entity, rng)
+                form = _form(row)
+                form["description"] = f"{row['description'].split(' #')[0]} #{rng.randrange(1000000)}"
+                response = await client.post(path.format(name=row["name"]), data=form)
+                return response.status_code
+
+            update.__name__ = f"update_{entity}"
+            operations["update"].append(update)
+
+    return operations
+
+
+def choose(mix: str, operations: Dict[str, List[Operation]], rng: random.Random) -> Operation:
+    """
+    Pick the next operation for a mix.
+
+    :param mix: A key of MIXES.
+    :param operations: Operations by kind.
+    :param rng: The worker's random generator.
+    :return: The operation.
+    """
+    weights = {kind: weight for kind, weight in MIXES[mix].items() if operations.get(kind)}
+    kind = rng.choices(list(weights), weights=list(weights.values()))[0]
+    return rng.choice(operations[kind])
@@ -0,0 +1,184 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Request throughput with logging off, inline and queued.
+
+Every mode drives the same routes, which log one INFO line per request, through the app
+in-process with httpx.  The handlers from logging.json write to a scratch directory, and
+--stall-ms makes every log file write block for that long, the way a busy disk or a rotation
+would.  Because the listener shares the GIL, a fast disk shows little difference in raw
+throughput; the queue pays off in latency once writes stall.
+
+  off       - logging.disable(), the ceiling.
+  inline    - logging.json applied directly, handlers run on the event loop.
+  queued    - configure_logging(), handlers run on the listener thread.
+  filtered  - queued, plus the sampling and rate-limit filters from logging.json.
+
+Run from the repository root:
+
+    python -m benchmarks.logging_throughput --clients 16 --requests 5000 --stall-ms 1
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import logging.config
+import os
+import tempfile
+import time
+
+os.environ.setdefault("SONZO_DB_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='sonzo-bench-'), 'game.db')}")
+os.makedirs("logs", exist_ok=True)
+
+import httpx
+
+from logging.handlers import RotatingFileHandler
+from telemetry.logs import configure_logging, stop_logging
+
+MODES = ["off", "inline", "queued", "filtered"]
+PATHS = ["/", "/license"]
+
+
+class StallingFileHandler(RotatingFileHandler):
+    """
+    A RotatingFileHandler whose writes block for a fixed time.
+    """
+
+    def __init__(self, *args, stall_ms: float = 0.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stall = stall_ms / 1000
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if self.stall:
+            time.sleep(self.stall)
+        super().emit(record)
+
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))] * 1000
+
+
+def pop_line_count(path: str) -> int:
+    """
+    Count the lines of a log file and delete it.
+
+    :param path: The log file.
+    :return: The number of lines, 0 if the file does not exist.
+    """
+    logging.shutdown()
+    if not os.path.exists(path):
+        return 0
+    with open(path, "r") as f:
+        lines = sum(1 for _ in f)
+    os.remove(path)
+    return lines
+
+
+def scratch_config(directory: str, filters: bool, stall_ms: float) -> str:
+    """
+    Write a copy of logging.json whose handlers write into a scratch directory.
+
+    :param directory: The scratch directory.
+    :param filters: Keep the per-logger filters.
+    :param stall_ms: How long each log file write blocks.
+    :return: The path of the copy.
+    """
+    with open("logging.json", "r") as f:
+        config = json.load(f)
+    config["handlers"]["logfile"]["filename"] = os.path.join(directory, "sonzo.log")
+    config["handlers"]["logfile"]["class"] = "benchmarks.logging_throughput.StallingFileHandler"
+    config["handlers"]["logfile"]["stall_ms"] = stall_ms
+    # Same formatting cost as the console, without flooding it.
+    config["handlers"]["stdout"] = {"class": "logging.FileHandler", "formatter": "simple",
+                                    "filename": os.path.join(directory, "stdout.log")}
+    # The benchmark client's own request log is not the app's.
+    config["loggers"]["httpx"] = {"level": "WARNING"}
+    for name, logger in config["loggers"].items():
+        # dictConfig only ever adds filters, so drop the ones left by the previous mode.
+        logging.getLogger(name or None).filters.clear()
+        if not filters:
+            logger.pop("filters", None)
+    path = os.path.join(directory, f"logging{'-filtered' if filters else ''}.json")
+    with open(path, "w") as f:
+        json.dump(config, f)
+    return path
+
+
+async def drive(app, clients: int, requests: int) -> tuple:
+    """
+    Send the requests from concurrent clients.
+
+    :param app: The ASGI app.
+    :param clients: Concurrent clients.
+    :param requests: Total requests.
+    :return: (requests per second, p50 ms, p99 ms)
+    """
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker(count: int) -> None:
+            for i in range(count):
+                sent = time.perf_counter()
+                response = await client.get(PATHS[i % len(PATHS)])
+                latencies.append(time.perf_counter() - sent)
+                assert response.status_code == 200
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(requests // clients) for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+    return len(latencies) / elapsed, percentile(latencies, 50), percentile(latencies, 99)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--stall-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    import main as sonzo
+
+    directory = tempfile.mkdtemp(prefix="sonzo-bench-logs-")
+
+    # Warm up imports, templates and caches so the first mode isn't penalised.
+    logging.disable(logging.CRITICAL)
+    asyncio.run(drive(sonzo.app, args.clients, args.requests // 5))
+
+    print(f"{'mode':>10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'lines':>8}")
+    for mode in MODES:
+        stop_logging()
+        logging.disable(logging.NOTSET)
+        if mode == "off":
+            logging.disable(logging.CRITICAL)
+        elif mode == "inline":
+            with open(scratch_config(directory, False, args.stall_ms), "r") as f:
+                logging.config.dictConfig(json.load(f))
+        else:
+            configure_logging(scratch_config(directory, mode == "filtered", args.stall_ms))
+
+        rate, p50, p99 = asyncio.run(drive(sonzo.app, args.clients, args.requests))
+        stop_logging()
+        lines = pop_line_count(os.path.join(directory, "sonzo.log"))
+        print(f"{mode:>10}{rate:>10.0f}{p50:>10.2f}{p99:>10.2f}{lines:>8}")
+
+
+if __name__ == "__main__":
+    main()
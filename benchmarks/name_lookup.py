@@ -0,0 +1,138 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Case-insensitive player lookup benchmark.
+
+Grows a scratch player table to each requested size and times the old func.lower(Player.name)
+filter against the indexed Player.name_key column, printing SQLite's query plan for both.
+Usage:
+
+    python -m benchmarks.name_lookup --sizes 10000 100000 1000000 --lookups 50
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from sqlmodel import SQLModel, Session, create_engine, select, func
+
+from models.players import Player
+from models.names import normalize_name
+
+
+def player_count(engine) -> int:
+    """
+    Count the players, to number new ones after them.
+
+    :param engine: The SQLAlchemy engine.
+    :return: The number of player rows.
+    """
+    with engine.connect() as connection:
+        return connection.exec_driver_sql("SELECT count(*) FROM player").scalar()
+
+
+def grow_players(engine, start: int, stop: int) -> None:
+    """
+    Insert players with ids start..stop-1 in one transaction.
+
+    :param engine: The SQLAlchemy engine.
+    :param start: First player number.
+    :param stop: One past the last player number.
+    :return:
+    """
+    rows = [(f"user_{i}", "x", f"Player_{i}", 1, 100, 0, 1, 1, 0, 0, "", "", f"user_{i}", f"player_{i}")
+            for i in range(start, stop)]
+    raw = engine.raw_connection()
+    try:
+        raw.cursor().executemany(
+            "INSERT INTO player (username, password, name, level, health, exp, armor, weapon, gold, bank, "
+            "description, image_url, username_key, name_key) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows)
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def time_lookups(engine, statement_for, names: list) -> float:
+    """
+    Run one lookup per name and return the mean latency in milliseconds.
+
+    :param engine: The SQLAlchemy engine.
+    :param statement_for: Builds the select statement for a name.
+    :param names: Names to look up.
+    :return: Mean milliseconds per lookup.
+    """
+    with Session(engine) as session:
+        start = time.perf_counter()
+        for name in names:
+            assert session.exec(statement_for(name)).first() is not None
+        return (time.perf_counter() - start) / len(names) * 1000
+
+
+def query_plan(engine, statement) -> str:
+    """
+    Return SQLite's EXPLAIN QUERY PLAN detail for a statement.
+
+    :param engine: The SQLAlchemy engine.
+    :param statement: The select statement.
+    :return: The plan text.
+    """
+    compiled = statement.compile(engine, compile_kwargs={"literal_binds": True})
+    with engine.connect() as connection:
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}").fetchall()
+    return "; ".join(row[-1] for row in rows)
+
+
+def lower_statement(name: str):
+    return select(Player).where(func.lower(Player.name) == name.lower())
+
+
+def key_statement(name: str):
+    return select(Player).where(Player.name_key == normalize_name(name))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--lookups", type=int, default=50)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="sonzo-bench-"), "players.db")
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+    rng = random.Random(1)
+
+    print("func.lower(name):", query_plan(engine, lower_statement("x")))
+    print("name_key:        ", query_plan(engine, key_statement("x")))
+    print(f"{'players':>10}{'lower() ms':>14}{'name_key ms':>14}{'speedup':>10}")
+
+    size = 0
+    for target in sorted(args.sizes):
+        grow_players(engine, size, target)
+        size = target
+        names = [f"PLAYER_{rng.randrange(size)}" for _ in range(args.lookups)]
+        lower_ms = time_lookups(engine, lower_statement, names)
+        key_ms = time_lookups(engine, key_statement, names)
+        print(f"{size:>10}{lower_ms:>14.3f}{key_ms:>14.3f}{lower_ms / key_ms:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
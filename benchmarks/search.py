@@ -0,0 +1,92 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Search index benchmark.
+
+Grows a scratch player table to each requested size, loads it into a SearchIndex and times
+prefix, multi-term and misspelled queries against a LIKE '%query%' scan of name_key.
+Usage:
+
+    python -m benchmarks.search --sizes 10000 100000 --queries 200
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from sqlmodel import SQLModel, Session, create_engine, select
+
+from benchmarks.name_lookup import grow_players
+from database.search import SearchIndex
+from models.players import Player
+
+
+def time_queries(search, queries: list) -> float:
+    """
+    Run every query and return the mean latency in milliseconds.
+
+    :param search: Called with one query.
+    :param queries: The queries to run.
+    :return: Mean milliseconds per query.
+    """
+    start = time.perf_counter()
+    for query in queries:
+        search(query)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="sonzo-bench-"), "players.db")
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+    rng = random.Random(1)
+
+    print(f"{'players':>10}{'load s':>9}{'prefix ms':>11}{'typo ms':>10}{'LIKE ms':>10}")
+    size = 0
+    for target in sorted(args.sizes):
+        grow_players(engine, size, target)
+        size = target
+
+        with Session(engine) as session:
+            start = time.perf_counter()
+            index = SearchIndex("player")
+            index.load(session.exec(select(Player.id, Player.name, Player.description)).all())
+            load_s = time.perf_counter() - start
+
+            prefixes = [f"player_{rng.randrange(size)}"[:rng.randint(8, 12)] for _ in range(args.queries)]
+            # Swap two letters of "player" so only the trigram pass can match.
+            typos = [f"palyer_{rng.randrange(size)}" for _ in range(args.queries)]
+            prefix_ms = time_queries(lambda query: index.search(query, 10), prefixes)
+            typo_ms = time_queries(lambda query: index.search(query, 10), typos)
+            like_ms = time_queries(
+                lambda query: session.exec(
+                    select(Player.id).where(Player.name_key.like(f"%{query}%")).limit(10)).all(),
+                prefixes[:20])
+        print(f"{size:>10}{load_s:>9.2f}{prefix_ms:>11.3f}{typo_ms:>10.3f}{like_ms:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Worker startup benchmark.
+
+Grows a scratch database to each requested player count, then times the database step of a
+worker boot three ways:
+
+  full-load  - the old verify_game_data(), select(X).all() on all four tables.
+  probe      - verify_game_data() with EXISTS probes, as the first worker runs it.
+  stamped    - init_database() on an initialized database, as every later worker runs it.
+
+    python -m benchmarks.startup --sizes 10000 100000 1000000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from sqlmodel import Session, select
+
+from benchmarks.name_lookup import grow_players, player_count
+
+
+def full_load(db) -> None:
+    with Session(db.engine) as session:
+        for model in (db.Weapon, db.Armor, db.Player, db.Monster):
+            len(session.exec(select(model)).all())
+
+
+def probe(db) -> None:
+    with db.engine.connect() as connection:
+        db.verify_game_data(connection)
+
+
+def timed(func, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="sonzo-bench-")
+    os.environ["SONZO_DB_URL"] = f"sqlite:///{os.path.join(workdir, 'game_database.db')}"
+    from database import connections as db
+
+    db.init_database()
+
+    print(f"{'players':>10}{'full-load ms':>15}{'probe ms':>12}{'stamped ms':>13}")
+    size = player_count(db.engine)
+    for target in sorted(args.sizes):
+        grow_players(db.engine, size, target)
+        size = target
+        print(f"{size:>10}{timed(full_load, db):>15.1f}{timed(probe, db):>12.2f}{timed(db.init_database):>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+World tick benchmark.
+
+Fills a World with players at each requested size, --injured percent of them below their
+maximum health, and times --ticks ticks of regeneration and interest timers, against visiting
+every player once per tick as a plain loop over all players would.  Nothing is written to the
+database.  Usage:
+
+    python -m benchmarks.world --sizes 10000 100000 1000000 --ticks 3600
+"""
+
+import argparse
+import random
+import time
+
+from game.world import Vitals, World, max_health
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--ticks", type=int, default=3600)
+    parser.add_argument("--injured", type=float, default=10.0)
+    args = parser.parse_args()
+    rng = random.Random(1)
+
+    print(f"{'players':>10}{'load s':>9}{'timers':>10}{'fired/tick':>12}{'tick us':>10}{'scan us':>10}")
+    for size in args.sizes:
+        # Flushing is left out: it needs the event loop and the database.
+        world = World(tick_seconds=1, flush_seconds=10 ** 9)
+        start = time.perf_counter()
+        for player_id in range(1, size + 1):
+            level = rng.randint(1, 50)
+            injured = rng.random() * 100 < args.injured
+            health = rng.randint(1, max_health(level) - 1) if injured else max_health(level)
+            world._set(player_id, Vitals(level, health, rng.randrange(100000)))
+        load_s = time.perf_counter() - start
+        timers = len(world.wheel)
+
+        start = time.perf_counter()
+        for _ in range(args.ticks):
+            world.tick()
+        tick_us = (time.perf_counter() - start) / args.ticks * 1e6
+
+        players = world._players
+        start = time.perf_counter()
+        for _ in range(min(args.ticks, 10)):
+            for player_id, vitals in players.items():
+                if vitals.health < max_health(vitals.level):
+                    pass
+        scan_us = (time.perf_counter() - start) / min(args.ticks, 10) * 1e6
+
+        print(f"{size:>10}{load_s:>9.2f}{timers:>10}{world.fired / args.ticks:>12.1f}{tick_us:>10.1f}"
+              f"{scan_us:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Optional
+
+from sqlmodel import SQLModel
+
+
+class CatalogCache:
+    """
+    A bounded LRU cache of catalog rows (weapons, armor, monsters) keyed by id and normalized name.
+
+    Rows are loaded lazily by the caller on a miss.  Because a save can commit while a lookup is
+    still reading the old row, callers take the generation before querying and hand it back to
+    put(); any invalidation in between bumps the generation and the stale row is discarded.
+    """
+
+    def __init__(self, name: str, max_entries: int = 1024):
+        self.name = name
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._rows: "OrderedDict[int, SQLModel]" = OrderedDict()
+        self._ids_by_name: Dict[str, int] = {}
+        self._generation = 0
+        self._lock = Lock()
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get_by_id(self, entity_id: int) -> Optional[SQLModel]:
+        """
+        Return the cached row with this id, or None on a miss.
+
+        :param entity_id: The row id.
+        :return: The cached row if present.
+        """
+        with self._lock:
+            row = self._rows.get(entity_id)
+            if row is None:
+                self.misses += 1
+                return None
+            self._rows.move_to_end(entity_id)
+            self.hits += 1
+            return row
+
+    def get_by_name(self, name_key: str) -> Optional[SQLModel]:
+        """
+        Return the cached row with this normalized name, or None on a miss.
+
+        :param name_key: The normalized name.
+        :return: The cached row if present.
+        """
+        with self._lock:
+            entity_id = self._ids_by_name.get(name_key)
+            if entity_id is None:
+                self.misses += 1
+                return None
+            self._rows.move_to_end(entity_id)
+            self.hits += 1
+            return self._rows[entity_id]
+
+    def put(self, row: SQLModel, generation: int) -> None:
+        """
+        Store a row loaded from the database, unless it was invalidated while loading.
+
+        :param row: The row to cache.
+        :param generation: The cache generation read before the row was queried.
+        :return:
+        """
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._discard(row.id)
+            self._rows[row.id] = row
+            self._ids_by_name[row.name_key] = row.id
+            while len(self._rows) > self.max_entries:
+                _, evicted = self._rows.popitem(last=False)
+                self._ids_by_name.pop(evicted.name_key, None)
+                self.evictions += 1
+
+    def invalidate(self, entity_id: int) -> None:
+        """
+        Drop a row after its save has committed.
+
+        :param entity_id: The id of the saved row.
+        :return:
+        """
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            self._discard(int(entity_id))
+
+    def clear(self) -> None:
+        """
+        Drop every cached row.
+
+        :return:
+        """
+        with self._lock:
+            self._generation += 1
+            self._rows.clear()
+            self._ids_by_name.clear()
+
+    def stats(self) -> dict:
+        """
+        Return the cache counters.
+
+        :return: A dictionary of counters and the current size.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._rows),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+    def _discard(self, entity_id: int) -> None:
+        row = self._rows.pop(entity_id, None)
+        if row is not None:
+            self._ids_by_name.pop(row.name_key, None)
@@ -0,0 +1,216 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Cross-worker change feed.
+
+Each uvicorn worker keeps its own in-process caches, so a save committed by one worker has to
+reach the others.  The write queue records every row it updates in the change_log table, in
+the same transaction as the update, tagged with the writing process's origin token.  Every
+worker polls PRAGMA data_version on a connection of its own; the value only moves when another
+connection has committed, so an idle database costs one PRAGMA per poll and no reads.  When it
+moves, the worker reads the change_log rows after the last one it saw, skips its own and hands
+the rest to on_change as (table, entity id) pairs.
+
+change_log is pruned to the newest CHANGE_LOG_RETENTION rows.  A worker that falls further
+behind than that can no longer tell which keys changed, and calls on_reset instead.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+import asyncio
+import logging
+import os
+import uuid
+
+from sqlalchemy import Connection, Engine, delete, func, insert, select
+from sqlmodel import SQLModel, Field
+
+logger = logging.getLogger("database")
+
+CHANGE_POLL_INTERVAL = float(os.environ.get("SONZO_CHANGE_POLL_INTERVAL", "0.2"))
+CHANGE_LOG_RETENTION = int(os.environ.get("SONZO_CHANGE_LOG_RETENTION", "100000"))
+
+# Identifies this process's own writes in change_log.
+ORIGIN = uuid.uuid4().hex
+# The table_name of a record_reset() row.
+RESET_MARKER = "*"
+
+
+class ChangeLog(SQLModel, table=True):
+    __tablename__ = "change_log"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    table_name: str
+    entity_id: int
+    version: int
+    origin: str
+
+
+def record_changes(connection: Connection, changes: List[Tuple[str, int, int]]) -> None:
+    """
+    Append committed row changes to change_log, inside the caller's transaction.
+
+    :param connection: The connection holding the write transaction.
+    :param changes: (table name, entity id, new version) for every updated row.
+    :return:
+    """
+    if changes:
+        connection.execute(insert(ChangeLog.__table__), [
+            {"table_name": table, "entity_id": entity_id, "version": version, "origin": ORIGIN}
+            for table, entity_id, version in changes])
+
+
+def prune_changes(connection: Connection, retention: int = CHANGE_LOG_RETENTION) -> None:
+    """
+    Delete all but the newest `retention` change_log rows.
+
+    :param connection: The connection holding the write transaction.
+    :param retention: Rows to keep.
+    :return:
+    """
+    table = ChangeLog.__table__
+    newest = connection.execute(select(func.max(table.c.id))).scalar()
+    if newest is not None and newest > retention:
+        connection.execute(delete(table).where(table.c.id <= newest - retention))
+
+
+def record_reset(connection: Connection) -> None:
+    """
+    Make every worker drop its caches, for changes too broad to log row by row (a restore).
+
+    Every feed, including this process's own, resets when it reads the marker row.
+
+    :param connection: The connection holding the write transaction.
+    :return:
+    """
+    connection.execute(insert(ChangeLog.__table__).values(table_name=RESET_MARKER, entity_id=0, version=0,
+                                                          origin=ORIGIN))
+
+
+class ChangeFeed:
+    """
+    Polls for rows other workers have changed and reports them on the event loop.
+    """
+
+    def __init__(self, engine: Engine, on_change: Callable[[str, int], None], on_reset: Callable[[], None],
+                 interval: float = CHANGE_POLL_INTERVAL):
+        self.engine = engine
+        self.on_change = on_change
+        self.on_reset = on_reset
+        self.interval = interval
+        self.polls = 0
+        self.changes = 0
+        self.resets = 0
+        self.last_id = 0
+        self._connection: Optional[Connection] = None
+        self._data_version: Optional[int] = None
+        # data_version is per connection, so every poll must run on the same connection and thread.
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sonzo-changes")
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """
+        Start polling.  Only changes committed from now on are reported.
+
+        :return:
+        """
+        if self._task is None:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._open)
+            self._task = asyncio.get_running_loop().create_task(self._run(), name="sonzo-changes")
+
+    async def close(self) -> None:
+        """
+        Stop polling and close the feed's connection.
+
+        :return:
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._close)
+
+    async def poll(self) -> int:
+        """
+        Check once for changes and report them.
+
+        :return: The number of changes reported.
+        """
+        changes, reset = await asyncio.get_running_loop().run_in_executor(self._executor, self._read)
+        self.polls += 1
+        if reset:
+            self.resets += 1
+            logger.warning("Fell behind the change log; dropping every cached row.")
+            self.on_reset()
+        for table, entity_id in changes:
+            try:
+                self.on_change(table, entity_id)
+            except Exception:
+                logger.exception("Change listener failed for %s %d.", table, entity_id)
+        self.changes += len(changes)
+        return len(changes)
+
+    def stats(self) -> dict:
+        return {"polls": self.polls, "changes": self.changes, "resets": self.resets, "last_id": self.last_id}
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.poll()
+            except Exception:
+                logger.exception("Polling the change log failed.")
+            await asyncio.sleep(self.interval)
+
+    def _open(self) -> None:
+        self._connection = self.engine.connect()
+        self._data_version = self._connection.exec_driver_sql("PRAGMA data_version").scalar()
+        self.last_id = self._connection.execute(select(func.max(ChangeLog.__table__.c.id))).scalar() or 0
+        self._connection.rollback()
+
+    def _close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _read(self) -> Tuple[List[Tuple[str, int]], bool]:
+        connection = self._connection
+        data_version = connection.exec_driver_sql("PRAGMA data_version").scalar()
+        if data_version == self._data_version:
+            connection.rollback()
+            return [], False
+        self._data_version = data_version
+
+        table = ChangeLog.__table__
+        rows = connection.execute(
+            select(table.c.id, table.c.table_name, table.c.entity_id, table.c.origin)
+            .where(table.c.id > self.last_id).order_by(table.c.id)).all()
+        connection.rollback()
+        # Ids are contiguous, so a hole means the rows in it were pruned before we read them.
+        previous = self.last_id
+        reset = False
+        for row in rows:
+            if row.id != previous + 1 or row.table_name == RESET_MARKER:
+                reset = True
+            previous = row.id
+        self.last_id = previous
+        # One report per row, however many times it changed since the last poll.
+        changes = dict.fromkeys((row.table_name, row.entity_id) for row in rows
+                                if row.origin != ORIGIN and row.table_name != RESET_MARKER)
+        return list(changes), reset
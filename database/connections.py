@@ -16,68 +16,167 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
-from os.path import exists
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import asyncio
 import logging
+import os
 
-from sqlmodel import SQLModel, select, create_engine, Session, func
+from sqlalchemy import Connection, exists
+from sqlalchemy.orm import joinedload, selectinload
+from sqlmodel import SQLModel, select, Session
 
 from models.weapons import Weapon
 from models.armor import Armor
 from models.players import Player
 from models.monsters import Monster
+from models.names import normalize_name, name_key_values
 
-from mock_data.weapons import weapons_list
-from mock_data.armor import armor_list
-from mock_data.players import players_list
-from mock_data.monsters import monsters_list
+from database.migrations import migrate_admin_flag, migrate_name_keys, migrate_row_versions
+from database.cache import CatalogCache
+from database.search import SearchHit, SearchIndex
+from database.writer import StaleVersionError, WriteQueue
+from database.changes import ChangeFeed
+from database.dump import import_dump, import_records, iter_ndjson, read_ndjson
+from database.engine import create_game_engine
 
-from typing import List
+from pydantic import TypeAdapter
 
 
-def verify_game_data() -> None:
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Callable, Optional, Sequence, Tuple, Type, TypeVar
+
+T = TypeVar("T")
+
+# The rows a new database starts with, as written by `python -m database.dump export`.
+SEED_DUMP = os.environ.get("SONZO_SEED_DUMP", os.path.normpath(
+    os.path.join(os.path.dirname(__file__), "..", "mock_data", "game_data.ndjson")))
+
+# Bump whenever init_database() gains a migration so existing databases run it once.
+SCHEMA_VERSION = 5
+
+
+def _is_empty(session: Session, model: Type[SQLModel]) -> bool:
+    return not session.exec(select(exists(select(model.id)))).one()
+
+
+def verify_game_data(connection: Connection) -> None:
     """
-    Verify the database contains the game data.
-    
-    :return: 
+    Verify the database contains the game data, seeding any empty table from SEED_DUMP.
+
+    Each table is checked with an EXISTS probe, so the cost does not grow with the row count.
+
+    :param connection: The connection holding the initialization transaction.
+    :return:
     """
     logger.info("Verifying game data in the database...")
+    with Session(bind=connection) as session:
+        empty = {model.__tablename__ for model in (Weapon, Armor, Player, Monster) if _is_empty(session, model)}
+    if empty:
+        logger.info("Seeding %s from %s.", ", ".join(sorted(empty)), SEED_DUMP)
+        with open(SEED_DUMP, "r", encoding="utf-8") as f:
+            import_records(connection, read_ndjson(f), tables=empty)
+
+
+def init_database() -> None:
+    """
+    Create the schema, run migrations and seed the game data.
+
+    Called from the application lifespan rather than at import time.  The work is stamped into
+    SQLite's user_version, so only the first worker to boot against a database does it; the rest
+    see the stamp and return after a single PRAGMA.  BEGIN IMMEDIATE takes the database write
+    lock, so workers booting at the same moment wait for the first one instead of racing it.
+
+    :return:
+    """
+    with engine.connect() as connection:
+        if connection.exec_driver_sql("PRAGMA user_version").scalar() >= SCHEMA_VERSION:
+            logger.info("Game database is already initialized.")
+            return
+
+    with engine.connect() as connection:
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+        if connection.exec_driver_sql("PRAGMA user_version").scalar() >= SCHEMA_VERSION:
+            logger.info("Game database was initialized by another worker.")
+            connection.rollback()
+            return
+
+        logger.info("Initializing game database.")
+        SQLModel.metadata.create_all(bind=connection)
+        migrate_name_keys(connection)
+        migrate_row_versions(connection, (Player, Monster, Armor, Weapon))
+        migrate_admin_flag(connection)
+        verify_game_data(connection)
+        connection.exec_driver_sql(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        connection.commit()
+
+
+################################################################
+# Database Executor
+################################################################
+# SQLModel sessions are synchronous, so every query runs on this bounded pool of
+# threads rather than on the event loop.  Each call opens its own Session.
+DB_WORKERS = int(os.environ.get("SONZO_DB_WORKERS", "4"))
+db_executor = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix="sonzo-db")
+
+
+async def run_in_db_thread(func: Callable[..., T], *args) -> T:
+    """
+    Run a blocking database function on the database executor.
+
+    :param func: The synchronous function to run.
+    :param args: Positional arguments for the function.
+    :return: Whatever the function returns.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_executor, partial(func, *args))
+
+
+def equipment_options(model: Type[SQLModel], loader: Callable = joinedload) -> list:
+    """
+    Loader options that fetch a player's or monster's weapon and armor with the row itself.
+
+    joinedload adds both items to the row's own SELECT, which suits single lookups;
+    selectinload fetches them for a whole batch with one extra SELECT per item table.
+
+    :param model: The table model being queried.
+    :param loader: joinedload or selectinload.
+    :return: The options, empty for models without equipment.
+    """
+    if model is Player or model is Monster:
+        return [loader(model.equipped_weapon), loader(model.equipped_armor)]
+    return []
+
+
+def _get_all_rows(model: Type[T]) -> List[T]:
+    """
+    Retrieve every row of a small table, such as one of the catalogs.
+
+    :param model: The table model to query.
+    :return: A list of all rows.
+    """
     with Session(engine) as session:
-        weapon_statement = select(Weapon)
-        armor_statement = select(Armor)
-        player_statement = select(Player)
-        monster_statement = select(Monster)
-        weapon_result = session.exec(weapon_statement)
-        armor_result = session.exec(armor_statement)
-        player_result = session.exec(player_statement)
-        monster_result = session.exec(monster_statement)
-
-        w_count = len(weapon_result.all())
-        a_count = len(armor_result.all())
-        p_count = len(player_result.all())
-        m_count = len(monster_result.all())
-
-        if w_count == 0:
-            logger.info("Injecting game weapons to the database.")
-            session.add_all(weapons_list)
-        if a_count == 0:
-            logger.info("Injecting game armor in the database.")
-            session.add_all(armor_list)
-        if p_count == 0:
-            logger.info("Injecting mock players in the database.")
-            session.add_all(players_list)
-        if m_count == 0:
-            logger.info("Injecting game monsters in the database.")
-            session.add_all(monsters_list)
-
-        session.commit()
+        return list(session.exec(select(model).order_by(model.id)).all())
 
 
-async def get_all_players() -> List[Player]:
+def _get_all_rows_together(models: Sequence[Type[SQLModel]]) -> List[list]:
     """
-    Retrieve a player from the database by their name.
+    Retrieve every row of several small tables, all as of the same commit.
 
-    :param name: The name of the player.
-    :return: The player object if found, None otherwise.
+    :param models: The table models to query.
+    :return: A list of all rows for each model, in order.
+    """
+    with Session(engine) as session:
+        # SQLite only holds one read snapshot across statements inside an explicit transaction.
+        session.connection().exec_driver_sql("BEGIN")
+        return [list(session.exec(select(model).order_by(model.id)).all()) for model in models]
+
+
+def _get_all_players() -> List[Player]:
+    """
+    Retrieve every player from the database.
+
+    :return: A list of all player objects.
     """
     with Session(engine) as session:
         statement = select(Player)
@@ -87,7 +186,7 @@ async def get_all_players() -> List[Player]:
     return players
 
 
-async def lookup_player_by_username(name: str):
+def _lookup_player_by_username(name: str):
     """
     Retrieve a player from the database by their username.
 
@@ -95,14 +194,14 @@ async def lookup_player_by_username(name: str):
     :return: The player object if found, None otherwise.
     """
     with Session(engine) as session:
-        statement = select(Player).where(func.lower(Player.username) == name.lower())
+        statement = select(Player).where(Player.username_key == normalize_name(name)).options(*equipment_options(Player))
         result = session.exec(statement)
         player = result.first()
 
     return player
 
 
-async def lookup_player_by_name(name: str):
+def _lookup_player_by_name(name: str):
     """
     Retrieve a player from the database by their name.
 
@@ -110,14 +209,14 @@ async def lookup_player_by_name(name: str):
     :return: The player object if found, None otherwise.
     """
     with Session(engine) as session:
-        statement = select(Player).where(func.lower(Player.name) == name.lower())
+        statement = select(Player).where(Player.name_key == normalize_name(name)).options(*equipment_options(Player))
         result = session.exec(statement)
         player = result.first()
 
     return player
 
 
-async def lookup_monster_by_name(name: str):
+def _lookup_monster_by_name(name: str):
     """
     Retrieve a monster from the database by their name.
 
@@ -125,14 +224,14 @@ async def lookup_monster_by_name(name: str):
     :return: The monster object if found, None otherwise.
     """
     with Session(engine) as session:
-        statement = select(Monster).where(func.lower(Monster.name) == name.lower())
+        statement = select(Monster).where(Monster.name_key == normalize_name(name)).options(*equipment_options(Monster))
         result = session.exec(statement)
         monster = result.first()
 
     return monster
 
 
-async def lookup_armor_by_name(name: str):
+def _lookup_armor_by_name(name: str):
     """
     Retrieve a armor from the database by it's name.
 
@@ -140,14 +239,14 @@ async def lookup_armor_by_name(name: str):
     :return: The armor object if found, None otherwise.
     """
     with Session(engine) as session:
-        statement = select(Armor).where(func.lower(Armor.name) == name.lower())
+        statement = select(Armor).where(Armor.name_key == normalize_name(name))
         result = session.exec(statement)
         armor = result.first()
 
     return armor
 
 
-async def lookup_weapon_by_name(name: str):
+def _lookup_weapon_by_name(name: str):
     """
     Retrieve a weapon from the database by it's name.
 
@@ -155,88 +254,661 @@ async def lookup_weapon_by_name(name: str):
     :return: The weapon object if found, None otherwise.
     """
     with Session(engine) as session:
-        statement = select(Weapon).where(func.lower(Weapon.name) == name.lower())
+        statement = select(Weapon).where(Weapon.name_key == normalize_name(name))
         result = session.exec(statement)
         weapon = result.first()
 
     return weapon
 
+
+def _lookup_by_id(model: Type[T], entity_id: int) -> Optional[T]:
+    """
+    Retrieve a row from the database by its primary key.
+
+    :param model: The table model to query.
+    :param entity_id: The id of the row.
+    :return: The row if found, None otherwise.  Players and monsters come with their equipment.
+    """
+    with Session(engine) as session:
+        return session.get(model, entity_id, options=equipment_options(model))
+
+
+def _page_rows(model: Type[T], after_id: int, limit: int) -> List[T]:
+    """
+    Retrieve the next page of rows after an id, in id order.
+
+    :param model: The table model to query.
+    :param after_id: Only rows with a larger id are returned.
+    :param limit: The maximum number of rows.
+    :return: The rows on the page.
+    """
+    with Session(engine) as session:
+        statement = select(model).where(model.id > after_id).order_by(model.id).limit(limit)
+        return list(session.exec(statement).all())
+
+
+def _lookup_rows_by_ids(model: Type[T], ids: Sequence[int], with_equipment: bool = False) -> List[T]:
+    """
+    Retrieve the rows with any of the given ids, in id order.
+
+    :param model: The table model to query.
+    :param ids: The ids to fetch.
+    :param with_equipment: Also load the weapon and armor of players or monsters, batched.
+    :return: The rows that exist.
+    """
+    with Session(engine) as session:
+        statement = select(model).where(model.id.in_(ids)).order_by(model.id)
+        if with_equipment:
+            statement = statement.options(*equipment_options(model, selectinload))
+        return list(session.exec(statement).all())
+
+
+def _search_documents(model: Type[SQLModel]) -> List[Tuple[int, str, str]]:
+    """
+    Retrieve only the columns the search index needs.
+
+    :param model: The table model to query.
+    :return: (id, name, description) for every row.
+    """
+    with Session(engine) as session:
+        return list(session.exec(select(model.id, model.name, model.description)).all())
+
+def _player_standings(ids: Optional[Sequence[int]] = None) -> List[Tuple[int, int, int, int, int]]:
+    """
+    Retrieve only the columns the leaderboards rank by.
+
+    :param ids: Only these players, or every player if None.
+    :return: (id, level, exp, gold, bank) for each player.
+    """
+    with Session(engine) as session:
+        statement = select(Player.id, Player.level, Player.exp, Player.gold, Player.bank)
+        if ids is not None:
+            statement = statement.where(Player.id.in_(ids))
+        return [tuple(row) for row in session.exec(statement).all()]
+
+
+def _player_vitals(ids: Optional[Sequence[int]] = None) -> List[Tuple[int, int, int, int, int]]:
+    """
+    Retrieve only the columns the world ticks change, and the row version.
+
+    :param ids: Only these players, or every player if None.
+    :return: (id, level, health, bank, version) for each player.
+    """
+    with Session(engine) as session:
+        statement = select(Player.id, Player.level, Player.health, Player.bank, Player.version)
+        if ids is not None:
+            statement = statement.where(Player.id.in_(ids))
+        return [tuple(row) for row in session.exec(statement).all()]
+
+
+def _catalog_columns(model: Type[SQLModel], columns: Sequence[str]) -> List[tuple]:
+    """
+    Retrieve only the given columns of every row, without building model instances.
+
+    :param model: The table model to query.
+    :param columns: The column names to read after the id.
+    :return: (id, *columns) for every row, in id order.
+    """
+    with Session(engine) as session:
+        statement = select(model.id, *(getattr(model, column) for column in columns)).order_by(model.id)
+        return [tuple(row) for row in session.exec(statement).all()]
+
 ################################################################
 # Save Objects to Database
 ################################################################
+# Saves go through a single writer that merges queued edits per row and commits them in batches.
+
+@lru_cache(maxsize=None)
+def _field_adapter(model: Type[SQLModel], field: str) -> TypeAdapter:
+    return TypeAdapter(model.model_fields[field].annotation)
 
-async def save_player(updated_player: Player) -> None:
+
+def _changed_values(model: Type[SQLModel], updated: SQLModel) -> dict:
     """
-    Save a player to the database.
+    Collect the column values set on an updated object, coerced to the model's field types.
 
-    :param player: The player object to save.
+    Objects bound from explorer forms are table models, which pydantic does not validate, so
+    their fields still hold the raw form strings.
+
+    :param model: The table model.
+    :param updated: The object carrying the new values.
+    :return: Column values to write, including refreshed name keys.
+    """
+    values = {field: _field_adapter(model, field).validate_python(getattr(updated, field))
+              for field in updated.model_fields_set}
+    values.pop("id", None)
+    values.pop("version", None)
+    return name_key_values(model, values)
+
+
+# Called as listener(model, entity_id, values) on the event loop after each save has committed.
+# values is None when another worker made the change, since only the row id is known.
+SaveListener = Callable[[Type[SQLModel], int, Optional[dict]], None]
+_save_listeners: List[SaveListener] = []
+# Called with no arguments when changes may have been missed and every cached row is suspect.
+_reset_listeners: List[Callable[[], None]] = []
+
+
+def add_save_listener(listener: SaveListener) -> None:
+    """
+    Register a callback to run after every committed save_*.
+
+    Listeners run on the event loop and must not block; anything slow should be scheduled as
+    a task.
+
+    :param listener: Called with the model class, the row id and the column values written,
+                     or None for another worker's save.
     :return:
     """
-    with Session(engine) as session:
-        statement = select(Player).where(Player.id == updated_player.id)
-        result = session.exec(statement)
-        player = result.one()
+    _save_listeners.append(listener)
 
-        player.sqlmodel_update(updated_player)
-        session.add(player)
-        session.commit()
 
+def add_reset_listener(listener: Callable[[], None]) -> None:
+    """
+    Register a callback that drops everything cached, for when saves may have been missed.
 
-async def save_monster(updated_monster: Monster) -> None:
+    :param listener: Called with no arguments on the event loop.
+    :return:
     """
-    Save a monster to the database.
+    _reset_listeners.append(listener)
+
 
-    :param monster: The monster object to save.
+def notify_saved(model: Type[SQLModel], entity_id: int, values: Optional[dict]) -> None:
+    """
+    Tell every save listener that a row has changed.
+
+    :param model: The model class of the changed row.
+    :param entity_id: The id of the changed row.
+    :param values: The column values that were written, or None if they are unknown.
     :return:
     """
-    with Session(engine) as session:
-        statement = select(Monster).where(Monster.id == updated_monster.id)
-        result = session.exec(statement)
-        monster = result.one()
+    for listener in _save_listeners:
+        try:
+            listener(model, entity_id, values)
+        except Exception:
+            logger.exception("Save listener %r failed.", listener)
 
-        monster.sqlmodel_update(updated_monster)
-        session.add(monster)
-        session.commit()
 
+def notify_reset() -> None:
+    """
+    Tell every reset listener to drop its cached rows.
+
+    :return:
+    """
+    for listener in _reset_listeners:
+        try:
+            listener()
+        except Exception:
+            logger.exception("Reset listener %r failed.", listener)
+
+
+async def _save(model: Type[SQLModel], updated: SQLModel, expected_version: Optional[int]) -> int:
+    entity_id = _field_adapter(model, "id").validate_python(updated.id)
+    values = _changed_values(model, updated)
+    version = await write_queue.submit(model, entity_id, values, expected_version)
+    notify_saved(model, entity_id, {**values, "version": version})
+    return version
+
+################################################################
+# Catalog Cache
+################################################################
+# Weapons, armor and monsters are small and read-mostly, so lookups go through an in-process
+# LRU cache that each save_* invalidates once its commit has finished.  Cached monsters carry
+# their equipment, so saving any weapon or armor drops every cached monster.
+CATALOG_CACHE_SIZE = int(os.environ.get("SONZO_CATALOG_CACHE_SIZE", "1024"))
+weapon_cache = CatalogCache("weapon", CATALOG_CACHE_SIZE)
+armor_cache = CatalogCache("armor", CATALOG_CACHE_SIZE)
+monster_cache = CatalogCache("monster", CATALOG_CACHE_SIZE)
+
+
+async def _cached_lookup_by_name(cache: CatalogCache, lookup: Callable[[str], T], name: str) -> Optional[T]:
+    row = cache.get_by_name(normalize_name(name))
+    if row is None:
+        generation = cache.generation
+        row = await run_in_db_thread(lookup, name)
+        if row is not None:
+            cache.put(row, generation)
+    return row
+
+
+async def _cached_lookup_by_id(cache: CatalogCache, model: Type[T], entity_id: int) -> Optional[T]:
+    row = cache.get_by_id(entity_id)
+    if row is None:
+        generation = cache.generation
+        row = await run_in_db_thread(_lookup_by_id, model, entity_id)
+        if row is not None:
+            cache.put(row, generation)
+    return row
+
+catalog_caches = {Weapon: weapon_cache, Armor: armor_cache, Monster: monster_cache}
+
+
+def _invalidate_catalog_cache(model: Type[SQLModel], entity_id: int, values: Optional[dict]) -> None:
+    cache = catalog_caches.get(model)
+    if cache is not None:
+        cache.invalidate(entity_id)
+    if model is Weapon or model is Armor:
+        monster_cache.clear()
+
+
+add_save_listener(_invalidate_catalog_cache)
+
+def _clear_catalog_caches() -> None:
+    for cache in catalog_caches.values():
+        cache.clear()
 
-async def save_armor(updated_armor: Armor) -> None:
+
+add_reset_listener(_clear_catalog_caches)
+
+
+def catalog_cache_stats() -> dict:
+    """
+    Report hit/miss counters for every catalog cache.
+
+    :return: Cache statistics keyed by catalog name.
+    """
+    return {cache.name: cache.stats() for cache in catalog_caches.values()}
+
+################################################################
+# Search Index
+################################################################
+# Names and descriptions are searched in memory.  Each index is loaded on first use and then
+# kept current by the save listener, one document at a time.
+search_indexes: Dict[Type[SQLModel], SearchIndex] = {
+    Player: SearchIndex("player"),
+    Monster: SearchIndex("monster"),
+    Weapon: SearchIndex("weapon"),
+    Armor: SearchIndex("armor"),
+}
+_search_generations = {model: 0 for model in search_indexes}
+_search_ready = set()
+# One per table, so loading a large index doesn't hold up the first search of a small one.
+_search_locks = {model: asyncio.Lock() for model in search_indexes}
+
+
+async def _ensure_search_index(model: Type[SQLModel]) -> SearchIndex:
+    index = search_indexes[model]
+    if model not in _search_ready:
+        async with _search_locks[model]:
+            while model not in _search_ready:
+                # A save that commits while the rows load would be lost, so load again.
+                generation = _search_generations[model]
+                rows = await run_in_db_thread(_search_documents, model)
+                if generation == _search_generations[model]:
+                    index.load(rows)
+                    _search_ready.add(model)
+                    logger.info("Loaded %d rows into the %s search index.", len(index), index.name)
+    return index
+
+
+async def _reindex_row(model: Type[SQLModel], entity_id: int) -> None:
+    row = await run_in_db_thread(_lookup_by_id, model, entity_id)
+    if row is None:
+        search_indexes[model].remove(entity_id)
+    else:
+        search_indexes[model].update(entity_id, row.name, row.description)
+
+
+def _update_search_index(model: Type[SQLModel], entity_id: int, values: Optional[dict]) -> None:
+    index = search_indexes.get(model)
+    if index is None:
+        return
+    if values is not None and "name" not in values and "description" not in values:
+        return
+    # Only saves that touch indexed text make a load in progress start over.
+    _search_generations[model] += 1
+    if model not in _search_ready:
+        return
+    current = index.get(entity_id)
+    if current is None or values is None:
+        asyncio.get_running_loop().create_task(_reindex_row(model, entity_id))
+        return
+    name, description = current
+    index.update(entity_id, values.get("name", name), values.get("description", description))
+
+
+def _reset_search_indexes() -> None:
+    # Reloaded from the database on their next search.
+    for model in search_indexes:
+        _search_generations[model] += 1
+    _search_ready.clear()
+
+
+add_save_listener(_update_search_index)
+add_reset_listener(_reset_search_indexes)
+
+
+def search_index_stats() -> dict:
+    """
+    Report counters for every search index.
+
+    :return: Index statistics keyed by table name.
+    """
+    return {index.name: index.stats() for index in search_indexes.values()}
+
+################################################################
+# Async Data-Access API
+################################################################
+
+async def get_all_rows(model: Type[T]) -> List[T]:
+    """
+    Retrieve every row of a small table, such as one of the catalogs.
+
+    :param model: The table model to query.
+    :return: A list of all rows.
+    """
+    return await run_in_db_thread(_get_all_rows, model)
+
+
+async def get_all_rows_together(models: Sequence[Type[SQLModel]]) -> List[list]:
+    """
+    Retrieve every row of several small tables in one read, so they agree with each other.
+
+    :param models: The table models to query.
+    :return: A list of all rows for each model, in order.
+    """
+    return await run_in_db_thread(_get_all_rows_together, list(models))
+
+
+async def get_all_players() -> List[Player]:
+    """
+    Retrieve every player from the database.
+
+    :return: A list of all player objects.
+    """
+    return await run_in_db_thread(_get_all_players)
+
+
+async def page_rows(model: Type[T], after_id: int = 0, limit: int = 100) -> List[T]:
+    """
+    Retrieve one keyset page of rows: the first `limit` rows with an id above `after_id`.
+
+    :param model: The table model to query.
+    :param after_id: The last id of the previous page, 0 for the first page.
+    :param limit: The page size.
+    :return: The rows on the page.
+    """
+    return await run_in_db_thread(_page_rows, model, after_id, limit)
+
+
+async def lookup_rows_by_ids(model: Type[T], ids: Sequence[int], with_equipment: bool = False) -> List[T]:
+    """
+    Retrieve a batch of rows by id in one query.
+
+    :param model: The table model to query.
+    :param ids: The ids to fetch.
+    :param with_equipment: Also load the weapon and armor of players or monsters, batched.
+    :return: The rows that exist, in id order.
+    """
+    return await run_in_db_thread(_lookup_rows_by_ids, model, list(ids), with_equipment)
+
+
+async def stream_rows(model: Type[T], after_id: int = 0, batch_size: int = 500) -> AsyncIterator[List[T]]:
+    """
+    Walk a whole table in id order, one keyset page at a time, so only one batch is held in memory.
+
+    :param model: The table model to query.
+    :param after_id: Start after this id.
+    :param batch_size: Rows per page.
+    :return: An async iterator of row batches.
+    """
+    while True:
+        rows = await page_rows(model, after_id, batch_size)
+        if not rows:
+            return
+        yield rows
+        after_id = rows[-1].id
+
+
+async def get_player_standings(ids: Optional[Sequence[int]] = None) -> List[Tuple[int, int, int, int, int]]:
+    """
+    Retrieve the level, experience, gold and bank of players without loading whole rows.
+
+    :param ids: Only these players, or every player if None.
+    :return: (id, level, exp, gold, bank) for each player.
+    """
+    return await run_in_db_thread(_player_standings, ids)
+
+
+async def get_player_vitals(ids: Optional[Sequence[int]] = None) -> List[Tuple[int, int, int, int, int]]:
+    """
+    Retrieve the level, health, bank and version of players without loading whole rows.
+
+    :param ids: Only these players, or every player if None.
+    :return: (id, level, health, bank, version) for each player.
+    """
+    return await run_in_db_thread(_player_vitals, ids)
+
+
+async def get_catalog_columns(model: Type[SQLModel], columns: Sequence[str]) -> List[tuple]:
+    """
+    Retrieve a few columns of every row of a catalog table without loading whole rows.
+
+    :param model: The table model to query.
+    :param columns: The column names to read after the id.
+    :return: (id, *columns) for every row, in id order.
+    """
+    return await run_in_db_thread(_catalog_columns, model, columns)
+
+
+async def lookup_player_by_username(name: str):
+    """
+    Retrieve a player from the database by their username.
+
+    :param name: The username of the player.
+    :return: The player object if found, None otherwise.
+    """
+    return await run_in_db_thread(_lookup_player_by_username, name)
+
+
+async def lookup_player_by_name(name: str):
+    """
+    Retrieve a player from the database by their name.
+
+    :param name: The name of the player.
+    :return: The player object if found, None otherwise.
+    """
+    return await run_in_db_thread(_lookup_player_by_name, name)
+
+
+async def lookup_monster_by_name(name: str):
+    """
+    Retrieve a monster from the database by their name.
+
+    :param name: The name of the monster.
+    :return: The monster object if found, None otherwise.
+    """
+    return await _cached_lookup_by_name(monster_cache, _lookup_monster_by_name, name)
+
+
+async def lookup_monster_by_id(monster_id: int) -> Optional[Monster]:
+    """
+    Retrieve a monster from the database by its id.
+
+    :param monster_id: The id of the monster.
+    :return: The monster object if found, None otherwise.
+    """
+    return await _cached_lookup_by_id(monster_cache, Monster, monster_id)
+
+
+async def lookup_armor_by_name(name: str):
+    """
+    Retrieve a armor from the database by it's name.
+
+    :param name: The name of the armor.
+    :return: The armor object if found, None otherwise.
+    """
+    return await _cached_lookup_by_name(armor_cache, _lookup_armor_by_name, name)
+
+
+async def lookup_armor_by_id(armor_id: int) -> Optional[Armor]:
+    """
+    Retrieve an armor from the database by its id.
+
+    :param armor_id: The id of the armor.
+    :return: The armor object if found, None otherwise.
+    """
+    return await _cached_lookup_by_id(armor_cache, Armor, armor_id)
+
+
+async def lookup_weapon_by_name(name: str):
+    """
+    Retrieve a weapon from the database by it's name.
+
+    :param name: The name of the weapon.
+    :return: The weapon object if found, None otherwise.
+    """
+    return await _cached_lookup_by_name(weapon_cache, _lookup_weapon_by_name, name)
+
+
+async def lookup_weapon_by_id(weapon_id: int) -> Optional[Weapon]:
+    """
+    Retrieve a weapon from the database by its id.
+
+    :param weapon_id: The id of the weapon.
+    :return: The weapon object if found, None otherwise.
+    """
+    return await _cached_lookup_by_id(weapon_cache, Weapon, weapon_id)
+
+
+async def save_player(updated_player: Player, expected_version: Optional[int] = None) -> int:
+    """
+    Save a player to the database.
+
+    :param updated_player: The player object to save.
+    :param expected_version: Only save if the row is still at this version, else raise StaleVersionError.
+    :return: The row's new version.
+    """
+    return await _save(Player, updated_player, expected_version)
+
+
+async def save_monster(updated_monster: Monster, expected_version: Optional[int] = None) -> int:
+    """
+    Save a monster to the database.
+
+    :param updated_monster: The monster object to save.
+    :param expected_version: Only save if the row is still at this version, else raise StaleVersionError.
+    :return: The row's new version.
+    """
+    return await _save(Monster, updated_monster, expected_version)
+
+
+async def save_armor(updated_armor: Armor, expected_version: Optional[int] = None) -> int:
     """
     Save an armor to the database.
 
-    :param armor: The armor object to save.
-    :return:
+    :param updated_armor: The armor object to save.
+    :param expected_version: Only save if the row is still at this version, else raise StaleVersionError.
+    :return: The row's new version.
     """
-    with Session(engine) as session:
-        logger.info(f"Looking up armor by id: {updated_armor.id} in {Armor.id}")
-        statement = select(Armor).where(Armor.id == updated_armor.id)
-        result = session.exec(statement)
-        armor = result.one()
+    return await _save(Armor, updated_armor, expected_version)
 
-        armor.sqlmodel_update(updated_armor)
-        session.add(armor)
-        session.commit()
 
+async def save_weapon(updated_weapon: Weapon, expected_version: Optional[int] = None) -> int:
+    """
+    Save a weapon to the database.
 
-async def save_weapon(updated_weapon: Weapon) -> None:
+    :param updated_weapon: The weapon object to save.
+    :param expected_version: Only save if the row is still at this version, else raise StaleVersionError.
+    :return: The row's new version.
     """
-    Save an weapon to the database.
+    return await _save(Weapon, updated_weapon, expected_version)
 
-    :param weapon: The weapon object to save.
-    :return:
+
+async def save_player_password(player_id: int, hashed: str) -> int:
     """
-    with Session(engine) as session:
-        statement = select(Weapon).where(Weapon.id == updated_weapon.id)
-        result = session.exec(statement)
-        weapon = result.one()
+    Store a new password hash for a player, whatever version the row is at.
+
+    :param player_id: The id of the player.
+    :param hashed: The password hash.
+    :return: The row's new version.
+    """
+    version = await write_queue.submit(Player, player_id, {"password": hashed})
+    notify_saved(Player, player_id, {"password": hashed, "version": version})
+    return version
+
+
+async def save_row_values(model: Type[SQLModel], updates: Dict[int, dict],
+                          expected_versions: Optional[Dict[int, int]] = None,
+                          bump_version: bool = True) -> Dict[int, int]:
+    """
+    Write column values to many rows of one table.
+
+    Every row is queued at once, so the write queue commits them in as few batches as it can.
+    A row that is no longer at its expected version is left out of the result, as is a row that
+    fails for any other reason (say, deleted meanwhile), which is also logged.
+
+    :param model: The table model of the rows.
+    :param updates: Column values to write, already of the columns' types, by row id.
+    :param expected_versions: Only write a row if it is still at this version, by row id.
+    :param bump_version: Increment the rows' versions (see WriteQueue.submit).
+    :return: The version of every row that was written, by row id.
+    """
+    expected_versions = expected_versions or {}
+    futures = [write_queue.submit(model, entity_id, values, expected_versions.get(entity_id), bump_version)
+               for entity_id, values in updates.items()]
+    versions = {}
+    for (entity_id, values), result in zip(updates.items(), await asyncio.gather(*futures, return_exceptions=True)):
+        if isinstance(result, StaleVersionError):
+            continue
+        if isinstance(result, Exception):
+            logger.warning("Could not write %s %d: %s", model.__tablename__, entity_id, result)
+            continue
+        versions[entity_id] = result
+        notify_saved(model, entity_id, {**values, "version": result})
+    return versions
+
+
+def export_ndjson_dump() -> Iterator[str]:
+    """
+    Stream every table as an NDJSON dump from one snapshot (see database.dump).
+
+    A plain iterator: it blocks while it reads, so iterate it off the event loop.
+
+    :return: An iterator of text chunks.
+    """
+    return iter_ndjson(engine)
+
+
+async def import_ndjson_dump(lines: Iterable[str], replace: bool = False) -> Dict[str, int]:
+    """
+    Import an NDJSON dump in one transaction.  Every worker drops its caches afterwards.
+
+    :param lines: The dump's lines.
+    :param replace: Delete every existing row of the tables the dump has records for.
+    :return: Rows inserted, by table.
+    """
+    return await run_in_db_thread(import_dump, engine, read_ndjson(lines), replace)
 
-        weapon.sqlmodel_update(updated_weapon)
-        session.add(weapon)
-        session.commit()
+
+async def search_rows(model: Type[SQLModel], query: str, limit: int = 10) -> List[SearchHit]:
+    """
+    Ranked prefix and typo-tolerant search over the names and descriptions of a table.
+
+    Only the first search of a table touches the database.
+
+    :param model: The table model to search.
+    :param query: The text typed so far.
+    :param limit: The maximum number of hits.
+    :return: Hits, best first.
+    """
+    index = await _ensure_search_index(model)
+    return index.search(query, limit)
 
 ################################################################
 # Initialize Game Database
 ################################################################
 logger = logging.getLogger("database")
-engine = create_engine("sqlite:///game_database.db", echo=False)
-SQLModel.metadata.create_all(bind=engine)
-verify_game_data()
\ No newline at end of file
+engine = create_game_engine()
+write_queue = WriteQueue(engine)
+
+
+def _apply_remote_change(table: str, entity_id: int) -> None:
+    model = MODELS_BY_TABLE.get(table)
+    if model is not None:
+        notify_saved(model, entity_id, None)
+
+
+# Saves committed by other workers reach this worker's listeners through the change log.
+MODELS_BY_TABLE = {model.__tablename__: model for model in (Player, Monster, Weapon, Armor)}
+change_feed = ChangeFeed(engine, _apply_remote_change, notify_reset)
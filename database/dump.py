@@ -0,0 +1,384 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Whole-database dumps: every row of weapon, armor, player and monster, streamed in and out.
+
+NDJSON dumps hold one {"table": ..., "row": {...}} object per line, tables in foreign-key order
+(weapons and armor before the players and monsters that equip them).  Parquet dumps, written
+when pyarrow is installed, are a directory with one <table>.parquet file per table.
+
+Exports read every table inside one read transaction, so the dump is a consistent snapshot,
+and fetch BATCH_SIZE rows at a time, so memory stays flat however large the tables are.
+Imports insert with executemany on the raw SQLite connection, BATCH_SIZE rows per statement
+batch, all inside one transaction: a restore either lands whole or not at all, and costs one
+commit.  Name keys are recomputed from the names, so hand-written dumps may leave them out.
+
+    python -m database.dump export game.ndjson
+    python -m database.dump export dump_dir --format parquet
+    python -m database.dump import game.ndjson --replace
+"""
+
+from operator import itemgetter
+from typing import Dict, IO, Iterable, Iterator, List, Optional, Set, Tuple, Type
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+
+from sqlalchemy import Boolean, Connection, Engine, Float, Integer
+from sqlmodel import SQLModel
+from pydantic_core import PydanticUndefined
+
+from database.changes import record_reset
+from models.armor import Armor
+from models.monsters import Monster
+from models.names import NAME_KEYS, normalize_name
+from models.players import Player
+from models.weapons import Weapon
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet as parquet
+except ImportError:
+    pyarrow = None
+
+logger = logging.getLogger("database")
+
+# Parents first: players and monsters reference weapon and armor ids.
+TABLES: Tuple[Type[SQLModel], ...] = (Weapon, Armor, Player, Monster)
+MODELS = {model.__tablename__: model for model in TABLES}
+BATCH_SIZE = 10000
+
+Record = Tuple[str, dict]
+
+
+def _dumps(value) -> str:
+    return orjson.dumps(value).decode() if orjson is not None else json.dumps(value)
+
+
+_loads = orjson.loads if orjson is not None else json.loads
+
+
+def _columns(model: Type[SQLModel]) -> List[str]:
+    return [column.name for column in model.__table__.columns]
+
+
+def _defaults(model: Type[SQLModel]) -> Dict[str, object]:
+    # Values for columns a dump leaves out: the model's default, else NULL.
+    return {name: None if field.default is PydanticUndefined else field.default
+            for name, field in model.model_fields.items() if name in model.__table__.columns}
+
+
+def _select_batches(cursor, model: Type[SQLModel], batch_size: int) -> Iterator[list]:
+    columns = ", ".join(f'"{name}"' for name in _columns(model))
+    cursor.execute(f'SELECT {columns} FROM "{model.__tablename__}" ORDER BY id')
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield rows
+
+
+################################################################
+# Export
+################################################################
+def iter_ndjson(engine: Engine, batch_size: int = BATCH_SIZE) -> Iterator[str]:
+    """
+    Yield an NDJSON dump of every table, one chunk of lines per batch of rows.
+
+    :param engine: The game database engine.
+    :param batch_size: Rows fetched and encoded per chunk.
+    :return: An iterator of text chunks.
+    """
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        # Every table is read from the same snapshot.
+        cursor.execute("BEGIN")
+        for model in TABLES:
+            table, columns = model.__tablename__, _columns(model)
+            # SQLite hands booleans back as 0 and 1.
+            flags = [index for index, column in enumerate(model.__table__.columns) if isinstance(column.type, Boolean)]
+            for rows in _select_batches(cursor, model, batch_size):
+                if flags:
+                    rows = [_with_flags(row, flags) for row in rows]
+                yield "".join(_dumps({"table": table, "row": dict(zip(columns, row))}) + "\n" for row in rows)
+    finally:
+        connection.rollback()
+        connection.close()
+
+
+def _with_flags(row: tuple, flags: List[int]) -> list:
+    row = list(row)
+    for index in flags:
+        if row[index] is not None:
+            row[index] = bool(row[index])
+    return row
+
+
+def export_ndjson(engine: Engine, out: IO[str], batch_size: int = BATCH_SIZE) -> None:
+    """
+    Write an NDJSON dump of every table to a text file.
+
+    :param engine: The game database engine.
+    :param out: The file to write to.
+    :param batch_size: Rows fetched per batch.
+    :return:
+    """
+    for chunk in iter_ndjson(engine, batch_size):
+        out.write(chunk)
+
+
+def _arrow_type(column):
+    if isinstance(column.type, Boolean):
+        return pyarrow.bool_()
+    if isinstance(column.type, Integer):
+        return pyarrow.int64()
+    if isinstance(column.type, Float):
+        return pyarrow.float64()
+    return pyarrow.string()
+
+
+def _arrow_schema(model: Type[SQLModel]):
+    return pyarrow.schema([(column.name, _arrow_type(column)) for column in model.__table__.columns])
+
+
+def _arrow_column(values: tuple, field):
+    # SQLite hands booleans back as 0 and 1.
+    if field.type == pyarrow.bool_():
+        return pyarrow.array(values, pyarrow.int64()).cast(pyarrow.bool_())
+    return pyarrow.array(values, field.type)
+
+
+def export_parquet(engine: Engine, directory: str, batch_size: int = BATCH_SIZE) -> None:
+    """
+    Write a Parquet dump, one <table>.parquet file per table, one row group per batch.
+
+    :param engine: The game database engine.
+    :param directory: The directory to write the files to; created if missing.
+    :param batch_size: Rows fetched and written per row group.
+    :return:
+    """
+    if pyarrow is None:
+        raise RuntimeError("Parquet dumps need the pyarrow package.")
+    os.makedirs(directory, exist_ok=True)
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("BEGIN")
+        for model in TABLES:
+            schema = _arrow_schema(model)
+            with parquet.ParquetWriter(os.path.join(directory, f"{model.__tablename__}.parquet"), schema) as writer:
+                for rows in _select_batches(cursor, model, batch_size):
+                    arrays = [_arrow_column(values, field) for values, field in zip(zip(*rows), schema)]
+                    writer.write_batch(pyarrow.record_batch(arrays, schema=schema))
+    finally:
+        connection.rollback()
+        connection.close()
+
+
+################################################################
+# Import
+################################################################
+def read_ndjson(lines: Iterable[str]) -> Iterator[Record]:
+    """
+    Parse an NDJSON dump into (table, row) records.
+
+    :param lines: The dump's lines.
+    :return: An iterator of records.
+    """
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = _loads(line)
+            yield record["table"], record["row"]
+        except (ValueError, KeyError, TypeError) as error:
+            raise ValueError(f"Line {number} is not a dump record: {error}") from None
+
+
+def read_parquet(directory: str, batch_size: int = BATCH_SIZE) -> Iterator[Record]:
+    """
+    Read a Parquet dump directory into (table, row) records, tables in foreign-key order.
+
+    :param directory: The directory holding <table>.parquet files.
+    :param batch_size: Rows read per batch.
+    :return: An iterator of records.
+    """
+    if pyarrow is None:
+        raise RuntimeError("Parquet dumps need the pyarrow package.")
+    for model in TABLES:
+        path = os.path.join(directory, f"{model.__tablename__}.parquet")
+        if not os.path.exists(path):
+            continue
+        for batch in parquet.ParquetFile(path).iter_batches(batch_size):
+            for row in batch.to_pylist():
+                yield model.__tablename__, row
+
+
+def _drop_indexes(cursor, table: str) -> List[str]:
+    # Building an index once over the loaded rows beats updating it row by row.
+    indexes = cursor.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? "
+                             "AND sql IS NOT NULL", (table,)).fetchall()
+    for name, _ in indexes:
+        cursor.execute(f'DROP INDEX "{name}"')
+    return [sql for _, sql in indexes]
+
+
+def import_records(connection: Connection, records: Iterable[Record], tables: Optional[Set[str]] = None,
+                   replace: bool = False, batch_size: int = BATCH_SIZE) -> Dict[str, int]:
+    """
+    Insert dump records inside the caller's transaction.
+
+    Records must come table by table in foreign-key order, as the exports write them.  Rows keep
+    their ids, so existing rows with the same ids make the import fail unless `replace` is set.
+    Replacing only empties the tables that have records in the dump; the rest are left alone.
+
+    :param connection: A connection with an open write transaction.
+    :param records: (table, row) records.
+    :param tables: Only import these tables, or every table if None.
+    :param replace: Delete every existing row of a table before inserting its first record.
+    :param batch_size: Rows per executemany call.
+    :return: Rows inserted, by table.
+    """
+    cursor = connection.connection.driver_connection.cursor()
+    wanted = set(MODELS) if tables is None else set(tables)
+
+    counts = {table: 0 for table in MODELS if table in wanted}
+    position, current, model, statement, columns, defaults, batch, indexes = -1, None, None, None, None, None, [], []
+    values, name_keys = None, []
+
+    def flush():
+        if batch:
+            try:
+                cursor.executemany(statement, batch)
+            except sqlite3.IntegrityError as error:
+                raise ValueError(f"{current} rows clash with existing rows ({error}); "
+                                 f"import with replace to overwrite them.") from None
+            counts[current] += len(batch)
+            batch.clear()
+
+    def finish():
+        flush()
+        for sql in indexes:
+            cursor.execute(sql)
+        indexes.clear()
+
+    for table, row in records:
+        if table != current:
+            if table not in MODELS:
+                raise ValueError(f"Unknown table {table!r} in dump.")
+            if table not in wanted:
+                continue
+            finish()
+            if TABLES.index(MODELS[table]) < position:
+                raise ValueError(f"Dump is not in foreign-key order: {table} rows after {current} rows.")
+            current, model = table, MODELS[table]
+            position = TABLES.index(model)
+            columns, defaults = _columns(model), _defaults(model)
+            values = itemgetter(*columns)
+            name_keys = [(key, source) for key, source in NAME_KEYS.get(model, {}).items() if key in columns]
+            if replace:
+                cursor.execute(f'DELETE FROM "{table}"')
+            statement = (f'INSERT INTO "{table}" ({", ".join(columns)}) '
+                         f'VALUES ({", ".join("?" * len(columns))})')
+            if not cursor.execute(f'SELECT EXISTS (SELECT 1 FROM "{table}")').fetchone()[0]:
+                indexes.extend(_drop_indexes(cursor, table))
+        for key, source in name_keys:
+            if source in row:
+                row[key] = normalize_name(row[source])
+        try:
+            batch.append(values(row))
+        except KeyError:
+            batch.append(tuple([row.get(column, defaults[column]) for column in columns]))
+        if len(batch) >= batch_size:
+            flush()
+    finish()
+
+    if any(counts.values()):
+        # Every worker's caches are now wrong; make them all start over.
+        record_reset(connection)
+    return counts
+
+
+def import_dump(engine: Engine, records: Iterable[Record], replace: bool = False,
+                batch_size: int = BATCH_SIZE) -> Dict[str, int]:
+    """
+    Import a dump in a single transaction.
+
+    :param engine: The game database engine.
+    :param records: (table, row) records, from read_ndjson() or read_parquet().
+    :param replace: Delete every existing row of the tables the dump has records for.
+    :param batch_size: Rows per executemany call.
+    :return: Rows inserted, by table.
+    """
+    start = time.perf_counter()
+    with engine.connect() as connection:
+        # Take the write lock up front rather than failing to upgrade a read lock halfway.
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+        counts = import_records(connection, records, replace=replace, batch_size=batch_size)
+        connection.commit()
+    logger.info("Imported %s in %.1fs.", counts, time.perf_counter() - start)
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("path", help="a .ndjson file, - for stdout/stdin, or a directory for Parquet")
+    parser.add_argument("--format", choices=["ndjson", "parquet"],
+                        help="defaults to parquet for directories and ndjson otherwise")
+    parser.add_argument("--replace", action="store_true", help="delete the existing rows of each table in the dump before importing it")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    from database.connections import engine, init_database
+    init_database()
+    fmt = args.format or ("parquet" if os.path.isdir(args.path) else "ndjson")
+
+    start = time.perf_counter()
+    if args.command == "export":
+        if fmt == "parquet":
+            export_parquet(engine, args.path, args.batch_size)
+        elif args.path == "-":
+            export_ndjson(engine, sys.stdout, args.batch_size)
+        else:
+            with open(args.path, "w", encoding="utf-8") as f:
+                export_ndjson(engine, f, args.batch_size)
+        logger.info("Exported to %s in %.1fs.", args.path, time.perf_counter() - start)
+    elif fmt == "parquet":
+        import_dump(engine, read_parquet(args.path, args.batch_size), args.replace, args.batch_size)
+    elif args.path == "-":
+        import_dump(engine, read_ndjson(sys.stdin), args.replace, args.batch_size)
+    else:
+        with open(args.path, "r", encoding="utf-8") as f:
+            import_dump(engine, read_ndjson(f), args.replace, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
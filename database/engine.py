@@ -0,0 +1,142 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+SQLite engine profiles.
+
+Settings are layered: the named profile, then database.json (if present), then environment
+variables.  Recognised keys and their environment variables:
+
+    profile        SONZO_DB_PROFILE         default | wal | durable
+    url            SONZO_DB_URL             sqlite:///game_database.db
+    journal_mode   SONZO_DB_JOURNAL_MODE    PRAGMA journal_mode
+    synchronous    SONZO_DB_SYNCHRONOUS     PRAGMA synchronous
+    mmap_size      SONZO_DB_MMAP_SIZE       PRAGMA mmap_size (bytes)
+    cache_size     SONZO_DB_CACHE_SIZE      PRAGMA cache_size (negative means KiB)
+    busy_timeout   SONZO_DB_BUSY_TIMEOUT    PRAGMA busy_timeout (milliseconds)
+    pool_size      SONZO_DB_POOL_SIZE       connections kept open per worker
+    max_overflow   SONZO_DB_MAX_OVERFLOW    extra connections allowed under load
+    pool_timeout   SONZO_DB_POOL_TIMEOUT    seconds to wait for a free connection
+
+The pool settings only apply to file databases; in-memory ones keep SQLAlchemy's own pool.
+"""
+
+from os.path import exists
+import json
+import logging
+import os
+
+from sqlalchemy import Engine, event, make_url
+from sqlmodel import create_engine
+
+logger = logging.getLogger("database")
+
+CONFIG_FILE = "database.json"
+PRAGMAS = ("journal_mode", "synchronous", "mmap_size", "cache_size", "busy_timeout")
+INTEGER_SETTINGS = ("mmap_size", "cache_size", "busy_timeout", "pool_size", "max_overflow", "pool_timeout")
+
+PROFILES = {
+    # SQLite's stock behaviour: rollback journal, synchronous=FULL.
+    "default": {},
+    # Readers no longer block the writer and commits skip the fsync of the database file.
+    "wal": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 268435456,
+        "cache_size": -65536,
+        "busy_timeout": 5000,
+    },
+    # WAL concurrency but every commit is fsynced.
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "busy_timeout": 5000,
+    },
+}
+
+
+def load_engine_settings(profile: str = None) -> dict:
+    """
+    Resolve the engine settings from the profile, the config file and the environment.
+
+    :param profile: Profile name to use instead of the configured one.
+    :return: The merged settings.
+    """
+    file_settings = {}
+    if exists(CONFIG_FILE):
+        with open(CONFIG_FILE, "r") as f:
+            file_settings = json.load(f)
+
+    env_settings = {}
+    for key in ("profile", "url", *PRAGMAS, "pool_size", "max_overflow", "pool_timeout"):
+        value = os.environ.get(f"SONZO_DB_{key.upper()}")
+        if value is not None:
+            env_settings[key] = value
+
+    name = profile or env_settings.get("profile") or file_settings.get("profile") or "wal"
+    if name not in PROFILES:
+        raise ValueError(f"Unknown database profile '{name}', expected one of {', '.join(PROFILES)}.")
+
+    settings = {"url": "sqlite:///game_database.db", "pool_size": 8, "max_overflow": 8, "pool_timeout": 30}
+    settings.update(PROFILES[name])
+    settings.update(file_settings)
+    settings.update(env_settings)
+    settings["profile"] = name
+    for key in INTEGER_SETTINGS:
+        if key in settings:
+            settings[key] = int(settings[key])
+    return settings
+
+
+def is_file_database(url) -> bool:
+    """
+    Tell whether a database URL names a file, as opposed to an in-memory database.
+
+    In-memory SQLite gets a SingletonThreadPool or StaticPool, which take no sizing arguments.
+
+    :param url: The database URL.
+    :return: True for a file-backed database.
+    """
+    url = make_url(url)
+    database = url.database or ""
+    return database not in ("", ":memory:") and url.query.get("mode") != "memory" \
+        and not database.startswith("file::memory:")
+
+
+def create_game_engine(settings: dict = None) -> Engine:
+    """
+    Create the game database engine and apply the profile's pragmas to every new connection.
+
+    :param settings: Engine settings, defaults to load_engine_settings().
+    :return: The SQLAlchemy engine.
+    """
+    settings = settings or load_engine_settings()
+    pragmas = {key: settings[key] for key in PRAGMAS if key in settings}
+    logger.info("Database profile '%s': %s", settings["profile"], pragmas or "SQLite defaults")
+
+    pool = {}
+    if is_file_database(settings["url"]):
+        pool = {key: settings[key] for key in ("pool_size", "max_overflow", "pool_timeout")}
+    engine = create_engine(settings["url"], echo=False, **pool)
+
+    @event.listens_for(engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+    return engine
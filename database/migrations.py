@@ -0,0 +1,197 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import argparse
+import logging
+from typing import Callable, Iterable, List, Type
+
+from sqlalchemy import Connection, Engine
+from sqlmodel import SQLModel
+
+from auth.passwords import is_hashed
+from database.changes import record_changes
+from models.names import NAME_KEYS, normalize_name
+
+logger = logging.getLogger("database")
+
+BACKFILL_BATCH_SIZE = 10000
+PASSWORD_BATCH_SIZE = 1000
+
+
+def migrate_name_keys(connection: Connection) -> None:
+    """
+    Add and backfill the normalized name key columns on databases created before they existed.
+
+    SQLModel.metadata.create_all() only creates missing tables, so older databases need the
+    columns and their indexes added by hand.  Rows are backfilled in Python so the keys match
+    normalize_name() exactly, which SQLite's ASCII-only lower() would not.
+
+    :param connection: A connection inside the initialization transaction.
+    :return:
+    """
+    for model, key_columns in NAME_KEYS.items():
+        table = model.__tablename__
+        existing = {row[1] for row in connection.exec_driver_sql(f"PRAGMA table_info({table})")}
+
+        for key_column, source_column in key_columns.items():
+            if key_column not in existing:
+                logger.info("Adding column %s.%s.", table, key_column)
+                connection.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {key_column} VARCHAR")
+            connection.exec_driver_sql(
+                f"CREATE INDEX IF NOT EXISTS ix_{table}_{key_column} ON {table} ({key_column})")
+
+            last_id = 0
+            while True:
+                rows = connection.exec_driver_sql(
+                    f"SELECT id, {source_column} FROM {table} "
+                    f"WHERE {key_column} IS NULL AND id > ? ORDER BY id LIMIT ?",
+                    (last_id, BACKFILL_BATCH_SIZE)).fetchall()
+                if not rows:
+                    break
+                connection.exec_driver_sql(
+                    f"UPDATE {table} SET {key_column} = ? WHERE id = ?",
+                    [(normalize_name(value), row_id) for row_id, value in rows])
+                last_id = rows[-1][0]
+                logger.info("Backfilled %s.%s up to id %d.", table, key_column, last_id)
+
+
+def migrate_row_versions(connection: Connection, models: Iterable[Type[SQLModel]]) -> None:
+    """
+    Add the row version column to tables created before it existed.
+
+    Existing rows start at version 1, the same as newly inserted ones.
+
+    :param connection: A connection inside the initialization transaction.
+    :param models: The table models that carry a version column.
+    :return:
+    """
+    for model in models:
+        table = model.__tablename__
+        existing = {row[1] for row in connection.exec_driver_sql(f"PRAGMA table_info({table})")}
+        if "version" not in existing:
+            logger.info("Adding column %s.version.", table)
+            connection.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+
+
+def migrate_admin_flag(connection: Connection) -> None:
+    """
+    Add the player admin flag to databases created before it existed.  Nobody starts as an admin.
+
+    :param connection: A connection inside the initialization transaction.
+    :return:
+    """
+    existing = {row[1] for row in connection.exec_driver_sql("PRAGMA table_info(player)")}
+    if "admin" not in existing:
+        logger.info("Adding column player.admin.")
+        connection.exec_driver_sql("ALTER TABLE player ADD COLUMN admin BOOLEAN NOT NULL DEFAULT 0")
+
+
+def grant_admin(engine: Engine, username: str, admin: bool = True) -> bool:
+    """
+    Grant or revoke a player's admin flag, recording the change so running workers see it.
+
+    :param engine: The game database engine.
+    :param username: The player's exact username.
+    :param admin: Grant the flag, or revoke it.
+    :return: Whether the player exists.
+    """
+    with engine.connect() as connection:
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+        row = connection.exec_driver_sql(
+            "UPDATE player SET admin = ?, version = version + 1 WHERE username = ? RETURNING id, version",
+            (admin, username)).first()
+        if row is not None:
+            record_changes(connection, [("player", row[0], row[1])])
+        connection.commit()
+    return row is not None
+
+
+def migrate_password_hashes(engine: Engine, hash_many: Callable[[List[str]], List[str]],
+                            batch_size: int = PASSWORD_BATCH_SIZE) -> int:
+    """
+    Replace plain text player passwords with hashes, committing each batch on its own.
+
+    Hashing is slow by design, hours for a large player table, so this is not part of
+    init_database: logins already upgrade plain text passwords one at a time, and this job can
+    run beside a live server to finish the rest (python -m database.migrations hash-passwords).
+    Hashing happens outside any transaction, so the write lock is only held for each batch's
+    UPDATE.  A row whose password changed since it was read, say by a login, is left alone.
+    Updated rows get a new version and a change_log entry, so running workers drop their cached
+    copies.  Rows that already hold a hash are skipped, which makes the job safe to rerun.
+
+    :param engine: The game database engine.
+    :param hash_many: Hashes a list of passwords, preserving order.
+    :param batch_size: Passwords hashed and committed together.
+    :return: The number of passwords replaced.
+    """
+    last_id = 0
+    migrated = 0
+    while True:
+        with engine.connect() as connection:
+            rows = connection.exec_driver_sql(
+                "SELECT id, password FROM player WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, BACKFILL_BATCH_SIZE)).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        plain = [(row_id, password) for row_id, password in rows if not is_hashed(password)]
+        for start in range(0, len(plain), batch_size):
+            batch = plain[start:start + batch_size]
+            hashes = hash_many([password for _, password in batch])
+            with engine.connect() as connection:
+                connection.exec_driver_sql("BEGIN IMMEDIATE")
+                changes = []
+                for (row_id, password), hashed in zip(batch, hashes):
+                    row = connection.exec_driver_sql(
+                        "UPDATE player SET password = ?, version = version + 1 "
+                        "WHERE id = ? AND password = ? RETURNING version",
+                        (hashed, row_id, password)).first()
+                    if row is not None:
+                        changes.append(("player", row_id, row[0]))
+                record_changes(connection, changes)
+                connection.commit()
+            migrated += len(changes)
+            logger.info("Hashed %d plain text passwords.", migrated)
+    return migrated
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline database migrations.")
+    parser.add_argument("command", choices=["hash-passwords", "grant-admin", "revoke-admin"])
+    parser.add_argument("username", nargs="?", help="the player, for grant-admin and revoke-admin")
+    parser.add_argument("--batch-size", type=int, default=PASSWORD_BATCH_SIZE)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    from auth.passwords import password_hasher
+    from database.connections import engine, init_database
+    init_database()
+    if args.command != "hash-passwords":
+        if not args.username:
+            parser.error(f"{args.command} needs a username")
+        if not grant_admin(engine, args.username, args.command == "grant-admin"):
+            parser.exit(1, f"No player with username '{args.username}'.\n")
+        return
+    try:
+        migrate_password_hashes(engine, password_hasher.hash_many, args.batch_size)
+    finally:
+        password_hasher.close()
+
+
+if __name__ == "__main__":
+    main()
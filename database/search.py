@@ -0,0 +1,351 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+from itertools import chain
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+import re
+
+from models.names import normalize_name
+
+# Score tiers; within a tier shorter names rank first.
+EXACT_SCORE = 100.0
+NAME_PREFIX_SCORE = 80.0
+NAME_TERM_SCORE = 40.0
+DESCRIPTION_TERM_SCORE = 10.0
+FUZZY_SCORE = 30.0
+
+# Stop after this many names by prefix, and this many documents matching every query term, so
+# short queries on big tables stay cheap.
+MAX_PREFIX_CANDIDATES = 200
+# Minimum trigram similarity for a misspelled query term to match a name term.
+FUZZY_THRESHOLD = 0.3
+# Failing that, the most edits (insert, delete, substitute, swap adjacent letters) between them:
+# one per three letters of the query term, and never more than this.
+MAX_EDIT_DISTANCE = 2
+# Trigrams found in more name terms than this are not used to find fuzzy candidates.
+MAX_TRIGRAM_POSTINGS = 1000
+# At most this many fuzzy candidates, those sharing the most trigrams, are scored exactly.
+MAX_FUZZY_CANDIDATES = 50
+
+NAME_FIELD = 0
+DESCRIPTION_FIELD = 1
+
+_WORD = re.compile(r"\w+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """
+    Split text into normalized search terms.
+
+    :param text: The text to split.
+    :return: The terms in order, possibly repeated.
+    """
+    return _WORD.findall(normalize_name(text or ""))
+
+
+def trigrams(term: str) -> Set[str]:
+    """
+    Return the padded trigrams of a term, e.g. "rat" -> {"  r", " ra", "rat", "at "}.
+
+    :param term: A normalized term.
+    :return: The set of trigrams.
+    """
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Count the edits between two terms, where swapping two adjacent letters is one edit.
+
+    This is the optimal string alignment distance.  It stops early once every alignment needs
+    more than `limit` edits.
+
+    :param a: A term.
+    :param b: Another term.
+    :param limit: The largest distance of interest.
+    :return: The distance, or limit + 1 if it is larger than limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous, current = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        before, previous, current = previous, current, [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+    return min(current[-1], limit + 1)
+
+
+class SearchHit(NamedTuple):
+    id: int
+    name: str
+    score: float
+
+
+class _Document(NamedTuple):
+    name: str
+    description: str
+    name_key: str
+    terms: Tuple[Tuple[str, int], ...]
+
+
+class SearchIndex:
+    """
+    An in-memory prefix and typo-tolerant search index over the names and descriptions of one table.
+
+    Full names and individual terms are kept in sorted lists, so a prefix is a bisect plus a
+    short walk.  Name terms are also indexed by trigram for misspelled queries, with an edit
+    distance check for typos such as swapped letters that break too many trigrams.  Documents
+    are added, replaced and removed one at a time, so saves update the index without a rebuild.
+
+    The index is not locked; it is only touched from the event loop.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.searches = 0
+        self.updates = 0
+        self._documents: Dict[int, _Document] = {}
+        self._names: List[Tuple[str, int]] = []
+        self._terms: List[Tuple[str, int, int]] = []
+        self._ids_by_name_term: Dict[str, Set[int]] = defaultdict(set)
+        self._name_terms_by_trigram: Dict[str, Set[str]] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def get(self, entity_id: int) -> Optional[Tuple[str, str]]:
+        """
+        Return the indexed name and description of a document.
+
+        :param entity_id: The row id.
+        :return: (name, description), or None if the row is not indexed.
+        """
+        document = self._documents.get(entity_id)
+        return (document.name, document.description) if document is not None else None
+
+    def load(self, rows: Iterable[Tuple[int, str, str]]) -> None:
+        """
+        Replace the whole index.
+
+        :param rows: (id, name, description) for every row.
+        :return:
+        """
+        self.__init__(self.name)
+        for entity_id, name, description in rows:
+            self._add(entity_id, name, description, bulk=True)
+        self._names.sort()
+        self._terms.sort()
+
+    def update(self, entity_id: int, name: str, description: str) -> None:
+        """
+        Add a document, or replace it if the id is already indexed.
+
+        :param entity_id: The row id.
+        :param name: The row's name.
+        :param description: The row's description.
+        :return:
+        """
+        self.updates += 1
+        self.remove(entity_id)
+        self._add(entity_id, name, description, bulk=False)
+
+    def remove(self, entity_id: int) -> None:
+        """
+        Drop a document if it is indexed.
+
+        :param entity_id: The row id.
+        :return:
+        """
+        document = self._documents.pop(entity_id, None)
+        if document is None:
+            return
+        self._delete_sorted(self._names, (document.name_key, entity_id))
+        for term, field in document.terms:
+            self._delete_sorted(self._terms, (term, entity_id, field))
+            if field == NAME_FIELD:
+                ids = self._ids_by_name_term[term]
+                ids.discard(entity_id)
+                if not ids:
+                    del self._ids_by_name_term[term]
+                    for gram in trigrams(term):
+                        self._name_terms_by_trigram[gram].discard(term)
+
+    def search(self, query: str, limit: int = 10) -> List[SearchHit]:
+        """
+        Rank documents against a query.
+
+        Exact names rank first, then names starting with the query, then documents whose terms
+        start with every query term (name terms above description terms).  Only when none of
+        those match are names with a term close to a misspelled query term returned.
+
+        :param query: The text typed so far.
+        :param limit: The maximum number of hits.
+        :return: Hits, best first.
+        """
+        self.searches += 1
+        key = normalize_name(query or "").strip()
+        query_terms = tokenize(key)
+        if not key or not query_terms:
+            return []
+
+        scores: Dict[int, float] = {}
+
+        def offer(entity_id: int, score: float) -> None:
+            if score > scores.get(entity_id, 0.0):
+                scores[entity_id] = score
+
+        for name_key, entity_id in self._prefix(self._names, key):
+            offer(entity_id, EXACT_SCORE if name_key == key else NAME_PREFIX_SCORE)
+
+        # Every query term must match a term of the document by prefix.  Candidates come from the
+        # query term with the fewest entries and are checked against the rest, and the cap counts
+        # only documents that match every term, so a common term cannot crowd out the real hits.
+        terms = set(query_terms)
+        ranges = [self._prefix_range(self._terms, term) for term in terms]
+        start, stop = min(ranges, key=lambda bounds: bounds[1] - bounds[0])
+        checked: Set[int] = set()
+        matches = 0
+        for position in range(start, stop):
+            entity_id = self._terms[position][1]
+            if entity_id in checked:
+                continue
+            checked.add(entity_id)
+            score = self._match_terms(self._documents[entity_id].terms, terms)
+            if score:
+                offer(entity_id, score)
+                matches += 1
+                if matches >= MAX_PREFIX_CANDIDATES:
+                    break
+
+        # Typo tolerance is a fallback for queries nothing starts with.
+        if not scores:
+            for term in query_terms:
+                for name_term, similarity in self._similar_terms(term):
+                    for entity_id in self._ids_by_name_term.get(name_term, ()):
+                        offer(entity_id, FUZZY_SCORE * similarity)
+
+        ranked = sorted(scores.items(),
+                        key=lambda item: (-item[1], len(self._documents[item[0]].name_key), item[0]))
+        return [SearchHit(entity_id, self._documents[entity_id].name, round(score, 2))
+                for entity_id, score in ranked[:limit]]
+
+    def stats(self) -> dict:
+        """
+        Return the index counters.
+
+        :return: A dictionary of counters and the current size.
+        """
+        return {
+            "documents": len(self._documents),
+            "terms": len(self._terms),
+            "searches": self.searches,
+            "updates": self.updates,
+        }
+
+    def _add(self, entity_id: int, name: str, description: str, bulk: bool) -> None:
+        name = name or ""
+        description = description or ""
+        name_key = normalize_name(name)
+        terms = {(term, NAME_FIELD) for term in tokenize(name)}
+        terms |= {(term, DESCRIPTION_FIELD) for term in tokenize(description)}
+        self._documents[entity_id] = _Document(name, description, name_key, tuple(terms))
+
+        add = list.append if bulk else insort
+        add(self._names, (name_key, entity_id))
+        for term, field in terms:
+            add(self._terms, (term, entity_id, field))
+            if field == NAME_FIELD:
+                if term not in self._ids_by_name_term:
+                    for gram in trigrams(term):
+                        self._name_terms_by_trigram[gram].add(term)
+                self._ids_by_name_term[term].add(entity_id)
+
+    def _similar_terms(self, term: str) -> List[Tuple[str, float]]:
+        grams = trigrams(term)
+        postings = [(gram, self._name_terms_by_trigram.get(gram, ())) for gram in grams]
+        # Trigrams shared by a large share of the names say little about a term and would
+        # dominate the cost, so candidates are gathered from the rarer ones only.
+        rare = [(gram, terms) for gram, terms in postings if len(terms) <= MAX_TRIGRAM_POSTINGS]
+        shared = Counter(chain.from_iterable(terms for _, terms in rare))
+        # Overlap can only reach the threshold if the skipped trigrams all match as well.
+        needed = FUZZY_THRESHOLD * len(grams) - (len(postings) - len(rare))
+
+        candidates = shared.most_common(MAX_FUZZY_CANDIDATES)
+
+        similar = []
+        for name_term, count in candidates:
+            if count < needed:
+                break
+            name_grams = trigrams(name_term)
+            overlap = len(grams & name_grams)
+            similarity = overlap / (len(grams) + len(name_grams) - overlap)
+            if similarity >= FUZZY_THRESHOLD:
+                similar.append((name_term, similarity))
+        if similar:
+            return similar
+
+        # Swapped or doubled letters break several trigrams at once, so when no candidate is
+        # similar enough by trigrams, they get a second chance by edit distance.
+        limit = min(MAX_EDIT_DISTANCE, max(1, len(term) // 3))
+        for name_term, _ in candidates:
+            distance = edit_distance(term, name_term, limit)
+            if distance <= limit:
+                similar.append((name_term, 1 - distance / max(len(term), len(name_term))))
+        return similar
+
+    @staticmethod
+    def _match_terms(document_terms: Tuple[Tuple[str, int], ...], query_terms: Set[str]) -> float:
+        # The document's weakest query term decides: its best field, name above description.
+        score = NAME_TERM_SCORE
+        for query_term in query_terms:
+            best = 0.0
+            for term, field in document_terms:
+                if term.startswith(query_term):
+                    best = max(best, NAME_TERM_SCORE if field == NAME_FIELD else DESCRIPTION_TERM_SCORE)
+            if not best:
+                return 0.0
+            score = min(score, best)
+        return score
+
+    @staticmethod
+    def _prefix_range(entries: list, prefix: str) -> Tuple[int, int]:
+        return bisect_left(entries, (prefix,)), bisect_left(entries, (prefix + "\U0010ffff",))
+
+    @staticmethod
+    def _prefix(entries: list, prefix: str) -> list:
+        start = bisect_left(entries, (prefix,))
+        found = []
+        for entry in entries[start:start + MAX_PREFIX_CANDIDATES]:
+            if not entry[0].startswith(prefix):
+                break
+            found.append(entry)
+        return found
+
+    @staticmethod
+    def _delete_sorted(entries: list, entry: tuple) -> None:
+        position = bisect_left(entries, entry)
+        if position < len(entries) and entries[position] == entry:
+            del entries[position]
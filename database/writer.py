@@ -0,0 +1,218 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, Type
+import asyncio
+import logging
+
+from sqlalchemy import Engine, select, update
+from sqlalchemy.exc import NoResultFound
+from sqlmodel import SQLModel
+
+from database.changes import prune_changes, record_changes
+
+logger = logging.getLogger("database")
+
+
+class StaleVersionError(Exception):
+    """
+    A conditional update found the row at a different version than the caller last read.
+    """
+
+    def __init__(self, table: str, entity_id: int, expected_version: int, current_version: int):
+        super().__init__(f"{table} {entity_id} is at version {current_version}, not {expected_version}.")
+        self.table = table
+        self.entity_id = entity_id
+        self.expected_version = expected_version
+        self.current_version = current_version
+
+
+class PendingWrite:
+    """
+    Queued updates to one row that will be written as a single UPDATE statement.
+
+    Unconditional updates merge into one set of column values.  An update that carries an
+    expected version gets a PendingWrite of its own, so its version check is never applied to
+    (or skipped for) anyone else's changes.
+    """
+
+    def __init__(self, model: Type[SQLModel], entity_id: int, expected_version: Optional[int] = None,
+                 bump_version: bool = True):
+        self.model = model
+        self.entity_id = entity_id
+        self.expected_version = expected_version
+        self.bump_version = bump_version
+        self.values: dict = {}
+        self.futures: List[asyncio.Future] = []
+        self.error: Optional[BaseException] = None
+        self.version: Optional[int] = None
+
+
+class WriteQueue:
+    """
+    Single writer for row updates.
+
+    Callers submit column values for a row and get back a future.  One writer task drains the
+    queue: every row touched since the last batch becomes one UPDATE ... WHERE id statement and
+    the whole batch commits in a single transaction on a dedicated thread.  Updates to a row that
+    is already queued are merged into it, so a burst of edits costs one statement.  Every
+    statement also bumps the row's version column, unless the update was submitted with
+    bump_version=False because it only touches columns no edit form guards (the world's
+    regeneration and interest).  The batch's transaction records every
+    updated row in change_log for the other workers (see database.changes).  A future is
+    resolved with the row's new version only after its batch has committed.
+    """
+
+    def __init__(self, engine: Engine, max_batch: int = 500, prune_every: int = 1000):
+        self.engine = engine
+        self.max_batch = max_batch
+        self.prune_every = prune_every
+        self.batches = 0
+        self.writes = 0
+        self.coalesced = 0
+        self._pending: Dict[Tuple[Type[SQLModel], int], List[PendingWrite]] = {}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sonzo-writer")
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    def submit(self, model: Type[SQLModel], entity_id: int, values: dict,
+               expected_version: Optional[int] = None, bump_version: bool = True) -> asyncio.Future:
+        """
+        Queue an update to one row.
+
+        :param model: The table model of the row.
+        :param entity_id: The id of the row.
+        :param values: Column values to write.
+        :param expected_version: Only write if the row is still at this version.
+        :param bump_version: Increment the row's version, False to leave it for edit forms still open on the row.
+        :return: A future resolving to the row's new version once the update has committed.
+        """
+        self._ensure_started()
+        future = self._loop.create_future()
+        writes = self._pending.setdefault((model, entity_id), [])
+        if expected_version is None and writes and writes[-1].expected_version is None:
+            pending = writes[-1]
+            self.coalesced += 1
+        else:
+            pending = PendingWrite(model, entity_id, expected_version, bump_version)
+            writes.append(pending)
+        pending.bump_version = pending.bump_version or bump_version
+        pending.values.update(values)
+        pending.futures.append(future)
+        self._wakeup.set()
+        return future
+
+    async def close(self) -> None:
+        """
+        Write out anything still queued and stop the writer task.
+
+        :return:
+        """
+        if self._task is None or self._task.done():
+            return
+        self._closing = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._closing = False
+            self._wakeup = asyncio.Event()
+            self._task = loop.create_task(self._run(), name="sonzo-writer")
+
+    async def _run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._pending:
+                await self._flush()
+            if self._closing:
+                return
+
+    async def _flush(self) -> None:
+        keys = list(self._pending)[:self.max_batch]
+        batch = [pending for key in keys for pending in self._pending.pop(key)]
+        try:
+            await self._loop.run_in_executor(self._executor, self._write_batch, batch)
+        except Exception as error:
+            logger.exception("Write batch failed.")
+            for pending in batch:
+                pending.error = pending.error or error
+
+        self.batches += 1
+        self.writes += len(batch)
+        for pending in batch:
+            for future in pending.futures:
+                if future.done():
+                    continue
+                if pending.error is not None:
+                    future.set_exception(pending.error)
+                else:
+                    future.set_result(pending.version)
+
+    def _write_batch(self, batch: List[PendingWrite]) -> None:
+        try:
+            with self.engine.begin() as connection:
+                for pending in batch:
+                    self._write_row(connection, pending)
+                self._record(connection, batch)
+        except Exception:
+            if len(batch) == 1:
+                raise
+            # One bad row should not sink the others; retry each in its own transaction.
+            logger.warning("Write batch of %d rows failed, retrying rows individually.", len(batch))
+            for pending in batch:
+                pending.error = None
+                try:
+                    with self.engine.begin() as connection:
+                        self._write_row(connection, pending)
+                        self._record(connection, [pending])
+                except Exception as error:
+                    pending.error = error
+
+    def _record(self, connection, batch: List[PendingWrite]) -> None:
+        record_changes(connection, [(pending.model.__tablename__, pending.entity_id, pending.version)
+                                    for pending in batch if pending.error is None])
+        if (self.batches + 1) % self.prune_every == 0:
+            prune_changes(connection)
+
+    @staticmethod
+    def _write_row(connection, pending: PendingWrite) -> None:
+        table = pending.model.__table__
+        statement = update(table).where(table.c.id == pending.entity_id)
+        if pending.expected_version is not None:
+            statement = statement.where(table.c.version == pending.expected_version)
+        version = table.c.version + 1 if pending.bump_version else table.c.version
+        statement = statement.values(**pending.values, version=version).returning(table.c.version)
+
+        row = connection.execute(statement).first()
+        if row is not None:
+            pending.version = row[0]
+            return
+
+        current = connection.execute(select(table.c.version).where(table.c.id == pending.entity_id)).first()
+        if current is None:
+            pending.error = NoResultFound(f"No {table.name} row with id {pending.entity_id}.")
+        else:
+            pending.error = StaleVersionError(table.name, pending.entity_id, pending.expected_version, current[0])
@@ -0,0 +1,307 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Balance matrix: win probability and expected time-to-kill for every player weapon x player armor
+x monster combination, for a reference player of REFERENCE_LEVEL and REFERENCE_HEALTH.
+
+Each cell is estimated from TRIALS simulated fights (see game/combat.py).  The work is split
+into one block per monster (and weapon chunk for large catalogs), every block is a single
+vectorized simulate_fights() call, and blocks run in parallel on a process pool.  The axes and
+the item and monster numbers (a snapshot, see game/catalog.py) come from one read, so they
+always agree.  After the first build, a save only recomputes the slices it can affect: a
+weapon's row plus the columns of monsters wielding it, an armor's row plus the columns of
+monsters wearing it, or a monster's column.  Adding, removing or re-flagging catalog items
+changes the axes and forces a full build.  A save that lands during a full build starts it
+again, and the new arrays replace the old ones only once complete.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+from typing import Dict, List, Optional, Tuple, Type
+import asyncio
+import logging
+import os
+
+import numpy as np
+from sqlmodel import SQLModel
+
+from database.connections import add_reset_listener, add_save_listener, get_all_rows_together
+from game.catalog import COLUMNS, CatalogSnapshot, CatalogTable
+from game.combat import Combatant, simulate_fights
+from models.armor import Armor
+from models.monsters import Monster
+from models.weapons import Weapon
+
+logger = logging.getLogger("balance")
+
+REFERENCE_LEVEL = int(os.environ.get("SONZO_BALANCE_LEVEL", "1"))
+REFERENCE_HEALTH = int(os.environ.get("SONZO_BALANCE_HEALTH", "100"))
+TRIALS = int(os.environ.get("SONZO_BALANCE_TRIALS", "2000"))
+# Upper bound on fights per simulate_fights() call, to cap the memory of one block.
+MAX_FIGHTS_PER_BLOCK = 2_000_000
+
+
+def simulate_block(weapon_stats: np.ndarray, armor_stats: np.ndarray, monster: Combatant,
+                   level: int, health: int, trials: int, seed: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Simulate every weapon x armor loadout against one monster in a single vectorized batch.
+
+    Runs in a worker process, so it only takes and returns plain arrays.
+
+    :param weapon_stats: (W, 2) array of min_damage, max_damage.
+    :param armor_stats: (A, 2) array of ac, damage_buffer.
+    :param monster: The monster's side of the fight.
+    :param level: Reference player level.
+    :param health: Reference player health.
+    :param trials: Fights per loadout.
+    :param seed: RNG seed for the block.
+    :return: (W, A) arrays of win probability and mean rounds to kill in won fights (NaN if never won).
+    """
+    weapons, armors = len(weapon_stats), len(armor_stats)
+    weapon_index = np.repeat(np.arange(weapons), armors * trials)
+    armor_index = np.tile(np.repeat(np.arange(armors), trials), weapons)
+    player = Combatant(level, health,
+                       weapon_stats[weapon_index, 0], weapon_stats[weapon_index, 1],
+                       armor_stats[armor_index, 0], armor_stats[armor_index, 1])
+
+    result = simulate_fights(player, monster, weapon_index.size, seed)
+    won = result.player_won.reshape(weapons, armors, trials)
+    rounds = result.rounds.reshape(weapons, armors, trials)
+
+    wins = won.sum(axis=2)
+    win_probability = wins / trials
+    with np.errstate(invalid="ignore", divide="ignore"):
+        time_to_kill = np.where(wins > 0, (rounds * won).sum(axis=2) / wins, np.nan)
+    return win_probability, time_to_kill
+
+
+class BalanceMatrix:
+    """
+    Cached win probability and time-to-kill arrays indexed [weapon, armor, monster].
+    """
+
+    def __init__(self, level: int = REFERENCE_LEVEL, health: int = REFERENCE_HEALTH, trials: int = TRIALS):
+        self.level = level
+        self.health = health
+        self.trials = trials
+        self.weapons: List[Weapon] = []
+        self.armor: List[Armor] = []
+        self.monsters: List[Monster] = []
+        self.win_probability: Optional[np.ndarray] = None
+        self.time_to_kill: Optional[np.ndarray] = None
+        self.computed_at: Optional[datetime] = None
+        self.full_builds = 0
+        self.partial_builds = 0
+        # Counts catalog saves and resets, so a full build can tell it missed one.
+        self._generation = 0
+        self._building = False
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._ids: Dict[Type[SQLModel], np.ndarray] = {}
+        self._lock = asyncio.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._seed = 0
+
+    @property
+    def ready(self) -> bool:
+        return self.win_probability is not None
+
+    def cell(self, weapon: int, armor: int, monster: int) -> Tuple[float, Optional[float]]:
+        """
+        Look up one matchup by axis position.
+
+        :param weapon: Position in self.weapons.
+        :param armor: Position in self.armor.
+        :param monster: Position in self.monsters.
+        :return: Win probability and mean rounds to kill, None if the player never won.
+        """
+        time_to_kill = self.time_to_kill[weapon, armor, monster]
+        return float(self.win_probability[weapon, armor, monster]), \
+            None if np.isnan(time_to_kill) else float(time_to_kill)
+
+    async def get(self) -> "BalanceMatrix":
+        """
+        Return the matrix, building it on first use.
+
+        :return: This matrix, fully computed.
+        """
+        if not self.ready:
+            async with self._lock:
+                if not self.ready:
+                    await self._build_latest()
+        return self
+
+    async def refresh(self, model: Type[SQLModel], entity_id: int) -> None:
+        """
+        Recompute only the cells a saved weapon, armor or monster can affect.
+
+        :param model: The model class that was saved.
+        :param entity_id: The id of the saved row.
+        :return:
+        """
+        async with self._lock:
+            axes = self._axes()
+            await self._load()
+            if self._axes() != axes:
+                await self._build_latest(loaded=True)
+                return
+
+            weapon_rows = np.arange(len(self.weapons))
+            armor_rows = np.arange(len(self.armor))
+            monster_columns = np.arange(len(self.monsters))
+            if model is Weapon:
+                rows = [i for i, weapon in enumerate(self.weapons) if weapon.id == entity_id]
+                columns = [i for i, monster in enumerate(self.monsters) if monster.weapon == entity_id]
+                await self._build(self.win_probability, self.time_to_kill, np.array(rows, dtype=int), armor_rows,
+                                  monster_columns)
+                await self._build(self.win_probability, self.time_to_kill, weapon_rows, armor_rows,
+                                  np.array(columns, dtype=int))
+            elif model is Armor:
+                rows = [i for i, armor in enumerate(self.armor) if armor.id == entity_id]
+                columns = [i for i, monster in enumerate(self.monsters) if monster.armor == entity_id]
+                await self._build(self.win_probability, self.time_to_kill, weapon_rows, np.array(rows, dtype=int),
+                                  monster_columns)
+                await self._build(self.win_probability, self.time_to_kill, weapon_rows, armor_rows,
+                                  np.array(columns, dtype=int))
+            elif model is Monster:
+                columns = [i for i, monster in enumerate(self.monsters) if monster.id == entity_id]
+                await self._build(self.win_probability, self.time_to_kill, weapon_rows, armor_rows,
+                                  np.array(columns, dtype=int))
+            self.partial_builds += 1
+            self.computed_at = datetime.now()
+
+    def on_save(self, model: Type[SQLModel], entity_id: int, values: Optional[dict]) -> None:
+        """
+        Save listener: schedule a partial rebuild once the matrix exists.
+
+        :param model: The model class that was saved.
+        :param entity_id: The id of the saved row.
+        :param values: The column values written.
+        :return:
+        """
+        if model not in (Weapon, Armor, Monster):
+            return
+        self._generation += 1
+        if self.ready and not self._building:
+            asyncio.get_running_loop().create_task(self.refresh(model, entity_id))
+
+    def on_reset(self) -> None:
+        """
+        Reset listener: rebuild the whole matrix once it exists, since any row may have changed.
+
+        :return:
+        """
+        self._generation += 1
+        if self.ready and not self._building:
+            asyncio.get_running_loop().create_task(self._rebuild())
+
+    async def _rebuild(self) -> None:
+        async with self._lock:
+            await self._build_latest()
+
+    async def close(self) -> None:
+        """
+        Shut down the simulation process pool, waiting for its workers off the event loop.
+
+        :return:
+        """
+        if self._pool is not None:
+            pool, self._pool = self._pool, None
+            await asyncio.get_running_loop().run_in_executor(None, partial(pool.shutdown, cancel_futures=True))
+
+    def _axes(self) -> tuple:
+        return (tuple(weapon.id for weapon in self.weapons), tuple(armor.id for armor in self.armor),
+                tuple(monster.id for monster in self.monsters))
+
+    async def _load(self) -> None:
+        weapons, armor, monsters = await get_all_rows_together((Weapon, Armor, Monster))
+        self._snapshot = CatalogSnapshot(CatalogTable.from_models(weapons, COLUMNS[Weapon]),
+                                         CatalogTable.from_models(armor, COLUMNS[Armor]),
+                                         CatalogTable.from_models(monsters, COLUMNS[Monster]), 0)
+        self.weapons = [weapon for weapon in weapons if not weapon.monster_only]
+        self.armor = [item for item in armor if not item.monster_only]
+        self.monsters = monsters
+        self._ids = {model: np.array([row.id for row in rows], dtype=np.int64)
+                     for model, rows in ((Weapon, self.weapons), (Armor, self.armor), (Monster, self.monsters))}
+
+    async def _build_latest(self, loaded: bool = False) -> None:
+        # Load and build everything, again if a save or reset landed meanwhile.  Saves don't
+        # schedule partial rebuilds while this runs; the next pass picks them up instead.
+        self._building = True
+        try:
+            while True:
+                generation = self._generation
+                if not loaded:
+                    await self._load()
+                loaded = False
+                await self._build_all()
+                if generation == self._generation:
+                    return
+                logger.info("The catalog changed during a balance build; building again.")
+        finally:
+            self._building = False
+
+    async def _build_all(self) -> None:
+        shape = (len(self.weapons), len(self.armor), len(self.monsters))
+        win_probability = np.zeros(shape)
+        time_to_kill = np.full(shape, np.nan)
+        await self._build(win_probability, time_to_kill, np.arange(shape[0]), np.arange(shape[1]),
+                          np.arange(shape[2]))
+        self.win_probability, self.time_to_kill = win_probability, time_to_kill
+        self.full_builds += 1
+        self.computed_at = datetime.now()
+        logger.info("Built balance matrix of %d x %d x %d.", *shape)
+
+    async def _build(self, win_probability: np.ndarray, time_to_kill: np.ndarray, weapon_rows: np.ndarray,
+                     armor_rows: np.ndarray, monster_columns: np.ndarray) -> None:
+        if not (weapon_rows.size and armor_rows.size and monster_columns.size):
+            return
+        weapons, armor = self._snapshot.weapons, self._snapshot.armor
+        weapon_ids, armor_ids = self._ids[Weapon][weapon_rows], self._ids[Armor][armor_rows]
+        weapon_stats = np.stack([weapons.take("min_damage", weapon_ids), weapons.take("max_damage", weapon_ids)], axis=1)
+        armor_stats = np.stack([armor.take("ac", armor_ids), armor.take("damage_buffer", armor_ids)], axis=1)
+        monsters = self._snapshot.monster_combatants(self._ids[Monster][monster_columns])
+        rows_per_block = max(1, MAX_FIGHTS_PER_BLOCK // (armor_rows.size * self.trials))
+
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+        blocks = []
+        for number, column in enumerate(monster_columns):
+            monster = Combatant(*(int(field[number]) for field in monsters))
+            for start in range(0, weapon_rows.size, rows_per_block):
+                self._seed += 1
+                chunk = slice(start, start + rows_per_block)
+                future = loop.run_in_executor(pool, simulate_block, weapon_stats[chunk], armor_stats, monster,
+                                              self.level, self.health, self.trials, self._seed)
+                blocks.append((weapon_rows[chunk], column, future))
+
+        for rows, column, future in blocks:
+            block_win_probability, block_time_to_kill = await future
+            win_probability[np.ix_(rows, armor_rows, [column])] = block_win_probability[:, :, None]
+            time_to_kill[np.ix_(rows, armor_rows, [column])] = block_time_to_kill[:, :, None]
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+        return self._pool
+
+
+balance_matrix = BalanceMatrix()
+add_save_listener(balance_matrix.on_save)
+add_reset_listener(balance_matrix.on_reset)
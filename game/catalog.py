@@ -0,0 +1,261 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Struct-of-arrays catalog snapshot for hot game computations.
+
+Weapons, armor and monsters are held as one read-only NumPy column per number the game computes
+with, lined up with a sorted array of ids and an id to position map.  A batch lookup turns an
+array of ids into positions with one searchsorted call and gathers whole columns by fancy
+indexing, so it never builds or touches a model instance.
+
+A snapshot is never changed after it is built.  A save to a catalog row marks its table stale,
+and the next rebuild reads only the stale tables and swaps in a new snapshot with one
+assignment, sharing the tables that did not change.  Code holding a snapshot keeps a consistent
+view however many saves land while it runs.
+"""
+
+from typing import Dict, Optional, Sequence, Set, Tuple, Type
+import asyncio
+import logging
+
+import numpy as np
+from sqlmodel import SQLModel
+
+from database.connections import add_reset_listener, add_save_listener, get_catalog_columns
+from game.combat import FISTS, Combatant
+from models.armor import Armor
+from models.monsters import Monster
+from models.weapons import Weapon
+
+logger = logging.getLogger("catalog")
+
+COLUMNS: Dict[Type[SQLModel], Tuple[str, ...]] = {
+    Weapon: ("min_damage", "max_damage", "weight", "buy_value", "sell_value", "monster_only"),
+    Armor: ("ac", "damage_buffer", "weight", "buy_value", "sell_value", "monster_only"),
+    Monster: ("level", "health", "exp", "weapon", "armor"),
+}
+BOOL_COLUMNS = {"monster_only"}
+# Position of an id that is not in a table, and the value stored for a missing foreign key.
+MISSING = -1
+
+
+def _frozen(array: np.ndarray) -> np.ndarray:
+    array.flags.writeable = False
+    return array
+
+
+def _gather(column: np.ndarray, positions: np.ndarray, default) -> np.ndarray:
+    if not column.size:
+        return np.full(positions.shape, default, dtype=column.dtype)
+    return np.where(positions != MISSING, column[positions], default)
+
+
+class CatalogTable:
+    """
+    One catalog table as sorted ids plus a read-only column per field, all the same length.
+    """
+
+    def __init__(self, ids: np.ndarray, columns: Dict[str, np.ndarray]):
+        self.ids = _frozen(ids)
+        self.columns = {name: _frozen(column) for name, column in columns.items()}
+        self.index: Dict[int, int] = {entity_id: position for position, entity_id in enumerate(ids.tolist())}
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[tuple], names: Sequence[str]) -> "CatalogTable":
+        """
+        Build a table from (id, *names) tuples in id order, as get_catalog_columns returns them.
+
+        :param rows: The rows.
+        :param names: The column names after the id.
+        :return: The table.
+        """
+        data = np.array([[MISSING if value is None else value for value in row] for row in rows],
+                        dtype=np.int64).reshape(len(rows), len(names) + 1)
+        columns = {name: data[:, number + 1].astype(bool if name in BOOL_COLUMNS else np.int64)
+                   for number, name in enumerate(names)}
+        return cls(data[:, 0].copy(), columns)
+
+    @classmethod
+    def from_models(cls, rows: Sequence[SQLModel], names: Sequence[str]) -> "CatalogTable":
+        """
+        Build a table from model instances in id order.
+
+        :param rows: The rows.
+        :param names: The columns to keep.
+        :return: The table.
+        """
+        return cls.from_rows([(row.id, *(getattr(row, name) for name in names)) for row in rows], names)
+
+    def __len__(self) -> int:
+        return self.ids.size
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def position(self, entity_id: int) -> Optional[int]:
+        return self.index.get(entity_id)
+
+    def positions(self, ids) -> np.ndarray:
+        """
+        Find many ids at once.
+
+        :param ids: An array (or sequence) of ids.
+        :return: An int64 array of positions in this table, MISSING where an id is not present.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        if not self.ids.size:
+            return np.full(ids.shape, MISSING, dtype=np.int64)
+        positions = np.searchsorted(self.ids, ids)
+        np.minimum(positions, self.ids.size - 1, out=positions)
+        return np.where(self.ids[positions] == ids, positions, MISSING)
+
+    def take(self, name: str, ids, default=0) -> np.ndarray:
+        """
+        Gather one column for many ids at once.
+
+        :param name: The column.
+        :param ids: An array (or sequence) of ids.
+        :param default: The value for ids that are not present.
+        :return: The column values, in the order of ids.
+        """
+        return _gather(self.columns[name], self.positions(ids), default)
+
+
+class CatalogSnapshot:
+    """
+    The weapon, armor and monster tables as of one rebuild.
+    """
+
+    def __init__(self, weapons: CatalogTable, armor: CatalogTable, monsters: CatalogTable, version: int):
+        self.weapons = weapons
+        self.armor = armor
+        self.monsters = monsters
+        self.version = version
+        # Each monster's equipment as a position in the weapon and armor tables, MISSING if none.
+        self.monster_weapon = _frozen(weapons.positions(monsters["weapon"]))
+        self.monster_armor = _frozen(armor.positions(monsters["armor"]))
+
+    def table(self, model: Type[SQLModel]) -> CatalogTable:
+        return {Weapon: self.weapons, Armor: self.armor, Monster: self.monsters}[model]
+
+    def monster_combatants(self, ids) -> Combatant:
+        """
+        Look up the combat numbers of many monsters and their equipment at once.
+
+        The result can be passed straight to simulate_fights() as the monster side.
+
+        :param ids: An array (or sequence) of monster ids.
+        :return: A combatant whose fields are arrays in the order of ids.
+        """
+        positions = self.monsters.positions(ids)
+        if (positions == MISSING).any():
+            raise KeyError(f"Unknown monster ids: {np.asarray(ids)[positions == MISSING].tolist()}")
+        weapons, armor = self.monster_weapon[positions], self.monster_armor[positions]
+        return Combatant(self.monsters["level"][positions], self.monsters["health"][positions],
+                         _gather(self.weapons["min_damage"], weapons, FISTS[0]),
+                         _gather(self.weapons["max_damage"], weapons, FISTS[1]),
+                         _gather(self.armor["ac"], armor, 0),
+                         _gather(self.armor["damage_buffer"], armor, 0))
+
+
+class Catalog:
+    """
+    Holds the current snapshot and rebuilds it after saves to the catalog tables.
+    """
+
+    def __init__(self):
+        self.snapshot: Optional[CatalogSnapshot] = None
+        self.rebuilds = 0
+        self._tables: Dict[Type[SQLModel], CatalogTable] = {}
+        self._stale: Set[Type[SQLModel]] = set(COLUMNS)
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def get(self) -> CatalogSnapshot:
+        """
+        Return a snapshot that includes every save made before the call, rebuilding if needed.
+
+        :return: The current snapshot.
+        """
+        if self._stale:
+            async with self._lock:
+                if self._stale:
+                    await self._rebuild()
+        return self.snapshot
+
+    def on_save(self, model: Type[SQLModel], entity_id: int, values: Optional[dict]) -> None:
+        """
+        Save listener: mark a table stale when one of its snapshot columns changed.
+
+        :param model: The model class that was saved.
+        :param entity_id: The id of the saved row.
+        :param values: The column values written, or None if another worker saved the row.
+        :return:
+        """
+        if model in COLUMNS and (values is None or not set(COLUMNS[model]).isdisjoint(values)):
+            self._mark_stale({model})
+
+    def reset(self) -> None:
+        """
+        Reset listener: rebuild every table, since any row may have changed.
+
+        :return:
+        """
+        self._mark_stale(set(COLUMNS))
+
+    def stats(self) -> dict:
+        """
+        Report the table sizes and rebuild counter.
+
+        :return: A dictionary of counters.
+        """
+        snapshot = self.snapshot
+        return {"weapons": len(snapshot.weapons) if snapshot else 0, "armor": len(snapshot.armor) if snapshot else 0,
+                "monsters": len(snapshot.monsters) if snapshot else 0, "rebuilds": self.rebuilds}
+
+    def _mark_stale(self, models: Set[Type[SQLModel]]) -> None:
+        self._stale |= models
+        # Rebuild in the background once in use, so readers rarely wait; saves in a burst share one rebuild.
+        if self.snapshot is not None and (self._task is None or self._task.done()):
+            self._task = asyncio.get_running_loop().create_task(self._refresh())
+
+    async def _refresh(self) -> None:
+        while self._stale:
+            await self.get()
+
+    async def _rebuild(self) -> None:
+        stale, self._stale = list(self._stale), set()
+        try:
+            rows = await asyncio.gather(*(get_catalog_columns(model, COLUMNS[model]) for model in stale))
+        except BaseException:
+            self._stale.update(stale)
+            raise
+        tables = dict(self._tables)
+        for model, model_rows in zip(stale, rows):
+            tables[model] = CatalogTable.from_rows(model_rows, COLUMNS[model])
+        self._tables = tables
+        self.rebuilds += 1
+        self.snapshot = CatalogSnapshot(tables[Weapon], tables[Armor], tables[Monster], self.rebuilds)
+        logger.debug("Rebuilt catalog snapshot %d (%s).", self.rebuilds,
+                     ", ".join(model.__tablename__ for model in stale))
+
+
+catalog = Catalog()
+add_save_listener(catalog.on_save)
+add_reset_listener(catalog.reset)
@@ -0,0 +1,209 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Combat rules.
+
+A fight is a series of rounds.  Each round the player strikes first and, if the monster survives,
+the monster strikes back.  A strike hits with
+
+    chance = BASE_HIT_CHANCE + LEVEL_HIT_BONUS * (attacker level - defender level)
+                             - AC_HIT_PENALTY * defender armor class
+
+clamped to [MIN_HIT_CHANCE, MAX_HIT_CHANCE].  A hit rolls the weapon's damage uniformly from
+min_damage to max_damage inclusive and subtracts the defender's armor damage_buffer, but always
+does at least MIN_HIT_DAMAGE.  A damage range entered the wrong way round rolls between the same
+two numbers.  A fight still going after MAX_ROUNDS is a draw, which the player has not won.
+
+resolve_fight() plays one fight for the live game.  simulate_fights() plays a whole batch at
+once with NumPy, one vectorized step per round across every fight in the batch.
+"""
+
+from typing import NamedTuple, Optional, Union
+import random
+
+import numpy as np
+
+from models.armor import Armor
+from models.monsters import Monster
+from models.players import Player
+from models.weapons import Weapon
+
+BASE_HIT_CHANCE = 0.75
+LEVEL_HIT_BONUS = 0.02
+AC_HIT_PENALTY = 0.005
+MIN_HIT_CHANCE = 0.05
+MAX_HIT_CHANCE = 0.95
+MIN_HIT_DAMAGE = 1
+MAX_ROUNDS = 100
+
+# Used when a combatant has nothing equipped.
+FISTS = (1, 2)
+
+ArrayLike = Union[int, float, np.ndarray]
+
+
+class Combatant(NamedTuple):
+    """
+    The numbers combat needs from one side of a fight.
+    """
+    level: int
+    health: int
+    min_damage: int
+    max_damage: int
+    ac: int
+    damage_buffer: int
+
+    @classmethod
+    def equipped(cls, level: int, health: int, weapon: Optional[Weapon], armor: Optional[Armor]) -> "Combatant":
+        min_damage, max_damage = (weapon.min_damage, weapon.max_damage) if weapon else FISTS
+        ac, damage_buffer = (armor.ac, armor.damage_buffer) if armor else (0, 0)
+        return cls(level, health, min_damage, max_damage, ac, damage_buffer)
+
+    @classmethod
+    def from_player(cls, player: Player, weapon: Optional[Weapon], armor: Optional[Armor]) -> "Combatant":
+        """
+        Build a combatant from a player and the items they have equipped.
+
+        :param player: The player.
+        :param weapon: The player's weapon, or None if unarmed.
+        :param armor: The player's armor, or None if unarmored.
+        :return: The combatant.
+        """
+        return cls.equipped(player.level, player.health, weapon, armor)
+
+    @classmethod
+    def from_monster(cls, monster: Monster, weapon: Optional[Weapon], armor: Optional[Armor]) -> "Combatant":
+        """
+        Build a combatant from a monster and the items it has equipped.
+
+        :param monster: The monster.
+        :param weapon: The monster's weapon, or None if unarmed.
+        :param armor: The monster's armor, or None if unarmored.
+        :return: The combatant.
+        """
+        return cls.equipped(monster.level, monster.health, weapon, armor)
+
+
+class FightResult(NamedTuple):
+    player_won: bool
+    rounds: int
+    player_health: int
+    monster_health: int
+
+
+class BatchResult(NamedTuple):
+    player_won: np.ndarray
+    rounds: np.ndarray
+    player_health: np.ndarray
+    monster_health: np.ndarray
+
+
+def hit_chance(attacker_level: ArrayLike, defender_level: ArrayLike, defender_ac: ArrayLike) -> ArrayLike:
+    """
+    Chance that a strike lands; works on scalars and NumPy arrays alike.
+
+    :param attacker_level: Level of the attacker.
+    :param defender_level: Level of the defender.
+    :param defender_ac: Armor class of the defender.
+    :return: Probability between MIN_HIT_CHANCE and MAX_HIT_CHANCE.
+    """
+    chance = (BASE_HIT_CHANCE + LEVEL_HIT_BONUS * (np.asarray(attacker_level) - defender_level)
+              - AC_HIT_PENALTY * np.asarray(defender_ac))
+    return np.clip(chance, MIN_HIT_CHANCE, MAX_HIT_CHANCE)
+
+
+def _strike(attacker: Combatant, defender: Combatant, rng: random.Random) -> int:
+    if rng.random() >= hit_chance(attacker.level, defender.level, defender.ac):
+        return 0
+    low, high = sorted((attacker.min_damage, attacker.max_damage))
+    damage = rng.randint(low, high) - defender.damage_buffer
+    return max(damage, MIN_HIT_DAMAGE)
+
+
+def resolve_fight(player: Combatant, monster: Combatant, rng: Optional[random.Random] = None) -> FightResult:
+    """
+    Play out one fight between a player and a monster.
+
+    :param player: The player's side.
+    :param monster: The monster's side.
+    :param rng: Random source, seed it for a reproducible fight.
+    :return: Who won, how many rounds it took and the health left on each side.
+    """
+    rng = rng or random.Random()
+    player_health, monster_health = player.health, monster.health
+
+    for round_number in range(1, MAX_ROUNDS + 1):
+        monster_health -= _strike(player, monster, rng)
+        if monster_health <= 0:
+            return FightResult(True, round_number, player_health, monster_health)
+        player_health -= _strike(monster, player, rng)
+        if player_health <= 0:
+            return FightResult(False, round_number, player_health, monster_health)
+
+    return FightResult(False, MAX_ROUNDS, player_health, monster_health)
+
+
+def _batch_strike(attacker: dict, defender: dict, live: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    hits = rng.random(live.size) < hit_chance(attacker["level"][live], defender["level"][live], defender["ac"][live])
+    rolls = rng.integers(attacker["min_damage"][live], attacker["max_damage"][live], endpoint=True)
+    damage = np.maximum(rolls - defender["damage_buffer"][live], MIN_HIT_DAMAGE)
+    return np.where(hits, damage, 0)
+
+
+def simulate_fights(player: Combatant, monster: Combatant, n: int, seed: Optional[int] = None) -> BatchResult:
+    """
+    Simulate n fights at once.
+
+    Each field of either combatant may be a scalar or an array of length n, so one call can pit
+    the same player against many monsters, many loadouts against one monster, or any mix.  Every
+    round is one vectorized step over the fights still running, so finished fights cost nothing.
+
+    :param player: The player's side, fields as scalars or length-n arrays.
+    :param monster: The monster's side, fields as scalars or length-n arrays.
+    :param n: Number of fights.
+    :param seed: Seed for the NumPy generator, for reproducible batches.
+    :return: Per-fight outcome arrays.
+    """
+    rng = np.random.default_rng(seed)
+    attacker = {field: np.broadcast_to(np.asarray(value, dtype=np.int64), (n,)) for field, value in player._asdict().items()}
+    defender = {field: np.broadcast_to(np.asarray(value, dtype=np.int64), (n,)) for field, value in monster._asdict().items()}
+    for side in (attacker, defender):
+        side["min_damage"], side["max_damage"] = (np.minimum(side["min_damage"], side["max_damage"]),
+                                                  np.maximum(side["min_damage"], side["max_damage"]))
+
+    player_health = attacker["health"].copy()
+    monster_health = defender["health"].copy()
+    rounds = np.full(n, MAX_ROUNDS, dtype=np.int64)
+    live = np.arange(n)
+
+    for round_number in range(1, MAX_ROUNDS + 1):
+        monster_health[live] -= _batch_strike(attacker, defender, live, rng)
+        killed = monster_health[live] <= 0
+        rounds[live[killed]] = round_number
+        live = live[~killed]
+
+        player_health[live] -= _batch_strike(defender, attacker, live, rng)
+        died = player_health[live] <= 0
+        rounds[live[died]] = round_number
+        live = live[~died]
+
+        if live.size == 0:
+            break
+
+    return BatchResult(monster_health <= 0, rounds, player_health, monster_health)
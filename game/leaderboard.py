@@ -0,0 +1,250 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Player leaderboards: top N and rank by experience, level and wealth.
+
+Each board is one sorted Python list of integer keys, searched with bisect.  A key packs the
+negated score above the player id, so the list runs best first and ties break by id.  The
+boards are loaded from the database on first use and after that a save only moves the one
+player it changed: a bisect to find the old key, one to place the new one, and no sort.
+"""
+
+from bisect import bisect_left, insort
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple, Type
+import asyncio
+import logging
+
+from sqlmodel import SQLModel
+
+from database.connections import add_reset_listener, add_save_listener, get_player_standings
+from models.players import Player
+
+logger = logging.getLogger("leaderboard")
+
+# Ids are below 2**32, so the score can sit in the bits above them.
+ID_SPAN = 1 << 32
+# Experience below 2**40 breaks ties on the level board.
+EXP_SPAN = 1 << 40
+
+
+class Standing(NamedTuple):
+    level: int
+    exp: int
+    gold: int
+    bank: int
+
+    @property
+    def wealth(self) -> int:
+        return self.gold + self.bank
+
+
+STANDING_FIELDS = set(Standing._fields)
+
+
+class Leaderboard:
+    """
+    Players ordered by one score, best first.
+    """
+
+    def __init__(self, name: str, score: Callable[[Standing], int]):
+        self.name = name
+        self.score = score
+        self._keys: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def key(self, entity_id: int, standing: Standing) -> int:
+        return -self.score(standing) * ID_SPAN + entity_id
+
+    def load(self, standings: Iterable[Tuple[int, Standing]]) -> None:
+        self._keys = sorted(self.key(entity_id, standing) for entity_id, standing in standings)
+
+    def add(self, entity_id: int, standing: Standing) -> None:
+        insort(self._keys, self.key(entity_id, standing))
+
+    def remove(self, entity_id: int, standing: Standing) -> None:
+        key = self.key(entity_id, standing)
+        position = bisect_left(self._keys, key)
+        if position < len(self._keys) and self._keys[position] == key:
+            del self._keys[position]
+
+    def move(self, entity_id: int, old: Standing, new: Standing) -> None:
+        """
+        Re-score one player, shifting only the keys between its old and new places.
+
+        Scores mostly change by a little, so this copies far less than a delete and insert,
+        which would each shift the whole tail of the list.
+
+        :param entity_id: The player id.
+        :param old: The standing the board holds.
+        :param new: The new standing.
+        :return:
+        """
+        keys = self._keys
+        old_key, new_key = self.key(entity_id, old), self.key(entity_id, new)
+        source = bisect_left(keys, old_key)
+        if source == len(keys) or keys[source] != old_key:
+            self.add(entity_id, new)
+            return
+        target = bisect_left(keys, new_key)
+        if target > source:
+            keys[source:target - 1] = keys[source + 1:target]
+            keys[target - 1] = new_key
+        else:
+            keys[target + 1:source + 1] = keys[target:source]
+            keys[target] = new_key
+
+    def rank(self, standing: Standing) -> int:
+        """
+        Return the rank a standing holds: one more than the number of players scoring higher.
+
+        :param standing: The player's standing.
+        :return: The rank, from 1.  Tied players share a rank.
+        """
+        return bisect_left(self._keys, -self.score(standing) * ID_SPAN) + 1
+
+    def top(self, offset: int, limit: int) -> List[int]:
+        """
+        Return the player ids on one page of the board.
+
+        :param offset: Players to skip.
+        :param limit: Players to return.
+        :return: Ids, best first.
+        """
+        return [key % ID_SPAN for key in self._keys[offset:offset + limit]]
+
+
+class Leaderboards:
+    """
+    Every board over the same player standings, kept current by the save listener.
+    """
+
+    def __init__(self):
+        self.boards: Dict[str, Leaderboard] = {
+            "exp": Leaderboard("exp", lambda standing: standing.exp),
+            "level": Leaderboard("level", lambda standing: standing.level * EXP_SPAN + min(standing.exp, EXP_SPAN - 1)),
+            "wealth": Leaderboard("wealth", lambda standing: standing.wealth),
+        }
+        self.updates = 0
+        self._standings: Dict[int, Standing] = {}
+        self._ready = False
+        self._loading = False
+        self._dirty: Set[int] = set()
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._standings)
+
+    async def get(self) -> "Leaderboards":
+        """
+        Return the boards, loading them on first use.
+
+        :return: These boards, fully loaded.
+        """
+        if not self._ready:
+            async with self._lock:
+                if not self._ready:
+                    await self._load()
+        return self
+
+    def standing(self, entity_id: int) -> Optional[Standing]:
+        return self._standings.get(entity_id)
+
+    def on_save(self, model: Type[SQLModel], entity_id: int, values: Optional[dict]) -> None:
+        """
+        Save listener: move a player whose level, experience, gold or bank changed.
+
+        :param model: The model class that was saved.
+        :param entity_id: The id of the saved row.
+        :param values: The column values written, or None if another worker saved the row.
+        :return:
+        """
+        if model is not Player or (values is not None and not STANDING_FIELDS.intersection(values)):
+            return
+        if self._loading:
+            # Re-read once the load finishes, since the load may have read the old row.
+            self._dirty.add(entity_id)
+            return
+        if not self._ready:
+            return
+        current = self._standings.get(entity_id)
+        if current is None or values is None:
+            asyncio.get_running_loop().create_task(self._refresh([entity_id]))
+            return
+        self._move(entity_id, current._replace(**{field: values[field] for field in STANDING_FIELDS & set(values)}))
+
+    def reset(self) -> None:
+        """
+        Reset listener: reload every standing on next use.
+
+        :return:
+        """
+        if self._ready:
+            self._ready = False
+            self._standings = {}
+            for board in self.boards.values():
+                board.load(())
+
+    def stats(self) -> dict:
+        """
+        Report the board sizes and update counter.
+
+        :return: A dictionary of counters.
+        """
+        return {"players": len(self._standings), "updates": self.updates,
+                **{f"{name}_entries": len(board) for name, board in self.boards.items()}}
+
+    def _move(self, entity_id: int, standing: Optional[Standing]) -> None:
+        current = self._standings.pop(entity_id, None)
+        for board in self.boards.values():
+            if current is not None and standing is not None:
+                board.move(entity_id, current, standing)
+            elif current is not None:
+                board.remove(entity_id, current)
+            elif standing is not None:
+                board.add(entity_id, standing)
+        if standing is not None:
+            self._standings[entity_id] = standing
+        self.updates += 1
+
+    async def _load(self) -> None:
+        self._loading = True
+        try:
+            rows = await get_player_standings()
+            self._standings = {row[0]: Standing(*row[1:]) for row in rows}
+            for board in self.boards.values():
+                board.load(self._standings.items())
+            self._ready = True
+            logger.info("Loaded %d players into the leaderboards.", len(self._standings))
+        finally:
+            self._loading = False
+        while self._dirty:
+            dirty, self._dirty = list(self._dirty), set()
+            await self._refresh(dirty)
+
+    async def _refresh(self, ids: List[int]) -> None:
+        rows = {row[0]: Standing(*row[1:]) for row in await get_player_standings(ids)}
+        for entity_id in ids:
+            self._move(entity_id, rows.get(entity_id))
+
+
+leaderboards = Leaderboards()
+add_save_listener(leaderboards.on_save)
+add_reset_listener(leaderboards.reset)
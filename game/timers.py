@@ -0,0 +1,130 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Hierarchical timer wheel.
+
+Time advances in whole ticks.  Level 0 has one slot per tick for the next SLOTS ticks, level 1
+one slot per SLOTS ticks for the next SLOTS**2, and so on.  A timer is placed in the lowest
+level whose span covers its delay, so scheduling and cancelling are a dictionary insert or
+delete.  Each tick empties one level-0 slot; every SLOTS ticks one slot of the level above is
+spread down over the level below.  A timer is therefore moved at most LEVELS - 1 times before it
+fires, and a tick costs the same whether 10 or 10 million timers are waiting.
+"""
+
+from typing import Any, Dict, Hashable, List, Tuple
+
+SLOT_BITS = 6
+SLOTS = 1 << SLOT_BITS
+LEVELS = 4
+
+
+class TimerWheel:
+    """
+    Timers keyed by any hashable, each carrying a value handed back when it fires.
+
+    A key has at most one timer; scheduling it again moves it.
+    """
+
+    def __init__(self, levels: int = LEVELS):
+        self.now = 0
+        self.levels = levels
+        # The longest delay the wheel can hold, in ticks.
+        self.horizon = (1 << (SLOT_BITS * levels)) - 1
+        self._wheels: List[List[Dict[Hashable, Any]]] = [[{} for _ in range(SLOTS)] for _ in range(levels)]
+        # key -> (deadline, level, slot)
+        self._timers: Dict[Hashable, Tuple[int, int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._timers)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._timers
+
+    def schedule(self, key: Hashable, delay: int, value: Any = None) -> None:
+        """
+        Fire a timer after a number of ticks, replacing any timer already set for the key.
+
+        :param key: Identifies the timer.
+        :param delay: Ticks from now, at least 1.
+        :param value: Returned with the key when the timer fires.
+        :return:
+        """
+        if not 1 <= delay <= self.horizon:
+            raise ValueError(f"Timer delay must be between 1 and {self.horizon} ticks, not {delay}.")
+        self.cancel(key)
+        self._place(key, self.now + delay, value)
+
+    def cancel(self, key: Hashable) -> bool:
+        """
+        Remove a timer.
+
+        :param key: Identifies the timer.
+        :return: True if a timer was set for the key.
+        """
+        timer = self._timers.pop(key, None)
+        if timer is None:
+            return False
+        _, level, slot = timer
+        del self._wheels[level][slot][key]
+        return True
+
+    def deadline(self, key: Hashable) -> int:
+        """
+        Return the tick a timer fires on.
+
+        :param key: Identifies the timer.
+        :return: The tick, or -1 if no timer is set for the key.
+        """
+        timer = self._timers.get(key)
+        return -1 if timer is None else timer[0]
+
+    def advance(self) -> List[Tuple[Hashable, Any]]:
+        """
+        Move to the next tick and remove every timer due on it.
+
+        :return: (key, value) of every timer that fired.
+        """
+        self.now += 1
+        # Spread down the higher-level slots that the clock has just entered, highest first, so a
+        # timer can fall through several levels in one tick.
+        cascade = []
+        for level in range(1, self.levels):
+            if (self.now >> (SLOT_BITS * (level - 1))) & (SLOTS - 1):
+                break
+            cascade.append(level)
+        for level in reversed(cascade):
+            slot = (self.now >> (SLOT_BITS * level)) & (SLOTS - 1)
+            timers, self._wheels[level][slot] = self._wheels[level][slot], {}
+            for key, value in timers.items():
+                self._place(key, self._timers[key][0], value)
+
+        slot = self.now & (SLOTS - 1)
+        due, self._wheels[0][slot] = self._wheels[0][slot], {}
+        for key in due:
+            del self._timers[key]
+        return list(due.items())
+
+    def _place(self, key: Hashable, deadline: int, value: Any) -> None:
+        delay = deadline - self.now
+        level = 0
+        while level < self.levels - 1 and delay >= 1 << (SLOT_BITS * (level + 1)):
+            level += 1
+        slot = (deadline >> (SLOT_BITS * level)) & (SLOTS - 1)
+        self._wheels[level][slot][key] = value
+        self._timers[key] = (deadline, level, slot)
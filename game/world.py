@@ -0,0 +1,347 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+World scheduler: the periodic effects that happen whether anyone is playing or not.
+
+    regeneration  an injured player heals REGEN_PERCENT of their maximum health every REGEN_SECONDS
+    interest      every player's bank earns INTEREST_BASIS_POINTS every INTEREST_SECONDS
+    respawn       a slain monster comes back RESPAWN_SECONDS after it was killed
+
+Every pending effect is one timer on a TimerWheel ticking every TICK_SECONDS, so a tick only
+touches the timers that fire on it however many players are waiting.  Interest timers are
+staggered by player id so they do not all land on the same tick.  The players' level, health
+and bank are mirrored in memory and kept current by the save listener; changed players are
+collected and written every FLUSH_SECONDS through save_row_values(), which the write queue
+commits in batches, instead of one save per player per tick.  Each write only goes through if
+the row is still at the version the world last saw, and does not bump it, so an edit form open
+on a player does not go stale as they heal; the form in turn leaves health and bank out of its
+save unless they were changed on it.  A player saved by anyone else in between is re-read
+rather than overwritten with the world's older values.
+
+Only one worker process may run the world, or every effect would be applied once per worker.
+The first to take an exclusive lock on a file next to the database runs it; the others leave
+it alone and pick up its writes through the change feed.  Monster deaths are not stored in the
+database, so a restart respawns every monster.
+"""
+
+from typing import Dict, List, NamedTuple, Optional, Set, Type
+import asyncio
+import logging
+import os
+
+from sqlmodel import SQLModel
+
+from database.connections import add_reset_listener, add_save_listener, engine, get_player_vitals, save_row_values
+from game.timers import TimerWheel
+from models.players import Player
+
+logger = logging.getLogger("world")
+
+TICK_SECONDS = float(os.environ.get("SONZO_WORLD_TICK", "1"))
+FLUSH_SECONDS = float(os.environ.get("SONZO_WORLD_FLUSH", "5"))
+REGEN_SECONDS = 10
+REGEN_PERCENT = 5
+INTEREST_SECONDS = 3600
+INTEREST_BASIS_POINTS = 10
+RESPAWN_SECONDS = 60
+
+BASE_HEALTH = 100
+HEALTH_PER_LEVEL = 10
+VITAL_FIELDS = {"level", "health", "bank"}
+
+
+def max_health(level: int) -> int:
+    """
+    Return the health a player of a level regenerates up to.
+
+    :param level: The player's level.
+    :return: The maximum health.
+    """
+    return BASE_HEALTH + HEALTH_PER_LEVEL * level
+
+
+class Vitals(NamedTuple):
+    level: int
+    health: int
+    bank: int
+
+
+class World:
+    """
+    The world clock, the timers hanging off it and the player changes waiting to be written.
+    """
+
+    def __init__(self, tick_seconds: float = TICK_SECONDS, flush_seconds: float = FLUSH_SECONDS):
+        self.tick_seconds = tick_seconds
+        self.flush_every = max(1, round(flush_seconds / tick_seconds))
+        self.wheel = TimerWheel()
+        self.ticks = 0
+        self.fired = 0
+        self.flushed = 0
+        self._players: Dict[int, Vitals] = {}
+        self._versions: Dict[int, int] = {}
+        self._dirty: Dict[int, dict] = {}
+        # Values this world wrote, so their save notifications are not taken for someone else's edit.
+        self._written: Dict[int, dict] = {}
+        self._dead: Set[int] = set()
+        self._handlers = {"regen": self._regen, "interest": self._interest, "respawn": self._respawn}
+        self._task: Optional[asyncio.Task] = None
+        self._flushing: Optional[asyncio.Task] = None
+        self._lock_file = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def start(self) -> None:
+        """
+        Load the players and start ticking, unless another worker already runs the world.
+
+        :return:
+        """
+        if self._task is not None:
+            return
+        if not self._take_lock():
+            logger.info("Another worker runs the world.")
+            return
+        await self._load()
+        self._task = asyncio.get_running_loop().create_task(self._run(), name="sonzo-world")
+        logger.info("World started with %d players and %d timers.", len(self._players), len(self.wheel))
+
+    async def close(self) -> None:
+        """
+        Stop ticking and write out every pending change.
+
+        :return:
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self._flushing is not None:
+            await self._flushing
+        await self._flush()
+        self._release_lock()
+
+    def kill_monster(self, monster_id: int) -> None:
+        """
+        Mark a monster as slain until its respawn timer fires.
+
+        :param monster_id: The id of the monster.
+        :return:
+        """
+        self._dead.add(monster_id)
+        self.wheel.schedule(("respawn", monster_id), self._ticks(RESPAWN_SECONDS))
+
+    def monster_alive(self, monster_id: int) -> bool:
+        return monster_id not in self._dead
+
+    def on_save(self, model: Type[SQLModel], entity_id: int, values: Optional[dict]) -> None:
+        """
+        Save listener: adopt a player's new level, health or bank and start regenerating if injured.
+
+        :param model: The model class that was saved.
+        :param entity_id: The id of the saved row.
+        :param values: The column values written, or None if another worker saved the row.
+        :return:
+        """
+        if self._task is None or model is not Player:
+            return
+        if values is not None and "version" in values and entity_id in self._players:
+            self._versions[entity_id] = values["version"]
+        if values is not None:
+            changed = {field: values[field] for field in VITAL_FIELDS & set(values)}
+            written = self._written.get(entity_id)
+            if not changed or written is not None and all(written.get(field) == value
+                                                          for field, value in changed.items()):
+                return
+        current = self._players.get(entity_id)
+        if current is None or values is None:
+            asyncio.get_running_loop().create_task(self._refresh([entity_id]))
+            return
+        # The edit wins over ticks that have not been written yet.
+        pending = self._dirty.get(entity_id)
+        if pending is not None:
+            for field in changed:
+                pending.pop(field, None)
+        self._set(entity_id, current._replace(**changed))
+
+    def reset(self) -> None:
+        """
+        Reset listener: re-read every player, since changes may have been missed.
+
+        :return:
+        """
+        if self._task is not None:
+            asyncio.get_running_loop().create_task(self._refresh(None))
+
+    def stats(self) -> dict:
+        """
+        Report the clock, timer and write counters.
+
+        :return: A dictionary of counters.
+        """
+        return {"running": self.running, "ticks": self.ticks, "timers": len(self.wheel), "fired": self.fired,
+                "players": len(self._players), "dead_monsters": len(self._dead),
+                "pending_writes": len(self._dirty), "flushed": self.flushed}
+
+    def tick(self) -> None:
+        """
+        Advance the clock by one tick, apply every effect due and start a flush when one is due.
+
+        :return:
+        """
+        self.ticks += 1
+        for (kind, entity_id), _ in self.wheel.advance():
+            self.fired += 1
+            try:
+                self._handlers[kind](entity_id)
+            except Exception:
+                logger.exception("World %s timer for %d failed.", kind, entity_id)
+        if self.ticks % self.flush_every == 0 and self._dirty and (self._flushing is None or self._flushing.done()):
+            self._flushing = asyncio.get_running_loop().create_task(self._flush())
+
+    def _ticks(self, seconds: float) -> int:
+        return max(1, round(seconds / self.tick_seconds))
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        while True:
+            # Catch up on ticks missed while the loop was busy rather than drifting.
+            while self.ticks < int((loop.time() - start) / self.tick_seconds):
+                self.tick()
+            await asyncio.sleep(start + (self.ticks + 1) * self.tick_seconds - loop.time())
+
+    def _regen(self, player_id: int) -> None:
+        vitals = self._players.get(player_id)
+        if vitals is None:
+            return
+        limit = max_health(vitals.level)
+        if vitals.health < limit:
+            self._change(player_id, vitals, health=min(limit, vitals.health + max(1, limit * REGEN_PERCENT // 100)))
+
+    def _interest(self, player_id: int) -> None:
+        vitals = self._players.get(player_id)
+        if vitals is None:
+            return
+        self.wheel.schedule(("interest", player_id), self._ticks(INTEREST_SECONDS))
+        earned = vitals.bank * INTEREST_BASIS_POINTS // 10000
+        if earned > 0:
+            self._change(player_id, vitals, bank=vitals.bank + earned)
+
+    def _respawn(self, monster_id: int) -> None:
+        self._dead.discard(monster_id)
+
+    def _change(self, player_id: int, vitals: Vitals, **values) -> None:
+        self._dirty.setdefault(player_id, {}).update(values)
+        self._set(player_id, vitals._replace(**values))
+
+    def _set(self, player_id: int, vitals: Optional[Vitals]) -> None:
+        # Store a player's vitals and make sure the timers match them.
+        if vitals is None:
+            self._players.pop(player_id, None)
+            self.wheel.cancel(("regen", player_id))
+            self.wheel.cancel(("interest", player_id))
+            self._dirty.pop(player_id, None)
+            self._versions.pop(player_id, None)
+            return
+        if player_id not in self._players:
+            interval = self._ticks(INTEREST_SECONDS)
+            self.wheel.schedule(("interest", player_id), 1 + player_id % interval)
+        self._players[player_id] = vitals
+        regen = ("regen", player_id)
+        if vitals.health < max_health(vitals.level):
+            if regen not in self.wheel:
+                self.wheel.schedule(regen, self._ticks(REGEN_SECONDS))
+        else:
+            self.wheel.cancel(regen)
+
+    async def _flush(self) -> None:
+        while self._dirty:
+            dirty, self._dirty = self._dirty, {}
+            dirty = {player_id: values for player_id, values in dirty.items() if values}
+            self._written.update(dirty)
+            try:
+                written = await save_row_values(Player, dirty, {player_id: self._versions.get(player_id)
+                                                                for player_id in dirty}, bump_version=False)
+            finally:
+                for player_id, values in dirty.items():
+                    if self._written.get(player_id) is values:
+                        del self._written[player_id]
+            self.flushed += len(written)
+            # Saved by someone else since the world last saw them: take their values instead.
+            stale = [player_id for player_id in dirty if player_id not in written]
+            if stale:
+                await self._refresh(stale)
+            if self._task is not None:
+                return
+
+    async def _load(self) -> None:
+        for row in await get_player_vitals():
+            self._set(row[0], Vitals(*row[1:4]))
+            self._versions[row[0]] = row[4]
+
+    async def _refresh(self, ids: Optional[List[int]]) -> None:
+        rows = {row[0]: row[1:] for row in await get_player_vitals(ids)}
+        for player_id in (ids if ids is not None else set(self._players) | set(rows)):
+            self._dirty.pop(player_id, None)
+            row = rows.get(player_id)
+            self._set(player_id, Vitals(*row[:3]) if row else None)
+            if row:
+                self._versions[player_id] = row[3]
+
+    def _take_lock(self) -> bool:
+        database = engine.url.database
+        if not database or database == ":memory:":
+            return True
+        self._lock_file = open(f"{database}.world-lock", "a+")
+        try:
+            _lock(self._lock_file)
+        except OSError:
+            self._lock_file.close()
+            self._lock_file = None
+            return False
+        return True
+
+    def _release_lock(self) -> None:
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+
+try:
+    import fcntl
+
+    def _lock(file) -> None:
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+except ImportError:
+    import msvcrt
+
+    def _lock(file) -> None:
+        msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+
+
+world = World()
+add_save_listener(world.on_save)
+add_reset_listener(world.reset)
@@ -19,53 +19,135 @@ limitations under the License.
 
 
 from fastapi import FastAPI, Request, Depends
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 
-from models import explorer
+from models import explorer, api, login, admin
+from database.connections import catalog_cache_stats, search_index_stats, init_database, run_in_db_thread, write_queue
+from database.connections import change_feed, engine
+from auth.passwords import password_hasher
+from auth.tokens import claims_cache
+from game.balance import balance_matrix
+from game.catalog import catalog
+from game.world import world
+from web.images import build_image_derivatives, load_manifest
+from web.assets import build_assets
+from web.static import ImmutableStaticFiles, PrecompressedStaticFiles
+from web.templating import configure_templates
+from web.page_cache import page_cache
+from web.live import live_hub
+from telemetry.logs import configure_logging
+from telemetry.metrics import CONTENT_TYPE, Gauge, MetricsMiddleware, instrument_engine, monitor_event_loop
+from telemetry.metrics import register, register_cache_metrics, render
 
 from os import urandom
 from os.path import join, exists
 from pathlib import Path
+from contextlib import AsyncExitStack, asynccontextmanager
+import asyncio
+import threading
 from datetime import datetime, timedelta
-from jose import jwt, JWTError
-from passlib.context import CryptContext
 
 
-import json
-
-import logging.config
+import logging
 from pythonjsonlogger import jsonlogger
 
-# Read logging.json configuration file and apply it to the logger.
-with open("logging.json", "r") as f:
-    logging_config = json.load(f)
-    logging.config.dictConfig(config=logging_config)
+# Apply logging.json, with its handlers moved behind a queue onto a background thread.
+configure_logging("logging.json")
 
 logger = logging.getLogger("main")
 logger.info("Starting Server Legend of the Sonzo Dragon.")
 
 
 
-SECRET_KEY = 'aee7f77e1797a65b192e7b411322d71a243a7de6c81c8996dfe6c2b0f0b041ce'
+# Token signing settings live in auth.tokens (SONZO_SECRET_KEY, else a key generated into SONZO_SECRET_KEY_FILE);
+# this prints a fresh key to use there.
 NEW_KEY = (urandom(32).hex())
 print(f"NEW_KEY: {NEW_KEY}")
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-app = FastAPI()
+def _image_build_done(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Building image derivatives failed.", exc_info=task.exception())
+    # Pages rendered before the build finished point at the old derivatives.
+    page_cache.clear()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Prepares the game database, static assets and image derivatives before serving and flushes pending writes on shutdown.
+
+    :param app:\n
+    :return:\n
+    """
+    # Teardown runs in reverse order of registration, including after a failed startup step,
+    # and every step runs even if an earlier one raises.
+    async with AsyncExitStack() as shutdown:
+        shutdown.callback(password_hasher.close)
+        shutdown.push_async_callback(balance_matrix.close)
+        await run_in_db_thread(init_database)
+        # Saves committed by other workers invalidate this worker's caches.
+        shutdown.push_async_callback(change_feed.close)
+        await change_feed.start()
+        # The world flushes through the write queue, so the queue closes after it.
+        shutdown.push_async_callback(write_queue.close)
+        # Regeneration, interest and respawn timers; only one worker runs them.
+        shutdown.push_async_callback(world.close)
+        await world.start()
+        await asyncio.to_thread(build_assets)
+        # Serve whatever derivatives exist now; new or changed images are encoded in the background.
+        # Shutdown doesn't wait for the build: it stops after the image in progress.
+        load_manifest()
+        stop_image_build = threading.Event()
+        image_build = asyncio.create_task(asyncio.to_thread(build_image_derivatives, stop_image_build))
+        image_build.add_done_callback(_image_build_done)
+        shutdown.callback(image_build.cancel)
+        shutdown.callback(stop_image_build.set)
+        loop_monitor = asyncio.create_task(monitor_event_loop())
+        shutdown.callback(loop_monitor.cancel)
+        yield
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+
+# Metrics
+instrument_engine(engine)
+register_cache_metrics(lambda: {**catalog_cache_stats(), "pages": page_cache.stats(), "tokens": claims_cache.stats()})
+register(Gauge("sonzo_write_queue_writes_total", "Row updates committed by the write queue.", (),
+               lambda: {(): write_queue.writes}, "counter"))
+register(Gauge("sonzo_write_queue_batches_total", "Write queue transactions committed.", (),
+               lambda: {(): write_queue.batches}, "counter"))
+register(Gauge("sonzo_world_ticks_total", "World clock ticks run by this worker.", (),
+               lambda: {(): world.ticks}, "counter"))
+register(Gauge("sonzo_world_timers", "Regeneration, interest and respawn timers waiting to fire.", (),
+               lambda: {(): len(world.wheel)}))
+register(Gauge("sonzo_catalog_rebuilds_total", "Catalog snapshots rebuilt after saves to weapons, armor or monsters.",
+               (), lambda: {(): catalog.rebuilds}, "counter"))
+register(Gauge("sonzo_live_subscribers", "Open live update WebSockets.", (),
+               lambda: {(): live_hub.stats()["subscribers"]}))
+register(Gauge("sonzo_live_dropped_total", "Live updates dropped because a client fell behind.", (),
+               lambda: {(): live_hub.stats()["dropped"]}, "counter"))
+register(Gauge("sonzo_change_feed_changes_total", "Rows changed by other workers and invalidated here.", (),
+               lambda: {(): change_feed.changes}, "counter"))
+register(Gauge("sonzo_change_feed_resets_total", "Times this worker fell behind the change log and dropped its caches.",
+               (), lambda: {(): change_feed.resets}, "counter"))
 
 # Including Sub-Routers
 app.include_router(explorer.router)
+app.include_router(api.router)
+app.include_router(login.router)
+app.include_router(admin.router)
 
-# Mounting Static Files
+# Mounting Static Files (content-hashed builds first, so the plain mount doesn't shadow them)
+app.mount("/static/build", PrecompressedStaticFiles(directory="static/build", check_dir=False), name="build")
+app.mount("/static/derived", ImmutableStaticFiles(directory="static/derived", check_dir=False), name="derived")
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 # Configuring Jinja2 Template Engine for HTML Rendering
 top = Path(__file__).resolve().parent
-templates = Jinja2Templates(directory=join(f"{top}", "templates"))
+templates = configure_templates(Jinja2Templates(directory=join(f"{top}", "templates")))
 
 
 @app.get("/")
@@ -91,6 +173,27 @@ async def get_license(request: Request) -> HTMLResponse:
     return templates.TemplateResponse(request=request, name="license.html")
 
 
+@app.get("/stats/cache")
+async def get_cache_stats() -> dict:
+    """
+    Reports hit/miss counters for the in-process catalog, rendered-page and token claims caches and the search indexes.
+
+    :return:\n
+    """
+    return {**catalog_cache_stats(), "pages": page_cache.stats(), "tokens": claims_cache.stats(),
+            "search": search_index_stats()}
+
+
+@app.get("/metrics")
+async def get_metrics() -> PlainTextResponse:
+    """
+    Reports request, database, event-loop and cache metrics in the Prometheus text format.
+
+    :return:\n
+    """
+    return PlainTextResponse(render(), media_type=CONTENT_TYPE)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=9001, reload=True)
\ No newline at end of file
@@ -0,0 +1,305 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Synthetic game data at production scale.
+
+Generates weapons, armor, monsters and players whose stats scale with a tier or level and
+whose weapon/armor columns always reference rows that exist.  The same seed and counts always
+produce the same rows.  Rows are streamed in batches and written with DB-API executemany(), one
+transaction per batch, so millions of rows never exist as ORM objects or in memory at once.
+
+Generate into the configured database (SONZO_DB_URL / database.json) with the app stopped:
+
+    python -m mock_data.generator --players 1000000 --monsters 20000 --weapons 2000 --armor 2000 --seed 7
+"""
+
+from typing import Iterator, List, Sequence, Tuple
+import argparse
+import logging
+import random
+import time
+
+from sqlalchemy import Engine
+
+from auth.passwords import hash_password
+from models.names import normalize_name
+
+logger = logging.getLogger("database")
+
+BATCH_SIZE = 50000
+IMAGE_DIR = "../../../static/images/items"
+
+WEAPON_TYPES = ["club", "dagger", "rapier", "cutlass", "axe", "mace", "spear", "longsword", "warhammer",
+                "halberd", "flail", "scimitar", "glaive", "morning star", "greatsword"]
+ARMOR_TYPES = ["rags", "padded vest", "patch armor", "jerkin", "brigandine", "chainmail", "scale mail",
+               "breastplate", "splint mail", "plate armor", "hauberk", "cuirass"]
+MATERIALS = ["oak", "bone", "copper", "bronze", "iron", "steel", "silver", "obsidian", "mithril",
+             "adamant", "dragonbone", "starmetal"]
+QUALITIES = ["crude", "worn", "sturdy", "fine", "keen", "masterwork", "runed", "blessed", "cursed",
+             "ancient", "gleaming", "legendary"]
+EPITHETS = ["", " of the boar", " of the wolf", " of embers", " of frost", " of the deep", " of ruin",
+            " of dawn", " of the fallen", " of storms"]
+
+MONSTER_KINDS = ["rat", "goblin", "kobold", "wolf", "orc", "ghoul", "troll", "ogre", "wyvern", "minotaur",
+                 "basilisk", "hydra", "lich", "drake", "dragon"]
+MONSTER_TRAITS = ["feral", "cave", "plague", "blood", "shadow", "frost", "ember", "bog", "iron", "bone",
+                  "storm", "elder"]
+
+SYLLABLES = ["ka", "ra", "zu", "mo", "thi", "del", "vor", "an", "el", "gar", "sha", "quin", "bra", "dor",
+             "fen", "lys", "mir", "nox", "tor", "ul", "wyn", "xan", "yor", "zel", "ash", "bel", "cor",
+             "dra", "eth", "fal", "gor", "hal"]
+TRAITS = ["brave", "grumpy", "sly", "loud", "patient", "reckless", "cheerful", "stubborn", "curious", "wary"]
+ROLES = ["sellsword", "hunter", "scholar", "farmhand", "smuggler", "pilgrim", "bard", "tinker", "squire"]
+
+WEAPON_IMAGES = ["weapon_small_club.png", "weapon_small_dagger.png", "weapon_rapier.png", "weapon_cutlass.png",
+                 "weapon_norse_field_axe.png"]
+ARMOR_IMAGES = ["armor_cloth_rags.png", "armor_leather_patch_armor.png", "armor_leather_armor.png",
+                "armor_basic_chainmail.png", "armor_dragon_scale.png"]
+MONSTER_IMAGES = ["monster_rat.png", "monster_goblin.png", "monster_orc.png", "monster_minotaur.png",
+                  "monster_sonzo_she-dragon.png"]
+PLAYER_IMAGES = ["player_frag.webp", "player_omegus.webp", "player_absolutezero.jpg", "player_smuttly.gif"]
+
+MAX_LEVEL = 50
+
+
+def unique_name(index: int, *parts: Sequence[str]) -> Tuple[str, ...]:
+    """
+    Map an index to a distinct combination of parts, counting in mixed radix.
+
+    Indexes past the number of combinations wrap around with a generation number, so every
+    index still gets its own name.
+
+    :param index: Row number, from 0.
+    :param parts: The word lists to combine, least significant first.
+    :return: One word from each list, then the generation (0 for the first pass).
+    """
+    words = []
+    for options in parts:
+        index, digit = divmod(index, len(options))
+        words.append(options[digit])
+    return (*words, index)
+
+
+def _image(images: List[str], tier: float) -> str:
+    return f"{IMAGE_DIR}/{images[min(len(images) - 1, int(tier * len(images)))]}"
+
+
+def _mark(generation: int) -> str:
+    return f" mk {generation + 1}" if generation else ""
+
+
+def weapon_rows(count: int, rng: random.Random) -> Iterator[tuple]:
+    """
+    Yield weapon rows, from crude to legendary.
+
+    :param count: Number of weapons.
+    :param rng: The seeded generator.
+    :return: Row tuples in WEAPON_COLUMNS order.
+    """
+    for i in range(count):
+        kind, material, quality, epithet, generation = unique_name(i, WEAPON_TYPES, MATERIALS, QUALITIES, EPITHETS)
+        tier = (MATERIALS.index(material) + QUALITIES.index(quality)) / (len(MATERIALS) + len(QUALITIES) - 2)
+        min_damage = int(tier * 30) + rng.randint(0, 2)
+        max_damage = min_damage + 2 + int(tier * 40) + rng.randint(0, 4)
+        buy_value = int(10 + tier ** 2 * 5000) + rng.randint(0, 20)
+        name = f"{quality} {material} {kind}{epithet}{_mark(generation)}"
+        yield (name, rng.randint(2, 40), min_damage, max_damage,
+               f"A {quality} {kind} of {material}, favoured by {rng.choice(ROLES)}s.",
+               buy_value, buy_value // 3, rng.random() < 0.05, _image(WEAPON_IMAGES, tier), normalize_name(name))
+
+
+def armor_rows(count: int, rng: random.Random) -> Iterator[tuple]:
+    """
+    Yield armor rows, from crude to legendary.
+
+    :param count: Number of armor pieces.
+    :param rng: The seeded generator.
+    :return: Row tuples in ARMOR_COLUMNS order.
+    """
+    for i in range(count):
+        kind, material, quality, epithet, generation = unique_name(i, ARMOR_TYPES, MATERIALS, QUALITIES, EPITHETS)
+        tier = (MATERIALS.index(material) + QUALITIES.index(quality)) / (len(MATERIALS) + len(QUALITIES) - 2)
+        buy_value = int(10 + tier ** 2 * 6000) + rng.randint(0, 20)
+        name = f"{quality} {material} {kind}{epithet}{_mark(generation)}"
+        yield (name, 2 + int(tier * 60) + rng.randint(0, 3), rng.randint(5, 80), int(tier * 10),
+               f"{quality.capitalize()} {kind} worked from {material}.",
+               buy_value, buy_value // 3, rng.random() < 0.05, _image(ARMOR_IMAGES, tier), normalize_name(name))
+
+
+def monster_rows(count: int, rng: random.Random, weapons: Sequence[int], armor: Sequence[int]) -> Iterator[tuple]:
+    """
+    Yield monster rows whose level follows their kind, equipped from the matching item tiers.
+
+    :param count: Number of monsters.
+    :param rng: The seeded generator.
+    :param weapons: Weapon ids ordered weakest first.
+    :param armor: Armor ids ordered weakest first.
+    :return: Row tuples in MONSTER_COLUMNS order.
+    """
+    for i in range(count):
+        kind, trait, generation = unique_name(i, MONSTER_KINDS, MONSTER_TRAITS)
+        tier = MONSTER_KINDS.index(kind) / (len(MONSTER_KINDS) - 1)
+        level = max(1, min(MAX_LEVEL, int(tier * MAX_LEVEL) + rng.randint(-2, 2)))
+        name = f"{trait} {kind}{_mark(generation)}".title()
+        yield (name, level, level * 10 + rng.randint(0, level * 5), level * level * 2 + rng.randint(0, level),
+               _pick(weapons, tier, rng), _pick(armor, tier, rng),
+               f"A {trait} {kind} that haunts the {rng.choice(['marsh', 'forest', 'caves', 'ruins', 'hills'])}.",
+               _image(MONSTER_IMAGES, tier), normalize_name(name))
+
+
+def player_rows(count: int, rng: random.Random, weapons: Sequence[int], armor: Sequence[int],
+                password: str) -> Iterator[tuple]:
+    """
+    Yield player rows with a level spread skewed towards beginners.
+
+    :param count: Number of players.
+    :param rng: The seeded generator.
+    :param weapons: Weapon ids ordered weakest first.
+    :param armor: Armor ids ordered weakest first.
+    :param password: The password hash stored for every player.
+    :return: Row tuples in PLAYER_COLUMNS order.
+    """
+    for i in range(count):
+        first, second, third, generation = unique_name(i, SYLLABLES, SYLLABLES, SYLLABLES)
+        name = f"{first}{second}{third}".capitalize() + (f"_{generation}" if generation else "")
+        username = f"{name.lower()}{rng.randint(1, 99)}_{i}"
+        level = max(1, min(MAX_LEVEL, int(rng.expovariate(1 / 8)) + 1))
+        tier = level / MAX_LEVEL
+        gold = int(rng.expovariate(1 / (level * 50)))
+        yield (username, password, name, level, 100 + level * 10, level * level * 20 + rng.randint(0, 50),
+               _pick(armor, tier, rng), _pick(weapons, tier, rng), gold, gold * rng.randint(0, 10),
+               f"A {rng.choice(TRAITS)} {rng.choice(ROLES)}.", _image(PLAYER_IMAGES, rng.random()),
+               normalize_name(username), normalize_name(name))
+
+
+def _pick(ids: Sequence[int], tier: float, rng: random.Random) -> int:
+    # Mostly gear of the matching tier, sometimes a little better or worse.
+    position = int((tier + rng.uniform(-0.1, 0.1)) * (len(ids) - 1))
+    return ids[max(0, min(len(ids) - 1, position))]
+
+
+WEAPON_COLUMNS = ("name", "weight", "min_damage", "max_damage", "description", "buy_value", "sell_value",
+                  "monster_only", "image_url", "name_key")
+ARMOR_COLUMNS = ("name", "ac", "weight", "damage_buffer", "description", "buy_value", "sell_value",
+                 "monster_only", "image_url", "name_key")
+MONSTER_COLUMNS = ("name", "level", "health", "exp", "weapon", "armor", "description", "image_url", "name_key")
+PLAYER_COLUMNS = ("username", "password", "name", "level", "health", "exp", "armor", "weapon", "gold", "bank",
+                  "description", "image_url", "username_key", "name_key")
+
+
+def bulk_insert(engine: Engine, table: str, columns: Sequence[str], rows: Iterator[tuple],
+                batch_size: int = BATCH_SIZE) -> int:
+    """
+    Insert rows with executemany(), committing once per batch.
+
+    :param engine: The SQLAlchemy engine.
+    :param table: The table name.
+    :param columns: Column names, in row tuple order.
+    :param rows: The rows.
+    :param batch_size: Rows per transaction.
+    :return: Number of rows inserted.
+    """
+    statement = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    inserted = 0
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        while True:
+            batch = [row for _, row in zip(range(batch_size), rows)]
+            if not batch:
+                break
+            cursor.executemany(statement, batch)
+            raw.commit()
+            inserted += len(batch)
+            logger.info("Inserted %d %s rows.", inserted, table)
+    finally:
+        raw.close()
+    return inserted
+
+
+def _tiered_ids(engine: Engine, table: str, value_column: str) -> List[int]:
+    # Player gear excludes monster-only items; ordering by value puts the weakest first.
+    with engine.connect() as connection:
+        rows = connection.exec_driver_sql(
+            f"SELECT id FROM {table} WHERE NOT monster_only ORDER BY {value_column}, id").fetchall()
+    return [row[0] for row in rows]
+
+
+def generate(engine: Engine, players: int = 0, monsters: int = 0, weapons: int = 0, armor: int = 0,
+             seed: int = 0, password: str = "password1", batch_size: int = BATCH_SIZE) -> dict:
+    """
+    Add generated rows to an initialized database.
+
+    Items are inserted first so monsters and players can reference them.  Existing rows are
+    kept, and new monsters and players may be equipped with existing items as well.
+
+    :param engine: The SQLAlchemy engine.
+    :param players: Players to add.
+    :param monsters: Monsters to add.
+    :param weapons: Weapons to add.
+    :param armor: Armor pieces to add.
+    :param seed: The random seed.
+    :param password: The password given to every generated player.  It is hashed once and the
+                     hash shared, since bcrypt per row would take hours at these sizes.
+    :param batch_size: Rows per transaction.
+    :return: Rows inserted per table.
+    """
+    # One generator per table, so changing one count doesn't reshuffle the others.
+    counts = {
+        "weapon": bulk_insert(engine, "weapon", WEAPON_COLUMNS,
+                              weapon_rows(weapons, random.Random(f"{seed}:weapon")), batch_size),
+        "armor": bulk_insert(engine, "armor", ARMOR_COLUMNS,
+                             armor_rows(armor, random.Random(f"{seed}:armor")), batch_size),
+    }
+    weapon_ids = _tiered_ids(engine, "weapon", "max_damage")
+    armor_ids = _tiered_ids(engine, "armor", "ac")
+    if (monsters or players) and not (weapon_ids and armor_ids):
+        raise ValueError("Monsters and players need at least one weapon and one armor to equip.")
+
+    counts["monster"] = bulk_insert(engine, "monster", MONSTER_COLUMNS, monster_rows(
+        monsters, random.Random(f"{seed}:monster"), weapon_ids, armor_ids), batch_size)
+    counts["player"] = bulk_insert(engine, "player", PLAYER_COLUMNS, player_rows(
+        players, random.Random(f"{seed}:player"), weapon_ids, armor_ids, hash_password(password)), batch_size)
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=0)
+    parser.add_argument("--monsters", type=int, default=0)
+    parser.add_argument("--weapons", type=int, default=0)
+    parser.add_argument("--armor", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    from database.connections import engine, init_database
+
+    init_database()
+    start = time.perf_counter()
+    counts = generate(engine, args.players, args.monsters, args.weapons, args.armor, args.seed,
+                      batch_size=args.batch_size)
+    elapsed = time.perf_counter() - start
+    total = sum(counts.values())
+    print(f"Inserted {counts} in {elapsed:.1f}s ({total / elapsed if elapsed else 0:.0f} rows/s).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from tempfile import SpooledTemporaryFile
+from typing import Annotated
+
+from database.connections import export_ndjson_dump, import_ndjson_dump
+from models.login import current_player
+from models.players import Player
+
+import codecs
+import logging
+# Set up logging.
+logger = logging.getLogger("admin")
+
+# Uploads larger than this are spooled to a temporary file rather than held in memory.
+SPOOL_BYTES = 8 * 1024 * 1024
+
+# Define the administration router.
+router = APIRouter(prefix="/admin")
+
+
+async def admin_player(player: Annotated[Player, Depends(current_player)]) -> Player:
+    """
+    Dependency: the logged in player, if their stored admin flag is set.
+
+    :param player:\n
+    :return:\n
+    """
+    if not player.admin:
+        raise HTTPException(status_code=403, detail="Administrators only.")
+    return player
+
+
+@router.get("/dump")
+async def export_dump(admin: Annotated[Player, Depends(admin_player)]) -> StreamingResponse:
+    """
+    Legend of the Sonzo Dragon Admin: Stream the whole database as an NDJSON dump.
+
+    :param admin:\n
+    :return:\n
+    """
+    logger.info("Database dump requested by '%s'.", admin.username)
+    # A plain iterator, so Starlette reads it on a worker thread.
+    return StreamingResponse(export_ndjson_dump(), media_type="application/x-ndjson",
+                             headers={"Content-Disposition": 'attachment; filename="game_database.ndjson"'})
+
+
+@router.post("/dump")
+async def import_dump(request: Request, admin: Annotated[Player, Depends(admin_player)],
+                      replace: bool = False) -> dict:
+    """
+    Legend of the Sonzo Dragon Admin: Restore an NDJSON dump posted as the request body.
+
+    :param request:\n
+    :param admin:\n
+    :param replace:\n
+    :return:\n
+    """
+    logger.info("Database import requested by '%s' (replace=%s).", admin.username, replace)
+    with SpooledTemporaryFile(max_size=SPOOL_BYTES) as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        try:
+            counts = await import_ndjson_dump(codecs.getreader("utf-8")(spool), replace)
+        except ValueError as error:
+            raise HTTPException(status_code=422, detail=str(error))
+    return {"imported": counts}
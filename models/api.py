@@ -0,0 +1,228 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from database.connections import page_rows, lookup_rows_by_ids, stream_rows, search_rows
+from game.leaderboard import Standing, leaderboards
+from typing import Annotated, AsyncIterator, Literal, Type
+
+from sqlmodel import SQLModel
+
+from models.monsters import Monster
+from models.players import Player
+from models.weapons import Weapon
+from models.armor import Armor
+
+import json
+import logging
+# Set up logging.
+logger = logging.getLogger("api")
+
+# Fields that never leave the server: the password, and the normalized name keys, which are storage details.
+PRIVATE_FIELDS = {"password", "name_key", "username_key"}
+MAX_PAGE_SIZE = 1000
+MAX_IDS = 500
+STREAM_BATCH_SIZE = 500
+MAX_SEARCH_RESULTS = 50
+MAX_LEADERBOARD_PAGE = 100
+
+# Define the bulk JSON API router.
+router = APIRouter(prefix="/api")
+
+Format = Literal["json", "ndjson"]
+Searchable = Literal["players", "monsters", "weapons", "armor"]
+SEARCHABLE_MODELS = {"players": Player, "monsters": Monster, "weapons": Weapon, "armor": Armor}
+Board = Literal["exp", "level", "wealth"]
+
+
+def _to_dict(row: SQLModel) -> dict:
+    return row.model_dump(exclude=PRIVATE_FIELDS)
+
+
+def _parse_ids(ids: str) -> list:
+    try:
+        parsed = [int(value) for value in ids.split(",") if value.strip()]
+    except ValueError:
+        raise HTTPException(status_code=422, detail="ids must be a comma separated list of integers.")
+    if len(parsed) > MAX_IDS:
+        raise HTTPException(status_code=422, detail=f"At most {MAX_IDS} ids per request.")
+    return parsed
+
+
+async def _ndjson_lines(model: Type[SQLModel], after: int) -> AsyncIterator[bytes]:
+    async for rows in stream_rows(model, after, STREAM_BATCH_SIZE):
+        yield "".join(json.dumps(_to_dict(row)) + "\n" for row in rows).encode()
+
+
+async def _list_rows(model: Type[SQLModel], after: int, limit: int, ids: str | None, format: Format):
+    """
+    Shared implementation of the bulk list endpoints.
+
+    ids= returns exactly those rows.  format=ndjson streams every row after `after`, one JSON
+    object per line.  Otherwise one keyset page is returned along with the cursor for the next.
+
+    :param model: The table model to list.
+    :param after: Keyset cursor, the last id already seen.
+    :param limit: Page size.
+    :param ids: Optional comma separated ids.
+    :param format: json or ndjson.
+    :return: A JSON page or a streaming NDJSON response.
+    """
+    if ids is not None:
+        rows = await lookup_rows_by_ids(model, _parse_ids(ids))
+        return JSONResponse({"items": [_to_dict(row) for row in rows], "next_after": None})
+
+    if format == "ndjson":
+        return StreamingResponse(_ndjson_lines(model, after), media_type="application/x-ndjson")
+
+    rows = await page_rows(model, after, limit)
+    next_after = rows[-1].id if len(rows) == limit else None
+    return JSONResponse({"items": [_to_dict(row) for row in rows], "next_after": next_after})
+
+
+@router.get("/players")
+async def list_players(after: Annotated[int, Query(ge=0)] = 0,
+                       limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = 100,
+                       ids: str | None = None,
+                       format: Format = "json"):
+    """
+    Legend of the Sonzo Dragon API: List players by id cursor, fetch a batch by ids, or stream all as NDJSON.
+
+    :param after:\n
+    :param limit:\n
+    :param ids:\n
+    :param format:\n
+    :return:\n
+    """
+    return await _list_rows(Player, after, limit, ids, format)
+
+
+@router.get("/monsters")
+async def list_monsters(after: Annotated[int, Query(ge=0)] = 0,
+                        limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = 100,
+                        ids: str | None = None,
+                        format: Format = "json"):
+    """
+    Legend of the Sonzo Dragon API: List monsters by id cursor, fetch a batch by ids, or stream all as NDJSON.
+
+    :param after:\n
+    :param limit:\n
+    :param ids:\n
+    :param format:\n
+    :return:\n
+    """
+    return await _list_rows(Monster, after, limit, ids, format)
+
+
+@router.get("/weapons")
+async def list_weapons(after: Annotated[int, Query(ge=0)] = 0,
+                       limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = 100,
+                       ids: str | None = None,
+                       format: Format = "json"):
+    """
+    Legend of the Sonzo Dragon API: List weapons by id cursor, fetch a batch by ids, or stream all as NDJSON.
+
+    :param after:\n
+    :param limit:\n
+    :param ids:\n
+    :param format:\n
+    :return:\n
+    """
+    return await _list_rows(Weapon, after, limit, ids, format)
+
+
+@router.get("/armor")
+async def list_armor(after: Annotated[int, Query(ge=0)] = 0,
+                     limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = 100,
+                     ids: str | None = None,
+                     format: Format = "json"):
+    """
+    Legend of the Sonzo Dragon API: List armor by id cursor, fetch a batch by ids, or stream all as NDJSON.
+
+    :param after:\n
+    :param limit:\n
+    :param ids:\n
+    :param format:\n
+    :return:\n
+    """
+    return await _list_rows(Armor, after, limit, ids, format)
+
+
+@router.get("/search/{table}")
+async def search(table: Searchable,
+                 q: Annotated[str, Query(max_length=50)] = "",
+                 limit: Annotated[int, Query(ge=1, le=MAX_SEARCH_RESULTS)] = 10):
+    """
+    Legend of the Sonzo Dragon API: Autocomplete and fuzzy search over names and descriptions.
+
+    :param table:\n
+    :param q:\n
+    :param limit:\n
+    :return:\n
+    """
+    hits = await search_rows(SEARCHABLE_MODELS[table], q, limit)
+    return JSONResponse({"query": q, "items": [hit._asdict() for hit in hits]})
+
+
+def _standing_dict(standing: Standing) -> dict:
+    return {"level": standing.level, "exp": standing.exp, "wealth": standing.wealth}
+
+
+@router.get("/leaderboards/{board}")
+async def get_leaderboard(board: Board,
+                          offset: Annotated[int, Query(ge=0)] = 0,
+                          limit: Annotated[int, Query(ge=1, le=MAX_LEADERBOARD_PAGE)] = 10):
+    """
+    Legend of the Sonzo Dragon API: Top players by experience, level (then experience) or wealth (gold plus bank).
+
+    :param board:\n
+    :param offset:\n
+    :param limit:\n
+    :return:\n
+    """
+    boards = await leaderboards.get()
+    leaderboard = boards.boards[board]
+    ids = leaderboard.top(offset, limit)
+    names = {row.id: row.name for row in await lookup_rows_by_ids(Player, ids)}
+    items = []
+    for entity_id in ids:
+        standing = boards.standing(entity_id)
+        if standing is not None:
+            items.append({"rank": leaderboard.rank(standing), "id": entity_id, "name": names.get(entity_id),
+                          **_standing_dict(standing)})
+    return JSONResponse({"board": board, "total": len(leaderboard), "items": items})
+
+
+@router.get("/leaderboards/{board}/players/{player_id}")
+async def get_leaderboard_rank(board: Board, player_id: int):
+    """
+    Legend of the Sonzo Dragon API: A player's rank on a leaderboard.
+
+    :param board:\n
+    :param player_id:\n
+    :return:\n
+    """
+    boards = await leaderboards.get()
+    standing = boards.standing(player_id)
+    if standing is None:
+        raise HTTPException(status_code=404, detail="Player not found.")
+    leaderboard = boards.boards[board]
+    return JSONResponse({"board": board, "id": player_id, "rank": leaderboard.rank(standing),
+                         "total": len(leaderboard), **_standing_dict(standing)})
@@ -16,7 +16,7 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
-from fastapi import APIRouter, Request, Form, Query
+from fastapi import APIRouter, Depends, Request, Form, Query, WebSocket, WebSocketDisconnect
 from fastapi.templating import Jinja2Templates
 from fastapi.responses import HTMLResponse
 
@@ -27,14 +27,25 @@ from mock_data.monsters import monsters_list
 
 from database.connections import lookup_player_by_username, lookup_player_by_name, get_all_players
 from database.connections import lookup_monster_by_name, lookup_armor_by_name, lookup_weapon_by_name
-from database.connections import save_player, save_monster, save_armor, save_weapon
+from database.connections import lookup_armor_by_id, lookup_weapon_by_id, lookup_rows_by_ids
+from database.connections import save_player, save_monster, save_armor, save_weapon, add_save_listener
+from database.connections import add_reset_listener
+from database.writer import StaleVersionError
+from auth.passwords import password_hasher
+from game.balance import balance_matrix
+from models.login import current_player
+from web.templating import configure_templates
+from web.page_cache import cached_page, invalidate_page, page_cache
+from web.live import live_hub
 from typing import Annotated
 
 from models.monsters import Monster
 from models.players import Player
 from models.weapons import Weapon
 from models.armor import Armor
+from models.names import normalize_name
 from pathlib import Path
+import asyncio
 from os.path import join
 import json
 
@@ -45,11 +56,55 @@ logger = logging.getLogger("explorer")
 # Get the parent directory to set up the Jinja2 templates.
 top = Path(__file__).resolve().parent
 # Extra double dots ".." to escape /explorer prefix on the router.
-templates = Jinja2Templates(directory=join(f"{top}", "..", "templates"))
+templates = configure_templates(Jinja2Templates(directory=join(f"{top}", "..", "templates")))
 
 # Define the Object Explorer API router.
 router = APIRouter(prefix = "/explorer")
 
+# Rendered lookup pages are cached per row version and dropped as soon as a save commits.
+add_save_listener(invalidate_page)
+add_reset_listener(page_cache.clear)
+# Lookup pages open a WebSocket to /explorer/live/... and get every later save as a diff.
+add_save_listener(live_hub.on_save)
+add_reset_listener(live_hub.reset)
+
+
+async def _form_version(request: Request) -> int | None:
+    # Form-bound models fill in the column default, so read the submitted version from the raw form.
+    version = (await request.form()).get("version")
+    return int(version) if version and version.isdigit() else None
+
+
+def _keep_world_values(data: Player, player: Player, form) -> None:
+    # The world heals players and pays interest while an edit form is open.  Health and bank are
+    # only written if the form changed them, or the save would put back the values it opened with.
+    for field in ("health", "bank"):
+        if form.get(field) == form.get(f"original_{field}"):
+            setattr(data, field, getattr(player, field))
+            data.model_fields_set.discard(field)
+
+
+def _equipment(row) -> tuple:
+    # Player and monster pages show their weapon and armor, so saving either drops the page.
+    return tuple((model, entity_id) for model, entity_id in ((Weapon, row.weapon), (Armor, row.armor))
+                 if entity_id is not None)
+
+
+async def _load_equipment(row) -> None:
+    # Objects bound from a form have no equipment loaded; fill it in from the catalog cache.
+    row.equipped_weapon = await lookup_weapon_by_id(int(row.weapon)) if row.weapon is not None else None
+    row.equipped_armor = await lookup_armor_by_id(int(row.armor)) if row.armor is not None else None
+
+
+def _forbidden() -> HTMLResponse:
+    # Players may edit their own player; everything else takes an admin.
+    return HTMLResponse(status_code=403, content="You may not edit this.")
+
+
+def _stale_response(error: StaleVersionError) -> HTMLResponse:
+    return HTMLResponse(status_code=409, content=f"This {error.table} was changed by someone else "
+                                                 f"(now version {error.current_version}). Reload it and try again.")
+
 @router.get("/", response_class=HTMLResponse)
 async def explorer_home(request: Request) -> HTMLResponse:
     return templates.TemplateResponse(request=request, name="explorer_home.html")
@@ -79,13 +134,15 @@ async def get_player_by_username(username: str, request: Request) -> HTMLRespons
     :param request:\n
     :return:\n
     """
-    logger.info(f"Looking up player '{username}' in the database.")
-    player = await lookup_player_by_username(username)
-    if player:
-        if player.username == username:
-            return templates.TemplateResponse(request=request, name="lookup_player.html", context={"player": player})
+    async def load():
+        logger.info("Looking up player '%s' in the database.", username)
+        player = await lookup_player_by_username(username)
+        if player and player.username == username:
+            return player
 
-    return HTMLResponse(status_code=404, content="Player not found.")
+    response = await cached_page(request, templates, "lookup_player.html", "player", ("username", username), load,
+                                 _equipment)
+    return response or HTMLResponse(status_code=404, content="Player not found.")
 
 
 # @router.get("/player/by_name/{name}", response_class=HTMLResponse)
@@ -114,33 +171,47 @@ async def get_player_by_name(request: Request, name: Annotated[str | None, Query
     :param request:\n
     :return:\n
     """
-    player = None
+    response = None
 
     if name:
-        player = await lookup_player_by_name(name)
+        response = await cached_page(request, templates, "lookup_player.html", "player", ("name_key", normalize_name(name)),
+                                     lambda: lookup_player_by_name(name), _equipment)
 
-    if player:
-        return templates.TemplateResponse(request=request, name="lookup_player.html", context={"player": player})
-    else:
-        return HTMLResponse(status_code=404, content="Player not found.")
+    return response or HTMLResponse(status_code=404, content="Player not found.")
 
 
 @router.post("/player/by_name/{name}", response_class=HTMLResponse)
-async def update_player_by_name(request: Request, name: str, data: Annotated[Player, Form()]) -> HTMLResponse:
+async def update_player_by_name(request: Request, name: str, data: Annotated[Player, Form()],
+                                editor: Annotated[Player, Depends(current_player)]) -> HTMLResponse:
     """
     Legend of the Sonzo Dragon Explorer: Update player information by name.
 
     :param name:\n
     :param request:\n
     :param data:\n
+    :param editor:\n
     :return:\n
     """
     player = await lookup_player_by_name(name)
     if player:
         if player.name == name:
-            await save_player(data)
+            if not editor.admin and editor.id != player.id:
+                return _forbidden()
+            # The row is the one named in the URL, and the admin flag is never set from a form.
+            data.id = player.id
+            data.admin = player.admin
+            form = await request.form()
+            _keep_world_values(data, player, form)
+            # The form never shows the stored hash; a blank password keeps it.
+            password = form.get("password")
+            data.password = await password_hasher.hash(password) if password else player.password
+            try:
+                data.version = await save_player(data, await _form_version(request))
+            except StaleVersionError as error:
+                return _stale_response(error)
 
             # Send "data" back instead of the "player" since data is already updated and async player isn't.
+            await _load_equipment(data)
             return templates.TemplateResponse(request=request, name="lookup_player.html", context={"player": data})
 
     return HTMLResponse(status_code=200, content="None")
@@ -183,15 +254,13 @@ async def get_player_by_name(request: Request, name: Annotated[str | None, Query
     :param request:\n
     :return:\n
     """
-    monster = None
+    response = None
 
     if name:
-        monster = await lookup_monster_by_name(name)
+        response = await cached_page(request, templates, "lookup_monster.html", "monster", ("name_key", normalize_name(name)),
+                                     lambda: lookup_monster_by_name(name), _equipment)
 
-    if monster:
-        return templates.TemplateResponse(request=request, name="lookup_monster.html", context={"monster": monster})
-    else:
-        return HTMLResponse(status_code=404, content="Monster not found.")
+    return response or HTMLResponse(status_code=404, content="Monster not found.")
 
 
 @router.get("/monster/{name}", response_class=HTMLResponse)
@@ -203,11 +272,14 @@ async def get_monster_by_name(name: str, request: Request) -> HTMLResponse:
     :param request:\n
     :return:\n
     """
-    monster = await lookup_monster_by_name(name)
-    if monster.name == name:
-        return templates.TemplateResponse(request=request, name="lookup_monster.html", context={"monster": monster})
+    async def load():
+        monster = await lookup_monster_by_name(name)
+        if monster and monster.name == name:
+            return monster
 
-    return HTMLResponse(status_code=404, content="Monster not found.")
+    response = await cached_page(request, templates, "lookup_monster.html", "monster", ("name", name), load,
+                                 _equipment)
+    return response or HTMLResponse(status_code=404, content="Monster not found.")
 
 
 @router.post("/monster/{name}/edit", response_class=HTMLResponse)
@@ -229,20 +301,29 @@ async def edit_monster_by_name(name: str, request: Request) -> HTMLResponse:
 
 
 @router.post("/monster/{name}", response_class=HTMLResponse)
-async def update_monster_by_name(request: Request, name: str, data: Annotated[Monster, Form()]) -> HTMLResponse:
+async def update_monster_by_name(request: Request, name: str, data: Annotated[Monster, Form()],
+                                editor: Annotated[Player, Depends(current_player)]) -> HTMLResponse:
     """
     Legend of the Sonzo Dragon Explorer: Update monster information by name.
 
     :param name:\n
     :param request:\n
     :param data:\n
+    :param editor:\n
     :return:\n
     """
+    if not editor.admin:
+        return _forbidden()
     monster = await lookup_monster_by_name(name)
     if monster.name == name:
-        await save_monster(data)
+        data.id = monster.id
+        try:
+            data.version = await save_monster(data, await _form_version(request))
+        except StaleVersionError as error:
+            return _stale_response(error)
 
         # Send "data" back instead of the "monster" since data is already updated and (async) player isn't.
+        await _load_equipment(data)
         return templates.TemplateResponse(request=request, name="lookup_monster.html", context={"monster": data})
 
     return HTMLResponse(status_code=200, content="None")
@@ -269,15 +350,13 @@ async def get_weapon_by_name(request: Request, name: Annotated[str | None, Query
     :param request:\n
     :return:\n
     """
-    weapon = None
+    response = None
 
     if name:
-        weapon = await lookup_weapon_by_name(name)
+        response = await cached_page(request, templates, "lookup_weapon.html", "weapon", ("name_key", normalize_name(name)),
+                                     lambda: lookup_weapon_by_name(name))
 
-    if weapon:
-        return templates.TemplateResponse(request=request, name="lookup_weapon.html", context={"weapon": weapon})
-    else:
-        return HTMLResponse(status_code=404, content="Weapon not found.")
+    return response or HTMLResponse(status_code=404, content="Weapon not found.")
 
 
 @router.get("/weapon/{name}", response_class=HTMLResponse)
@@ -289,11 +368,13 @@ async def get_weapon_by_name(name: str, request: Request) -> HTMLResponse:
     :param request:\n
     :return:\n
     """
-    weapon = await lookup_weapon_by_name(name)
-    if weapon.name == name:
-        return templates.TemplateResponse(request=request, name="lookup_weapon.html", context={"weapon": weapon})
+    async def load():
+        weapon = await lookup_weapon_by_name(name)
+        if weapon and weapon.name == name:
+            return weapon
 
-    return HTMLResponse(status_code=404, content="Weapon not found.")
+    response = await cached_page(request, templates, "lookup_weapon.html", "weapon", ("name", name), load)
+    return response or HTMLResponse(status_code=404, content="Weapon not found.")
 
 
 @router.post("/weapon/{name}/edit", response_class=HTMLResponse)
@@ -313,18 +394,28 @@ async def edit_weapon_by_name(name: str, request: Request) -> HTMLResponse:
 
 
 @router.post("/weapon/{name}", response_class=HTMLResponse)
-async def update_weapon_by_name(request: Request, name: str, data: Annotated[Weapon, Form()]) -> HTMLResponse:
+async def update_weapon_by_name(request: Request, name: str, data: Annotated[Weapon, Form()],
+                                editor: Annotated[Player, Depends(current_player)]) -> HTMLResponse:
     """
     Legend of the Sonzo Dragon Explorer: Update weapon information by name.
 
     :param name:\n
     :param request:\n
     :param data:\n
+    :param editor:\n
     :return:\n
     """
+    if not editor.admin:
+        return _forbidden()
     weapon = await lookup_weapon_by_name(name)
     if weapon.name == name:
-        await save_weapon(data)
+        data.id = weapon.id
+        if int(data.min_damage) > int(data.max_damage):
+            return HTMLResponse(status_code=422, content="Minimum damage can't be more than maximum damage.")
+        try:
+            data.version = await save_weapon(data, await _form_version(request))
+        except StaleVersionError as error:
+            return _stale_response(error)
 
         # Send "data" back instead of the "weapon" since data is already updated and (async) player isn't.
         return templates.TemplateResponse(request=request, name="lookup_weapon.html", context={"weapon": data})
@@ -354,15 +445,13 @@ async def get_armor_by_name(request: Request, name: Annotated[str | None, Query(
     :param request:\n
     :return:\n
     """
-    armor = None
+    response = None
 
     if name:
-        armor = await lookup_armor_by_name(name)
+        response = await cached_page(request, templates, "lookup_armor.html", "armor", ("name_key", normalize_name(name)),
+                                     lambda: lookup_armor_by_name(name))
 
-    if armor:
-        return templates.TemplateResponse(request=request, name="lookup_armor.html", context={"armor": armor})
-    else:
-        return HTMLResponse(status_code=404, content="Armor not found.")
+    return response or HTMLResponse(status_code=404, content="Armor not found.")
 
 
 @router.get("/armor/{name}", response_class=HTMLResponse)
@@ -374,11 +463,13 @@ async def get_armor_by_name(name: str, request: Request) -> HTMLResponse:
     :param request:\n
     :return:\n
     """
-    armor = await lookup_armor_by_name(name)
-    if armor.name == name:
-        return templates.TemplateResponse(request=request, name="lookup_armor.html", context={"armor": armor})
+    async def load():
+        armor = await lookup_armor_by_name(name)
+        if armor and armor.name == name:
+            return armor
 
-    return HTMLResponse(status_code=404, content="Armor not found.")
+    response = await cached_page(request, templates, "lookup_armor.html", "armor", ("name", name), load)
+    return response or HTMLResponse(status_code=404, content="Armor not found.")
 
 
 @router.post("/armor/{name}/edit", response_class=HTMLResponse)
@@ -398,20 +489,85 @@ async def edit_armor_by_name(name: str, request: Request) -> HTMLResponse:
 
 
 @router.post("/armor/{name}", response_class=HTMLResponse)
-async def update_armor_by_name(request: Request, name: str, data: Annotated[Armor, Form()]) -> HTMLResponse:
+async def update_armor_by_name(request: Request, name: str, data: Annotated[Armor, Form()],
+                                editor: Annotated[Player, Depends(current_player)]) -> HTMLResponse:
     """
     Legend of the Sonzo Dragon Explorer: Update armor information by name.
 
     :param name:\n
     :param request:\n
     :param data:\n
+    :param editor:\n
     :return:\n
     """
+    if not editor.admin:
+        return _forbidden()
     armor = await lookup_armor_by_name(name)
     if armor.name == name:
-        await save_armor(data)
+        data.id = armor.id
+        try:
+            data.version = await save_armor(data, await _form_version(request))
+        except StaleVersionError as error:
+            return _stale_response(error)
 
         # Send "data" back instead of the "armor" since data is already updated and (async) player isn't.'
         return templates.TemplateResponse(request=request, name="lookup_armor.html", context={"armor": data})
 
-    return HTMLResponse(status_code=200, content="None")
\ No newline at end of file
+    return HTMLResponse(status_code=200, content="None")
+
+
+################################
+# Balance Methods
+################################
+@router.get("/balance/", response_class=HTMLResponse)
+async def get_balance_matrix(request: Request) -> HTMLResponse:
+    """
+    Legend of the Sonzo Dragon Explorer: Win chance and time-to-kill for every weapon x armor x monster.
+
+    :param request:\n
+    :return:\n
+    """
+    matrix = await balance_matrix.get()
+    return templates.TemplateResponse(request=request, name="balance.html", context={"matrix": matrix})
+
+
+################################
+# Live Updates
+################################
+LIVE_MODELS = {"player": Player, "monster": Monster, "weapon": Weapon, "armor": Armor}
+
+
+@router.websocket("/live/{table}/{entity_id}")
+async def watch_entity(websocket: WebSocket, table: str, entity_id: int) -> None:
+    """
+    Legend of the Sonzo Dragon Explorer: Stream a row's state, then a diff of every save to it.
+
+    :param websocket:\n
+    :param table:\n
+    :param entity_id:\n
+    :return:\n
+    """
+    model = LIVE_MODELS.get(table)
+    await websocket.accept()
+    if model is None:
+        await websocket.close(code=1008, reason=f"Unknown table {table}.")
+        return
+
+    async def load():
+        rows = await lookup_rows_by_ids(model, [entity_id])
+        return rows[0] if rows else None
+
+    subscription = await live_hub.subscribe(model, entity_id, websocket.send_text, load)
+    if subscription is None:
+        await websocket.close(code=1008, reason=f"No {table} with id {entity_id}.")
+        return
+    sender = asyncio.create_task(subscription.run())
+    try:
+        # Clients never send anything; waiting to receive is how a disconnect is noticed.
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        live_hub.unsubscribe(subscription)
@@ -0,0 +1,125 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from jose import JWTError
+from typing import Annotated, Optional
+
+from auth.passwords import password_hasher
+from auth.tokens import ACCESS_TOKEN_EXPIRE_MINUTES, create_access_token, decode_access_token
+from database.connections import lookup_player_by_username, save_player_password
+from models.api import PRIVATE_FIELDS
+from models.players import Player
+
+import logging
+# Set up logging.
+logger = logging.getLogger("main")
+
+# Define the login router.
+router = APIRouter()
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+# Explorer forms can't send an Authorization header, so /token also hands the token back as a
+# cookie.  SameSite=Strict keeps other sites' forms from posting with it.
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
+TOKEN_COOKIE = "access_token"
+
+
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(status_code=401, detail=detail, headers={"WWW-Authenticate": "Bearer"})
+
+
+async def current_claims(token: Annotated[str, Depends(oauth2_scheme)]) -> dict:
+    """
+    Dependency: the validated claims of the request's bearer token.
+
+    :param token:\n
+    :return:\n
+    """
+    try:
+        return decode_access_token(token)
+    except JWTError:
+        raise _unauthorized("Could not validate credentials.")
+
+
+async def session_claims(request: Request, token: Annotated[Optional[str], Depends(optional_oauth2_scheme)]) -> dict:
+    """
+    Dependency: the validated claims of the request's bearer token, or of its token cookie.
+
+    :param request:\n
+    :param token:\n
+    :return:\n
+    """
+    token = token or request.cookies.get(TOKEN_COOKIE)
+    if not token:
+        raise _unauthorized("Not authenticated.")
+    return await current_claims(token)
+
+
+async def current_player(claims: Annotated[dict, Depends(session_claims)]) -> Player:
+    """
+    Dependency: the logged in player, read fresh so a deleted player or revoked flag counts at once.
+
+    :param claims:\n
+    :return:\n
+    """
+    player = await lookup_player_by_username(claims["sub"])
+    if player is None or player.id != claims.get("pid"):
+        raise _unauthorized("Player no longer exists.")
+    return player
+
+
+@router.post("/token")
+async def login(form: Annotated[OAuth2PasswordRequestForm, Depends()], response: Response) -> dict:
+    """
+    Exchange a username and password for a bearer token.
+
+    Verification runs on the hashing process pool.  A legacy plain text or outdated hash is
+    replaced with a fresh hash once the password has been verified against it.
+
+    :param form:\n
+    :param response:\n
+    :return:\n
+    """
+    player = await lookup_player_by_username(form.username)
+    if player and player.username != form.username:
+        player = None
+
+    matched, new_hash = await password_hasher.verify(form.password, player.password if player else None)
+    if not matched:
+        logger.warning("Failed login for '%s'.", form.username)
+        raise _unauthorized("Incorrect username or password.")
+
+    if new_hash:
+        await save_player_password(player.id, new_hash)
+    token = create_access_token(player.username, player.id)
+    response.set_cookie(TOKEN_COOKIE, token, max_age=ACCESS_TOKEN_EXPIRE_MINUTES * 60, httponly=True,
+                        samesite="strict")
+    return {"access_token": token, "token_type": "bearer"}
+
+
+@router.get("/me")
+async def read_current_player(player: Annotated[Player, Depends(current_player)]) -> dict:
+    """
+    Return the logged in player.
+
+    :param player:\n
+    :return:\n
+    """
+    return player.model_dump(exclude=PRIVATE_FIELDS)
@@ -17,7 +17,8 @@ limitations under the License.
 """
 
 from typing import Optional
-from sqlmodel import SQLModel, Field
+from sqlmodel import SQLModel, Field, Relationship
+from models.names import track_name_keys
 from models.weapons import Weapon
 from models.armor import Armor
 
@@ -32,5 +33,13 @@ class Monster(SQLModel, table=True):
     armor: int = Field(default=None, foreign_key="armor.id")
     description: str
     image_url: str
+    name_key: Optional[str] = Field(default=None, index=True)
+    version: int = Field(default=1, sa_column_kwargs={"server_default": "1"})
 
+    # The items behind the weapon and armor ids.  Never lazy loaded: queries that render them ask
+    # for them with joinedload() or selectinload() (see database.connections.equipment_options).
+    equipped_weapon: Optional[Weapon] = Relationship(sa_relationship_kwargs={"lazy": "raise"})
+    equipped_armor: Optional[Armor] = Relationship(sa_relationship_kwargs={"lazy": "raise"})
 
+
+track_name_keys(Monster, name_key="name")
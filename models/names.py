@@ -0,0 +1,69 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from typing import Dict, Optional, Type
+
+from sqlalchemy import event
+from sqlmodel import SQLModel
+
+# Model class -> {key column: source column}, filled in by track_name_keys().
+NAME_KEYS: Dict[Type[SQLModel], Dict[str, str]] = {}
+
+
+def normalize_name(name: Optional[str]) -> Optional[str]:
+    """
+    Normalize a name for case-insensitive lookups.
+
+    :param name: The name as typed by a user or stored on a row.
+    :return: The case-folded name, or None if no name was given.
+    """
+    if name is None:
+        return None
+    return name.casefold()
+
+
+def name_key_values(model: Type[SQLModel], values: dict) -> dict:
+    """
+    Add the normalized key columns for any name columns present in values.
+
+    :param model: The model class the values belong to.
+    :param values: Column values about to be written.
+    :return: The same dictionary, with key columns filled in.
+    """
+    for key_column, source_column in NAME_KEYS.get(model, {}).items():
+        if source_column in values:
+            values[key_column] = normalize_name(values[source_column])
+    return values
+
+
+def _refresh_name_keys(mapper, connection, target) -> None:
+    for key_column, source_column in NAME_KEYS[type(target)].items():
+        setattr(target, key_column, normalize_name(getattr(target, source_column)))
+
+
+def track_name_keys(model: Type[SQLModel], **key_columns: str) -> None:
+    """
+    Keep normalized name columns in step with their source columns on every ORM insert and update.
+
+    :param model: The table model.
+    :param key_columns: key column=source column pairs, e.g. name_key="name".
+    :return:
+    """
+    NAME_KEYS[model] = key_columns
+    event.listen(model, "before_insert", _refresh_name_keys)
+    event.listen(model, "before_update", _refresh_name_keys)
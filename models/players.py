@@ -17,7 +17,8 @@ limitations under the License.
 """
 
 from typing import Optional
-from sqlmodel import SQLModel, Field
+from sqlmodel import SQLModel, Field, Relationship
+from models.names import track_name_keys
 from models.weapons import Weapon
 from models.armor import Armor
 
@@ -26,7 +27,8 @@ from models.armor import Armor
 class Player(SQLModel, table=True):
     id: Optional[int] = Field(primary_key=True, index=True)
     username: str = Field(index=True)
-    password: str
+    # A bcrypt hash; see auth.passwords.  Blank on explorer forms that leave it unchanged.
+    password: str = Field(default="")
     name: str = Field(index=True)
     level: int
     health: int
@@ -37,4 +39,17 @@ class Player(SQLModel, table=True):
     bank: int
     description: str
     image_url: str = Field(default=None)
+    username_key: Optional[str] = Field(default=None, index=True)
+    name_key: Optional[str] = Field(default=None, index=True)
+    # May dump and restore the database and edit anything in the explorer.  Only ever granted
+    # server side (python -m database.migrations grant-admin), never from a form.
+    admin: bool = Field(default=False, sa_column_kwargs={"server_default": "0"})
+    version: int = Field(default=1, sa_column_kwargs={"server_default": "1"})
 
+    # The items behind the weapon and armor ids.  Never lazy loaded: queries that render them ask
+    # for them with joinedload() or selectinload() (see database.connections.equipment_options).
+    equipped_weapon: Optional[Weapon] = Relationship(sa_relationship_kwargs={"lazy": "raise"})
+    equipped_armor: Optional[Armor] = Relationship(sa_relationship_kwargs={"lazy": "raise"})
+
+
+track_name_keys(Player, username_key="username", name_key="name")
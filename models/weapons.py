@@ -18,6 +18,7 @@ limitations under the License.
 
 from typing import Optional
 from sqlmodel import SQLModel, Field
+from models.names import track_name_keys
 
 
 class Weapon(SQLModel, table=True):
@@ -30,4 +31,9 @@ class Weapon(SQLModel, table=True):
     buy_value: int
     sell_value: int
     monster_only: bool = Field(default=False)
-    image_url: Optional[str] = Field(default=None)
\ No newline at end of file
+    image_url: Optional[str] = Field(default=None)
+    name_key: Optional[str] = Field(default=None, index=True)
+    version: int = Field(default=1, sa_column_kwargs={"server_default": "1"})
+
+
+track_name_keys(Weapon, name_key="name")
@@ -0,0 +1,28 @@
+// Suggest names for the explorer search forms from /api/search/<table>.
+(function () {
+    var script = document.currentScript;
+    var table = script.dataset.table;
+
+    document.addEventListener("DOMContentLoaded", function () {
+        var input = document.getElementById("name");
+        var list = document.getElementById("name_suggestions");
+        var pending = null;
+
+        input.addEventListener("input", function () {
+            if (pending) {
+                pending.abort();
+            }
+            pending = new AbortController();
+            fetch("/api/search/" + table + "?limit=10&q=" + encodeURIComponent(input.value), {signal: pending.signal})
+                .then(function (response) { return response.json(); })
+                .then(function (result) {
+                    list.replaceChildren.apply(list, result.items.map(function (item) {
+                        var option = document.createElement("option");
+                        option.value = item.name;
+                        return option;
+                    }));
+                })
+                .catch(function () {});
+        });
+    });
+})();
@@ -0,0 +1,35 @@
+// Keep an explorer lookup page current through /explorer/live/<table>/<id>.
+// Elements with a data-field attribute are updated in place; any other change reloads the page.
+(function () {
+    var script = document.currentScript;
+    var table = script.dataset.table;
+    var id = script.dataset.id;
+
+    function apply(changes) {
+        Object.keys(changes).forEach(function (field) {
+            if (field === "version") {
+                return;
+            }
+            var element = document.querySelector('[data-field="' + field + '"]');
+            if (!element) {
+                location.reload();
+            } else {
+                element.textContent = changes[field];
+            }
+        });
+    }
+
+    document.addEventListener("DOMContentLoaded", function () {
+        var scheme = location.protocol === "https:" ? "wss://" : "ws://";
+        var socket = new WebSocket(scheme + location.host + "/explorer/live/" + table + "/" + id);
+        socket.addEventListener("message", function (event) {
+            var message = JSON.parse(event.data);
+            if (message.type === "diff") {
+                apply(message.changes);
+            } else if (message.type === "dropped" || message.type === "deleted") {
+                // Updates were lost or the row is gone; the server's copy is the only safe one.
+                location.reload();
+            }
+        });
+    });
+})();
@@ -0,0 +1,161 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Queue-based logging.
+
+configure_logging() applies logging.json as before, then moves the root logger's handlers
+(stdout, the rotating JSON log file) behind a QueueListener.  Loggers on the event loop only
+enqueue the record; formatting, JSON encoding, file writes and rotation happen on the
+listener's thread.
+
+logging.json can also attach SamplingFilter and RateLimitFilter to individual loggers to thin
+out hot messages before they are queued; both always pass WARNING and above, so failures such
+as failed logins are never dropped.  The shipped config only rate limits.  It also defines
+a "sample_lookups" SamplingFilter that keeps a quarter of the records below WARNING, but leaves
+it unattached.  To sample a logger, add "sample_lookups" to its "filters" list, e.g. for
+"explorer", and adjust "rate" to taste.
+"""
+
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+from threading import Lock
+from typing import Dict, Optional, Tuple
+import atexit
+import copy
+import json
+import logging
+import logging.config
+import random
+import time
+
+_listener: Optional[QueueListener] = None
+_traceback_formatter = logging.Formatter()
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    A QueueHandler that leaves all formatting to the listener thread.
+
+    The stock prepare() formats the whole record on the caller's thread.  Only the message
+    arguments are resolved here, since they may change once the call returns, and a traceback
+    is turned into text so the queue doesn't keep its frames alive.  Like the stock handler it
+    works on a copy, leaving the caller's record, which other handlers may still see, untouched.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or _traceback_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Pass a random fraction of the records below a level; records at or above it always pass.
+    """
+
+    def __init__(self, rate: float = 1.0, below: str = "WARNING", seed: Optional[int] = None):
+        super().__init__()
+        self.rate = rate
+        self.below = logging.getLevelName(below) if isinstance(below, str) else below
+        self._random = random.Random(seed)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= self.below or self._random.random() < self.rate
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket per message template, so one hot log line cannot flood the log.
+
+    Records are grouped by logger and unformatted message, so "Looking up player %s." is one
+    bucket whatever the player.  The next record let through after a drop carries the number
+    of records dropped in between as its `suppressed` attribute.
+    """
+
+    def __init__(self, per_second: float = 10.0, burst: int = 20, below: str = "WARNING"):
+        super().__init__()
+        self.per_second = per_second
+        self.burst = burst
+        self.below = logging.getLevelName(below) if isinstance(below, str) else below
+        # (logger, message) -> [tokens, last refill, dropped since last pass]
+        self._buckets: Dict[Tuple[str, str], list] = {}
+        self._lock = Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= self.below:
+            return True
+        now = time.monotonic()
+        key = (record.name, str(record.msg))
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(self.burst), now, 0]
+            bucket[0] = min(float(self.burst), bucket[0] + (now - bucket[1]) * self.per_second)
+            bucket[1] = now
+            if bucket[0] < 1.0:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1.0
+            if bucket[2]:
+                record.suppressed = bucket[2]
+                bucket[2] = 0
+        return True
+
+
+def configure_logging(config_path: str = "logging.json") -> QueueListener:
+    """
+    Apply the logging configuration and move the root handlers onto a background thread.
+
+    :param config_path: Path to the dictConfig JSON file.
+    :return: The running queue listener.
+    """
+    global _listener
+    stop_logging()
+    with open(config_path, "r") as f:
+        logging.config.dictConfig(config=json.load(f))
+
+    root = logging.getLogger()
+    handlers = list(root.handlers)
+    queue = SimpleQueue()
+    for handler in handlers:
+        root.removeHandler(handler)
+    root.addHandler(DeferredQueueHandler(queue))
+
+    _listener = QueueListener(queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_logging() -> None:
+    """
+    Write out every queued record and stop the listener thread.
+
+    :return:
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
@@ -0,0 +1,363 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Prometheus metrics.
+
+Counters and histograms are sharded per thread: the event loop, every DB pool thread and the
+writer each update their own dictionaries, so recording never takes a lock and never contends.
+Shards are only summed when /metrics is scraped.  Gauges are callbacks read at scrape time.
+
+What is collected:
+
+    sonzo_http_requests_total                 requests by route template, method and status
+    sonzo_http_request_duration_seconds       latency histogram by route template and method
+    sonzo_db_statement_duration_seconds       SQL statement histogram by verb and table
+    sonzo_event_loop_lag_seconds              how late the loop wakes a sleeping task
+    sonzo_cache_*                             cache hits, misses and hit ratios
+"""
+
+from bisect import bisect_left
+from functools import lru_cache
+from threading import Lock, local
+from typing import Callable, Dict, Iterable, List, Tuple
+import asyncio
+import math
+import re
+import time
+
+from sqlalchemy import Engine, event
+from starlette.routing import Mount
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds.  HTTP and SQL share buckets from 100 microseconds to 10 seconds.
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+                   2.5, 5.0, 10.0)
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+LOOP_MONITOR_INTERVAL = 0.5
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Sharded:
+    """
+    Per-thread storage.  Each thread registers its shard once, under a lock; after that it only
+    ever writes to its own dictionary.
+    """
+
+    def __init__(self):
+        self._local = local()
+        self._shards: List[dict] = []
+        self._register = Lock()
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._register:
+                self._shards.append(shard)
+        return shard
+
+    def _snapshot(self) -> List[dict]:
+        with self._register:
+            shards = list(self._shards)
+        # Copy each shard so a writer adding a new label set can't change it mid-iteration.
+        return [dict(shard) for shard in shards]
+
+
+class Counter(_Sharded):
+    """
+    A monotonically increasing count per label set.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__()
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def collect(self) -> List[str]:
+        totals: Dict[Labels, float] = {}
+        for shard in self._snapshot():
+            for labels, value in shard.items():
+                totals[labels] = totals.get(labels, 0) + value
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(totals.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Sharded):
+    """
+    Cumulative bucket counts, sum and count per label set.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__()
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels: str) -> None:
+        shard = self._shard()
+        series = shard.get(labels)
+        if series is None:
+            # Per-bucket (non-cumulative) counts, the +Inf bucket last, then the sum.
+            series = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def collect(self) -> List[str]:
+        totals: Dict[Labels, list] = {}
+        for shard in self._snapshot():
+            for labels, series in shard.items():
+                total = totals.setdefault(labels, [0] * len(series))
+                for i, value in enumerate(list(series)):
+                    total[i] += value
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        names = (*self.labelnames, "le")
+        for labels, series in sorted(totals.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), series[:-1]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(names, (*labels, _format_value(bound)))} "
+                             f"{cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """
+    Values read from a callback at scrape time.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...],
+                 callback: Callable[[], Dict[Labels, float]], kind: str = "gauge"):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.callback = callback
+        self.kind = kind
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for labels, value in sorted(self.callback().items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+_registry: list = []
+
+
+def register(metric):
+    """
+    Add a metric to the /metrics output.
+
+    :param metric: A Counter, Histogram or Gauge.
+    :return: The metric.
+    """
+    _registry.append(metric)
+    return metric
+
+
+def render() -> str:
+    """
+    Render every registered metric in the Prometheus text format.
+
+    :return: The exposition text.
+    """
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.collect())
+    return "\n".join(lines) + "\n"
+
+
+################################################################
+# HTTP
+################################################################
+http_requests = register(Counter(
+    "sonzo_http_requests_total", "HTTP requests by route template, method and status.",
+    ("route", "method", "status")))
+http_duration = register(Histogram(
+    "sonzo_http_request_duration_seconds", "HTTP request latency by route template and method.",
+    ("route", "method")))
+
+
+UNMATCHED = "<unmatched>"
+
+
+def _route_label(scope) -> str:
+    # Routes leave themselves in the scope; a mount only leaves the app it hands the request to.
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    endpoint = scope.get("endpoint")
+    if endpoint is not None:
+        for mount in getattr(scope.get("app"), "routes", ()):
+            if isinstance(mount, Mount) and mount.app is endpoint:
+                return mount.path
+    return UNMATCHED
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request from arrival until its response has been sent.
+
+    Requests are labelled with the matched route template (/explorer/monster/{name}) rather
+    than the raw path, so the number of series stays bounded.  Static mounts are labelled with
+    their mount path template and anything unmatched as UNMATCHED.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            label = _route_label(scope)
+            http_duration.observe(time.perf_counter() - start, label, scope["method"])
+            http_requests.inc(label, scope["method"], str(status))
+
+
+################################################################
+# Database
+################################################################
+db_duration = register(Histogram(
+    "sonzo_db_statement_duration_seconds", "SQL statement latency by verb and table.",
+    ("statement",)))
+
+_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE|TABLE|EXISTS)\s+\"?(\w+)", re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def statement_label(statement: str) -> str:
+    """
+    Reduce a SQL statement to "<VERB> <table>", e.g. "SELECT player".
+
+    :param statement: The SQL text.
+    :return: The label.
+    """
+    words = statement.split(None, 1)
+    verb = words[0].upper() if words else "?"
+    table = _TABLE.search(statement)
+    return f"{verb} {table.group(1)}" if table else verb
+
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    Time every statement run on an engine.
+
+    :param engine: The SQLAlchemy engine.
+    :return:
+    """
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(connection, cursor, statement, parameters, context, executemany):
+        connection.info.setdefault("sonzo_statement_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(connection, cursor, statement, parameters, context, executemany):
+        started = connection.info["sonzo_statement_start"].pop()
+        db_duration.observe(time.perf_counter() - started, statement_label(statement))
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        starts = context.connection.info.get("sonzo_statement_start") if context.connection else None
+        if starts:
+            starts.pop()
+
+
+################################################################
+# Event Loop
+################################################################
+loop_lag = register(Histogram(
+    "sonzo_event_loop_lag_seconds", "How late the event loop woke a task sleeping for "
+    f"{LOOP_MONITOR_INTERVAL}s.", (), LAG_BUCKETS))
+
+
+async def monitor_event_loop(interval: float = LOOP_MONITOR_INTERVAL) -> None:
+    """
+    Sleep in a loop and record how much later than asked each wake-up comes.
+
+    Run as a task for the lifetime of the app.
+
+    :param interval: Seconds between samples.
+    :return:
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        loop_lag.observe(max(0.0, loop.time() - expected))
+
+
+################################################################
+# Caches
+################################################################
+def register_cache_metrics(stats: Callable[[], Dict[str, dict]]) -> None:
+    """
+    Export hit/miss counters and ratios from cache stats() dictionaries.
+
+    :param stats: Returns {cache name: stats()} for every cache.
+    :return:
+    """
+    def series(key: str) -> Callable[[], Dict[Labels, float]]:
+        return lambda: {(name,): values[key] for name, values in stats().items() if key in values}
+
+    register(Gauge("sonzo_cache_hits_total", "Cache hits.", ("cache",), series("hits"), "counter"))
+    register(Gauge("sonzo_cache_misses_total", "Cache misses.", ("cache",), series("misses"), "counter"))
+    register(Gauge("sonzo_cache_hit_ratio", "Cache hits over lookups since start.", ("cache",),
+                   series("hit_ratio")))
+    register(Gauge("sonzo_cache_entries", "Entries currently cached.", ("cache",), series("size")))
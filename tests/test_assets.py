@@ -0,0 +1,44 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Content negotiation for precompressed assets.
+"""
+
+from web.assets import ENCODINGS, accepted_encodings
+
+
+def test_plain_names_are_accepted():
+    assert accepted_encodings("gzip, deflate") == {"gzip"}
+
+
+def test_q_zero_refuses_an_encoding():
+    assert accepted_encodings("gzip;q=0, deflate") == set()
+    assert accepted_encodings("br;q=0, gzip;q=0.5") == {"gzip"}
+    assert accepted_encodings("GZIP; Q=0.000") == set()
+
+
+def test_wildcard_covers_encodings_not_named():
+    assert accepted_encodings("*") == set(ENCODINGS)
+    assert accepted_encodings("*, gzip;q=0") == set(ENCODINGS) - {"gzip"}
+    assert accepted_encodings("*;q=0") == set()
+
+
+def test_empty_or_malformed_headers_accept_nothing():
+    assert accepted_encodings("") == set()
+    assert accepted_encodings("gzip;q=high") == set()
@@ -0,0 +1,113 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Catalog snapshot: batch lookups by id, equipment resolution and table-by-table rebuilds.
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+import game.catalog
+from game.catalog import COLUMNS, MISSING, Catalog, CatalogSnapshot, CatalogTable
+from game.combat import FISTS
+from models.armor import Armor
+from models.monsters import Monster
+from models.players import Player
+from models.weapons import Weapon
+
+ROWS = {
+    Weapon: [(1, 2, 9, 3, 10, 5, False), (4, 1, 4, 0, 0, 0, True)],
+    Armor: [(2, 3, 1, 5, 20, 10, False)],
+    # The second monster's weapon was deleted; the third has no armor.
+    Monster: [(1, 1, 20, 5, 4, 2), (5, 2, 30, 8, 99, 2), (9, 3, 40, 12, 1, None)],
+}
+
+
+def snapshot() -> CatalogSnapshot:
+    tables = {model: CatalogTable.from_rows(rows, COLUMNS[model]) for model, rows in ROWS.items()}
+    return CatalogSnapshot(tables[Weapon], tables[Armor], tables[Monster], 1)
+
+
+def test_batch_lookups_follow_the_order_of_the_ids():
+    weapons = snapshot().weapons
+
+    assert weapons.positions([4, 1, 7]).tolist() == [1, 0, MISSING]
+    assert weapons.take("max_damage", [4, 1, 7], default=-5).tolist() == [4, 9, -5]
+    assert weapons["monster_only"].dtype == bool and weapons["monster_only"].tolist() == [False, True]
+
+
+def test_tables_from_models_match_tables_from_rows():
+    armor = [Armor(id=2, name="Chain", ac=3, damage_buffer=1, weight=5, description="", buy_value=20, sell_value=10)]
+    from_models = CatalogTable.from_models(armor, COLUMNS[Armor])
+    from_rows = CatalogTable.from_rows(ROWS[Armor], COLUMNS[Armor])
+
+    assert from_models.ids.tolist() == from_rows.ids.tolist()
+    assert all(np.array_equal(from_models[name], from_rows[name]) for name in COLUMNS[Armor])
+
+
+def test_columns_are_read_only():
+    with pytest.raises(ValueError):
+        snapshot().weapons["min_damage"][0] = 100
+
+
+def test_monsters_fight_with_their_equipment_or_bare_handed():
+    monsters = snapshot().monster_combatants([9, 1, 5])
+
+    assert monsters.level.tolist() == [3, 1, 2]
+    assert monsters.min_damage.tolist() == [2, 1, FISTS[0]]
+    assert monsters.max_damage.tolist() == [9, 4, FISTS[1]]
+    assert monsters.ac.tolist() == [0, 3, 3]
+    with pytest.raises(KeyError):
+        snapshot().monster_combatants([1, 2])
+
+
+def test_empty_tables_answer_every_lookup_with_the_default():
+    empty = CatalogTable.from_rows([], COLUMNS[Armor])
+
+    assert len(empty) == 0
+    assert empty.take("ac", [1, 2]).tolist() == [0, 0]
+
+
+def test_rebuilds_read_only_stale_tables_and_share_the_rest(monkeypatch):
+    reads = []
+
+    async def get_catalog_columns(model, columns):
+        reads.append(model)
+        return ROWS[model]
+
+    monkeypatch.setattr(game.catalog, "get_catalog_columns", get_catalog_columns)
+    catalog = Catalog()
+
+    async def scenario():
+        first = await catalog.get()
+        reads.clear()
+        catalog.on_save(Weapon, 1, {"max_damage": 12})
+        catalog.on_save(Armor, 2, {"description": "Not a snapshot column."})
+        catalog.on_save(Player, 1, {"gold": 5})
+        second = await catalog.get()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert reads == [Weapon]
+    assert second is not first and second.version == first.version + 1
+    assert second.armor is first.armor and second.monsters is first.monsters
+    assert np.array_equal(second.weapons.ids, first.weapons.ids)
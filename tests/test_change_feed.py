@@ -0,0 +1,142 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Change feed: what one worker sees of the change_log rows other workers write.
+"""
+
+import asyncio
+
+import pytest
+from sqlalchemy import insert
+from sqlmodel import SQLModel, create_engine
+
+from database.changes import ChangeFeed, ChangeLog, prune_changes, record_changes, record_reset
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'game.db'}")
+    SQLModel.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def write(engine, *steps) -> None:
+    # Each step is called with a connection inside one committed transaction.
+    with engine.begin() as connection:
+        for step in steps:
+            step(connection)
+
+
+def from_other_worker(changes):
+    def step(connection):
+        connection.execute(insert(ChangeLog.__table__), [
+            {"table_name": table, "entity_id": entity_id, "version": version, "origin": "other-worker"}
+            for table, entity_id, version in changes])
+    return step
+
+
+def run_feed(engine, *writes):
+    """
+    Start a feed, commit each write and poll once after all of them.
+
+    :param engine: The database engine.
+    :param writes: Lists of steps, each list committed as one transaction.
+    :return: The feed, the changes and the number of resets it reported.
+    """
+    changes, resets = [], []
+
+    async def main():
+        feed = ChangeFeed(engine, lambda table, entity_id: changes.append((table, entity_id)),
+                          lambda: resets.append(1))
+        await feed.start()
+        for steps in writes:
+            write(engine, *steps)
+        await feed.poll()
+        await feed.close()
+        return feed
+
+    return asyncio.run(main()), changes, len(resets)
+
+
+def test_reset_after_changes_in_one_poll_is_reported(engine):
+    feed, changes, resets = run_feed(
+        engine, [from_other_worker([("weapon", 1, 2), ("armor", 4, 3)])], [record_reset])
+
+    assert resets == 1
+    assert changes == [("weapon", 1), ("armor", 4)]
+    assert feed.last_id == 3
+
+
+def test_reset_in_the_same_transaction_as_own_changes_is_reported(engine):
+    feed, changes, resets = run_feed(engine, [lambda c: record_changes(c, [("weapon", 1, 2)]), record_reset])
+
+    assert resets == 1
+    assert changes == []
+
+
+def test_pruned_rows_cause_a_reset(engine):
+    feed, changes, resets = run_feed(
+        engine, [from_other_worker([("weapon", 1, 2), ("weapon", 2, 2), ("weapon", 3, 2)]),
+                 lambda c: prune_changes(c, retention=1)])
+
+    assert resets == 1
+    assert changes == [("weapon", 3)]
+
+
+def test_other_workers_changes_are_reported_once_per_row(engine):
+    feed, changes, resets = run_feed(
+        engine, [from_other_worker([("weapon", 1, 2), ("weapon", 1, 3)])], [from_other_worker([("armor", 2, 2)])])
+
+    assert changes == [("weapon", 1), ("armor", 2)]
+    assert resets == 0
+    assert feed.changes == 2 and feed.last_id == 3
+
+
+def test_own_changes_are_skipped(engine):
+    feed, changes, resets = run_feed(engine, [lambda c: record_changes(c, [("weapon", 1, 2)])])
+
+    assert changes == []
+    assert resets == 0
+    assert feed.last_id == 1
+
+
+def test_changes_before_start_are_not_reported(engine):
+    write(engine, from_other_worker([("weapon", 1, 2)]))
+
+    feed, changes, resets = run_feed(engine)
+
+    assert changes == []
+    assert feed.last_id == 1
+
+
+def test_each_change_is_reported_by_one_poll_only(engine):
+    reported = []
+
+    async def poll_twice():
+        idle = ChangeFeed(engine, lambda table, entity_id: reported.append(entity_id), lambda: None)
+        await idle.start()
+        write(engine, from_other_worker([("weapon", 2, 2)]))
+        first = await idle.poll()
+        second = await idle.poll()
+        await idle.close()
+        return first, second
+
+    assert asyncio.run(poll_twice()) == (1, 0)
+    assert reported == [2]
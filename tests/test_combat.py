@@ -0,0 +1,101 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Combat rules, for single fights and vectorized batches.
+"""
+
+import random
+
+import numpy as np
+
+from game.combat import (FISTS, MAX_HIT_CHANCE, MAX_ROUNDS, MIN_HIT_CHANCE, MIN_HIT_DAMAGE, Combatant, hit_chance,
+                         resolve_fight, simulate_fights)
+from models.armor import Armor
+from models.weapons import Weapon
+
+HERO = Combatant(level=5, health=100, min_damage=8, max_damage=12, ac=10, damage_buffer=2)
+RAT = Combatant(level=1, health=10, min_damage=1, max_damage=2, ac=0, damage_buffer=0)
+
+
+def test_hit_chance_is_clamped_and_works_on_arrays():
+    assert hit_chance(1, 1, 0) == 0.75
+    assert hit_chance(100, 1, 0) == MAX_HIT_CHANCE
+    assert hit_chance(1, 100, 500) == MIN_HIT_CHANCE
+    assert np.allclose(hit_chance(np.array([1, 3]), 1, np.array([0, 10])), [0.75, 0.74])
+
+
+def test_unequipped_combatants_fight_bare_handed():
+    bare = Combatant.equipped(2, 50, None, None)
+    armed = Combatant.equipped(2, 50, Weapon(min_damage=3, max_damage=7), Armor(ac=4, damage_buffer=1))
+
+    assert (bare.min_damage, bare.max_damage, bare.ac, bare.damage_buffer) == (*FISTS, 0, 0)
+    assert (armed.min_damage, armed.max_damage, armed.ac, armed.damage_buffer) == (3, 7, 4, 1)
+
+
+def test_seeded_fights_repeat_and_a_strong_player_wins():
+    first = resolve_fight(HERO, RAT, random.Random(1))
+
+    assert first == resolve_fight(HERO, RAT, random.Random(1))
+    assert first.player_won and first.monster_health <= 0 < first.player_health
+
+
+def test_a_hit_does_at_least_minimum_damage_through_thick_armor():
+    tank = RAT._replace(health=1000, damage_buffer=50)
+
+    result = resolve_fight(HERO._replace(level=100), tank, random.Random(2))
+
+    assert not result.player_won and result.rounds == MAX_ROUNDS
+    # Every hit does exactly the minimum, and at most one lands per round.
+    assert 0 < 1000 - result.monster_health <= MAX_ROUNDS * MIN_HIT_DAMAGE
+
+
+def test_a_damage_range_entered_backwards_still_rolls_between_its_numbers():
+    backwards = HERO._replace(level=100, min_damage=12, max_damage=8, health=10 ** 6)
+    dummy = RAT._replace(health=10 ** 6, level=1)
+
+    single = resolve_fight(backwards, dummy, random.Random(3))
+    batch = simulate_fights(backwards, dummy, 50, seed=3)
+
+    dealt = 10 ** 6 - single.monster_health
+    assert 8 * MAX_ROUNDS * 0.9 <= dealt <= 12 * MAX_ROUNDS
+    assert ((10 ** 6 - batch.monster_health) <= 12 * MAX_ROUNDS).all()
+    assert ((10 ** 6 - batch.monster_health) >= 8 * MAX_ROUNDS * 0.8).all()
+
+
+def test_batches_mix_scalars_and_arrays_and_repeat_with_a_seed():
+    monsters = RAT._replace(health=np.array([10, 10, 10 ** 6]), level=np.array([1, 1, 1]))
+
+    result = simulate_fights(HERO, monsters, 3, seed=11)
+    again = simulate_fights(HERO, monsters, 3, seed=11)
+
+    assert result.player_won.tolist() == [True, True, False]
+    assert result.rounds[2] == MAX_ROUNDS
+    assert all(np.array_equal(a, b) for a, b in zip(result, again))
+
+
+def test_batch_win_rate_matches_single_fights():
+    fair = Combatant(level=1, health=30, min_damage=2, max_damage=6, ac=0, damage_buffer=0)
+    rng = random.Random(5)
+
+    single = sum(resolve_fight(fair, fair, rng).player_won for _ in range(4000)) / 4000
+    batch = simulate_fights(fair, fair, 4000, seed=5).player_won.mean()
+
+    # Striking first is an edge, and both ways of fighting agree on it.
+    assert single > 0.5 and batch > 0.5
+    assert abs(single - batch) < 0.05
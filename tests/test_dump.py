@@ -0,0 +1,147 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Whole-database dumps: round trips, replace scope and the errors a bad dump raises.
+"""
+
+import io
+import json
+
+import pytest
+from sqlalchemy import select
+from sqlmodel import Session, SQLModel, create_engine
+
+from database.changes import RESET_MARKER, ChangeLog
+from database.dump import export_ndjson, import_dump, read_ndjson
+from models.armor import Armor
+from models.monsters import Monster
+from models.players import Player
+from models.weapons import Weapon
+
+
+def make_engine(path):
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture
+def source(tmp_path):
+    engine = make_engine(tmp_path / "source.db")
+    with Session(engine) as session:
+        session.add_all([
+            Weapon(id=1, name="Rapier", weight=3, min_damage=2, max_damage=9, description="A thin blade.",
+                   buy_value=10, sell_value=5),
+            Weapon(id=2, name="Claws", weight=0, min_damage=1, max_damage=4, description="Sharp.",
+                   buy_value=0, sell_value=0, monster_only=True),
+            Armor(id=1, name="Cloth Rags", ac=1, weight=1, damage_buffer=0, description="Barely.", buy_value=1,
+                  sell_value=0),
+            Player(id=1, username="Frag", password="hash", name="Mock_Dave", level=1, health=100, exp=0, armor=1,
+                   weapon=1, gold=10, bank=100, description="A player.", image_url="frag.png", name_key="mock_dave",
+                   username_key="frag"),
+            Monster(id=1, name="Goblin", level=1, health=20, exp=5, weapon=2, armor=1, description="Small.",
+                    image_url="goblin.png", name_key="goblin"),
+        ])
+        session.commit()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def target(tmp_path):
+    engine = make_engine(tmp_path / "target.db")
+    yield engine
+    engine.dispose()
+
+
+def dump(engine) -> str:
+    out = io.StringIO()
+    export_ndjson(engine, out, batch_size=2)
+    return out.getvalue()
+
+
+def rows(engine, model) -> list:
+    with Session(engine) as session:
+        return [row.model_dump() for row in session.exec(select(model).order_by(model.id)).scalars()]
+
+
+def test_export_then_import_copies_every_row(source, target):
+    text = dump(source)
+
+    counts = import_dump(target, read_ndjson(text.splitlines()), batch_size=2)
+
+    assert counts == {"weapon": 2, "armor": 1, "player": 1, "monster": 1}
+    for model in (Weapon, Armor, Player, Monster):
+        assert rows(target, model) == rows(source, model)
+    assert [json.loads(line)["table"] for line in text.splitlines()] == \
+        ["weapon", "weapon", "armor", "player", "monster"]
+
+
+def test_import_recomputes_name_keys_and_fills_defaults(target):
+    lines = [json.dumps({"table": "weapon", "row": {"id": 7, "name": "Great Axe", "weight": 9, "min_damage": 4,
+                                                     "max_damage": 12, "description": "Heavy.", "buy_value": 40,
+                                                     "sell_value": 20}})]
+
+    import_dump(target, read_ndjson(lines))
+
+    weapon = rows(target, Weapon)[0]
+    assert (weapon["name_key"], weapon["monster_only"], weapon["version"]) == ("great axe", False, 1)
+
+
+def test_import_tells_every_worker_to_reset(source, target):
+    import_dump(target, read_ndjson(dump(source).splitlines()))
+
+    with Session(target) as session:
+        assert session.exec(select(ChangeLog.table_name)).scalars().all() == [RESET_MARKER]
+
+
+def test_clashing_ids_fail_without_replace_and_leave_the_database_alone(source, target):
+    text = dump(source)
+    import_dump(target, read_ndjson(text.splitlines()))
+
+    with pytest.raises(ValueError, match="clash"):
+        import_dump(target, read_ndjson(text.splitlines()))
+
+    assert len(rows(target, Weapon)) == 2
+
+
+def test_replace_only_empties_tables_in_the_dump(source, target):
+    import_dump(target, read_ndjson(dump(source).splitlines()))
+    weapons_only = [line for line in dump(source).splitlines() if json.loads(line)["table"] == "weapon"][:1]
+
+    counts = import_dump(target, read_ndjson(weapons_only), replace=True)
+
+    assert counts["weapon"] == 1
+    assert [weapon["id"] for weapon in rows(target, Weapon)] == [1]
+    assert len(rows(target, Player)) == 1 and len(rows(target, Monster)) == 1
+
+
+@pytest.mark.parametrize("lines, message", [
+    (['{"table": "dragon", "row": {}}'], "Unknown table"),
+    (['{"table": "armor", "row": {"id": 1, "name": "a", "ac": 1, "weight": 1, "damage_buffer": 0, '
+      '"description": "", "buy_value": 0, "sell_value": 0}}',
+      '{"table": "weapon", "row": {"id": 1, "name": "w", "weight": 1, "min_damage": 1, "max_damage": 1, '
+      '"description": "", "buy_value": 0, "sell_value": 0}}'], "foreign-key order"),
+    (['{"table": "weapon"', ], "Line 1"),
+])
+def test_bad_dumps_are_rejected(target, lines, message):
+    with pytest.raises(ValueError, match=message):
+        import_dump(target, read_ndjson(lines))
+
+    assert rows(target, Weapon) == [] and rows(target, Armor) == []
@@ -0,0 +1,44 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Engine profiles across file and in-memory databases.
+"""
+
+import pytest
+from sqlalchemy.pool import QueuePool
+
+from database.engine import create_game_engine, is_file_database, load_engine_settings
+
+
+@pytest.mark.parametrize("url", ["sqlite://", "sqlite:///:memory:", "sqlite:///file:game?mode=memory&uri=true"])
+def test_in_memory_databases_keep_their_own_pool(url):
+    engine = create_game_engine({**load_engine_settings("wal"), "url": url})
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("SELECT 1").scalar() == 1
+    assert not is_file_database(url)
+    engine.dispose()
+
+
+def test_file_databases_get_the_profile_pool(tmp_path):
+    engine = create_game_engine({**load_engine_settings("wal"), "url": f"sqlite:///{tmp_path / 'game.db'}",
+                                 "pool_size": 3})
+    assert isinstance(engine.pool, QueuePool) and engine.pool.size() == 3
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+    engine.dispose()
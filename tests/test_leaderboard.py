@@ -0,0 +1,96 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Leaderboards: ordering, ties, ranks and moving players without a re-sort.
+"""
+
+import random
+
+from game.leaderboard import Leaderboard, Leaderboards, Standing
+from models.players import Player
+from models.weapons import Weapon
+
+
+def standing(exp: int = 0, level: int = 1, gold: int = 0, bank: int = 0) -> Standing:
+    return Standing(level, exp, gold, bank)
+
+
+def exp_board(standings) -> Leaderboard:
+    board = Leaderboard("exp", lambda standing: standing.exp)
+    board.load(standings.items())
+    return board
+
+
+def test_board_runs_best_first_with_ties_broken_by_id():
+    board = exp_board({3: standing(50), 1: standing(10), 2: standing(50), 4: standing(0)})
+
+    assert board.top(0, 10) == [2, 3, 1, 4]
+    assert board.top(1, 2) == [3, 1]
+
+
+def test_tied_players_share_a_rank():
+    board = exp_board({1: standing(50), 2: standing(50), 3: standing(10)})
+
+    assert [board.rank(standing(exp)) for exp in (50, 10, 0, 99)] == [1, 3, 4, 1]
+
+
+def test_moves_match_a_fresh_sort():
+    generator = random.Random(7)
+    standings = {player_id: standing(generator.randrange(100)) for player_id in range(1, 200)}
+    board = exp_board(standings)
+
+    for _ in range(500):
+        player_id = generator.randrange(1, 200)
+        new = standing(max(0, standings[player_id].exp + generator.randrange(-30, 31)))
+        board.move(player_id, standings[player_id], new)
+        standings[player_id] = new
+
+    assert board.top(0, len(standings)) == exp_board(standings).top(0, len(standings))
+
+
+def test_remove_drops_only_that_player():
+    board = exp_board({1: standing(50), 2: standing(50)})
+    board.remove(1, standing(50))
+    board.remove(9, standing(50))
+
+    assert board.top(0, 10) == [2]
+
+
+def test_level_board_breaks_level_ties_by_experience():
+    boards = Leaderboards()
+    boards.boards["level"].load({1: standing(exp=5, level=3), 2: standing(exp=90, level=3),
+                                 3: standing(exp=999, level=2)}.items())
+
+    assert boards.boards["level"].top(0, 3) == [2, 1, 3]
+
+
+def test_saves_move_players_on_every_board_they_affect():
+    boards = Leaderboards()
+    for player_id, values in {1: standing(exp=10, gold=5), 2: standing(exp=20, gold=50)}.items():
+        boards._move(player_id, values)
+    boards._ready = True
+
+    boards.on_save(Player, 1, {"exp": 30, "version": 2})
+    boards.on_save(Player, 2, {"name": "Renamed", "version": 3})
+    boards.on_save(Weapon, 1, {"exp": 0})
+
+    assert boards.boards["exp"].top(0, 2) == [1, 2]
+    assert boards.boards["wealth"].top(0, 2) == [2, 1]
+    assert boards.standing(1).exp == 30
+    assert boards.updates == 3
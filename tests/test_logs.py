@@ -0,0 +1,55 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Queue logging: what reaches the listener thread and what the filters let through.
+"""
+
+import logging
+import sys
+from queue import SimpleQueue
+
+from telemetry.logs import DeferredQueueHandler, RateLimitFilter
+
+
+def record(level: int = logging.INFO, msg: str = "Looking up player '%s'.", args=("Frag",), exc_info=None):
+    return logging.LogRecord("explorer", level, __file__, 1, msg, args, exc_info)
+
+
+def test_prepare_leaves_the_callers_record_alone():
+    try:
+        raise ValueError("bad row")
+    except ValueError:
+        original = record(logging.ERROR, exc_info=sys.exc_info())
+    queue = SimpleQueue()
+
+    DeferredQueueHandler(queue).handle(original)
+    queued = queue.get_nowait()
+
+    assert queued is not original
+    assert (queued.msg, queued.args, queued.exc_info) == ("Looking up player 'Frag'.", None, None)
+    assert "ValueError: bad row" in queued.exc_text
+    assert original.args == ("Frag",) and original.exc_info is not None
+    assert "ValueError: bad row" in logging.Formatter().format(queued)
+
+
+def test_rate_limit_drops_repeats_but_never_warnings():
+    rate_limit = RateLimitFilter(per_second=0, burst=2)
+
+    assert [rate_limit.filter(record()) for _ in range(4)] == [True, True, False, False]
+    assert all(rate_limit.filter(record(logging.WARNING, "Failed login for '%s'.")) for _ in range(10))
@@ -0,0 +1,54 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+HTTP metrics labels stay bounded whatever paths clients ask for.
+"""
+
+from fastapi import FastAPI
+from fastapi.staticfiles import StaticFiles
+from fastapi.testclient import TestClient
+
+from telemetry.metrics import UNMATCHED, MetricsMiddleware, http_requests
+
+
+def request_lines(path_label: str) -> list:
+    return [line for line in http_requests.collect() if f'route="{path_label}"' in line]
+
+
+def test_requests_are_labelled_by_route_template_mount_or_unmatched(tmp_path):
+    (tmp_path / "styles.css").write_text("h1 {}")
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+    app.mount("/test-static", StaticFiles(directory=str(tmp_path)), name="test-static")
+
+    @app.get("/test-monster/{name}")
+    async def monster(name: str) -> dict:
+        return {"name": name}
+
+    with TestClient(app) as client:
+        client.get("/test-monster/goblin")
+        client.get("/test-static/styles.css")
+        client.get("/test-static/missing.css")
+        client.get("/no/such/page/1")
+        client.get("/no/such/page/2")
+
+    assert len(request_lines("/test-monster/{name}")) == 1
+    assert len(request_lines("/test-static")) == 2
+    assert request_lines(UNMATCHED)
+    assert not [line for line in http_requests.collect() if "/no/such" in line or "goblin" in line]
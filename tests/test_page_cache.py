@@ -0,0 +1,62 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Page cache: conditional GETs answered from a cached page.
+"""
+
+from fastapi import FastAPI, Request
+from fastapi.templating import Jinja2Templates
+from fastapi.testclient import TestClient
+
+from models.weapons import Weapon
+from web.page_cache import cached_page, page_cache
+
+
+def rapier(**values) -> Weapon:
+    return Weapon(**{"id": 1, "name": "rapier", "weight": 3, "min_damage": 2, "max_damage": 9,
+                     "description": "A thin blade.", "buy_value": 10, "sell_value": 5, **values})
+
+
+def test_conditional_get_with_matching_etag_is_not_modified(tmp_path):
+    (tmp_path / "weapon.html").write_text("<h1>{{ weapon.name }}</h1>")
+    templates = Jinja2Templates(directory=str(tmp_path))
+    loads = []
+
+    async def load():
+        loads.append(1)
+        return rapier(version=1)
+
+    app = FastAPI()
+
+    @app.get("/weapon")
+    async def weapon_page(request: Request):
+        return await cached_page(request, templates, "weapon.html", "weapon", ("weapon", "test"), load)
+
+    page_cache.clear()
+    with TestClient(app) as client:
+        first = client.get("/weapon")
+        etag = first.headers["etag"]
+        again = client.get("/weapon", headers={"If-None-Match": etag})
+        other = client.get("/weapon", headers={"If-None-Match": '"something-else"'})
+    page_cache.clear()
+
+    assert first.status_code == 200 and first.text == "<h1>rapier</h1>"
+    assert again.status_code == 304 and again.content == b"" and again.headers["etag"] == etag
+    assert other.status_code == 200
+    assert len(loads) == 1
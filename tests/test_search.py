@@ -0,0 +1,85 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+In-memory search: ranking, typo tolerance and keeping the index current.
+"""
+
+from database import connections
+from database.search import SearchIndex, edit_distance
+from models.weapons import Weapon
+
+
+def weapons_index() -> SearchIndex:
+    index = SearchIndex("weapon")
+    index.load([(1, "Rapier", "A thin blade."),
+                (2, "Rusty Rapier", "A rapier left out in the rain."),
+                (3, "Broadsword", "A heavy blade."),
+                (4, "Short Bow", "Fires arrows.")])
+    return index
+
+
+def names(hits) -> list:
+    return [hit.name for hit in hits]
+
+
+def test_exact_name_ranks_above_prefix_and_term_matches():
+    hits = weapons_index().search("rapier")
+
+    assert names(hits) == ["Rapier", "Rusty Rapier"]
+    assert hits[0].score > hits[1].score
+
+
+def test_every_query_term_must_match():
+    index = weapons_index()
+
+    assert names(index.search("heavy bla")) == ["Broadsword"]
+    assert index.search("heavy arrows") == []
+
+
+def test_misspelled_terms_fall_back_to_similar_names():
+    index = weapons_index()
+
+    assert names(index.search("raiper")) == ["Rapier", "Rusty Rapier"]
+    assert names(index.search("broadswrod")) == ["Broadsword"]
+    assert index.search("zzzzzz") == []
+
+
+def test_edit_distance_counts_adjacent_swaps_once_and_stops_past_the_limit():
+    assert edit_distance("rapier", "raiper", 2) == 1
+    assert edit_distance("sword", "swdro", 2) == 2
+    assert edit_distance("bow", "broadsword", 2) > 2
+
+
+def test_updates_and_removals_take_effect_without_a_reload():
+    index = weapons_index()
+    index.update(4, "Long Bow", "Fires arrows further.")
+    index.remove(3)
+
+    assert names(index.search("long")) == ["Long Bow"]
+    assert index.search("short") == []
+    assert index.search("broadsword") == []
+
+
+def test_only_saves_touching_indexed_text_restart_a_load():
+    before = connections._search_generations[Weapon]
+    connections._update_search_index(Weapon, 1, {"min_damage": 3, "version": 2})
+    assert connections._search_generations[Weapon] == before
+
+    connections._update_search_index(Weapon, 1, {"name": "Rapier", "version": 3})
+    assert connections._search_generations[Weapon] == before + 1
@@ -0,0 +1,148 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+World scheduler: the timer wheel, the effects its timers apply and how their writes go out.
+"""
+
+import asyncio
+import random
+
+import pytest
+
+import game.world
+from game.timers import SLOTS, TimerWheel
+from game.world import INTEREST_SECONDS, REGEN_SECONDS, RESPAWN_SECONDS, Vitals, World, max_health
+from models.players import Player
+
+
+def test_timers_fire_on_their_deadline_across_levels():
+    wheel = TimerWheel()
+    generator = random.Random(3)
+    delays = {key: generator.randrange(1, SLOTS ** 2 * 2) for key in range(300)}
+    for key, delay in delays.items():
+        wheel.schedule(key, delay, value=delay)
+
+    fired = {}
+    for tick in range(1, max(delays.values()) + 1):
+        for key, value in wheel.advance():
+            fired[key] = (tick, value)
+
+    assert fired == {key: (delay, delay) for key, delay in delays.items()}
+    assert len(wheel) == 0
+
+
+def test_rescheduling_moves_a_timer_and_cancel_removes_it():
+    wheel = TimerWheel()
+    wheel.schedule("regen", 5)
+    wheel.schedule("regen", 2)
+    wheel.schedule("respawn", 3)
+
+    assert wheel.deadline("regen") == 2
+    assert wheel.cancel("respawn") and not wheel.cancel("respawn")
+    assert [wheel.advance() for _ in range(3)] == [[], [("regen", None)], []]
+
+
+def test_delays_outside_the_wheel_are_rejected():
+    wheel = TimerWheel(levels=2)
+
+    with pytest.raises(ValueError):
+        wheel.schedule("now", 0)
+    with pytest.raises(ValueError):
+        wheel.schedule("too late", wheel.horizon + 1)
+
+
+def running_world(players=None) -> World:
+    world = World(tick_seconds=1, flush_seconds=10 ** 6)
+    # on_save only listens while the world runs.
+    world._task = object()
+    for player_id, vitals in (players or {}).items():
+        world._set(player_id, vitals)
+        world._versions[player_id] = 1
+    return world
+
+
+def run_ticks(world: World, ticks: int) -> None:
+    for _ in range(ticks):
+        world.tick()
+
+
+def test_injured_players_regenerate_up_to_their_maximum():
+    world = running_world({4000: Vitals(level=1, health=max_health(1) - 3, bank=0)})
+
+    run_ticks(world, REGEN_SECONDS)
+    assert world._players[4000].health == max_health(1)
+    assert world._dirty[4000] == {"health": max_health(1)}
+
+    run_ticks(world, REGEN_SECONDS * 3)
+    assert ("regen", 4000) not in world.wheel
+
+
+def test_interest_is_paid_once_per_interval():
+    world = running_world({7: Vitals(level=1, health=max_health(1), bank=100_000)})
+
+    # Staggered by id: player 7 is first paid on tick 8.
+    run_ticks(world, 8)
+    assert world._players[7].bank == 100_100
+    run_ticks(world, INTEREST_SECONDS - 1)
+    assert world._players[7].bank == 100_100
+    run_ticks(world, 1)
+    assert world._players[7].bank == 100_200
+
+
+def test_slain_monsters_respawn():
+    world = running_world()
+    world.kill_monster(3)
+
+    run_ticks(world, RESPAWN_SECONDS - 1)
+    assert not world.monster_alive(3)
+    run_ticks(world, 1)
+    assert world.monster_alive(3)
+
+
+def test_an_edit_wins_over_unwritten_ticks():
+    world = running_world({4000: Vitals(level=1, health=10, bank=0)})
+    run_ticks(world, REGEN_SECONDS)
+    assert "health" in world._dirty[4000]
+
+    world.on_save(Player, 4000, {"health": 90, "version": 2})
+
+    assert world._dirty[4000] == {}
+    assert world._players[4000].health == 90
+    assert world._versions[4000] == 2
+
+
+def test_flush_writes_at_the_seen_version_and_rereads_players_saved_meanwhile(monkeypatch):
+    world = running_world({1: Vitals(1, 50, 0), 2: Vitals(1, 50, 0)})
+    world._dirty = {1: {"health": 55}, 2: {"health": 55}}
+    calls = []
+
+    async def save_row_values(model, updates, expected_versions, bump_version):
+        calls.append((model, updates, expected_versions, bump_version))
+        return {1: 1}
+
+    async def get_player_vitals(ids=None):
+        return [(2, 1, 80, 0, 4)]
+
+    monkeypatch.setattr(game.world, "save_row_values", save_row_values)
+    monkeypatch.setattr(game.world, "get_player_vitals", get_player_vitals)
+    asyncio.run(world._flush())
+
+    assert calls == [(Player, {1: {"health": 55}, 2: {"health": 55}}, {1: 1, 2: 1}, False)]
+    assert world.flushed == 1
+    assert world._players[2] == Vitals(1, 80, 0) and world._versions[2] == 4
@@ -0,0 +1,89 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Write queue guarantees the change feed, world and live updates rely on.
+"""
+
+import asyncio
+
+import pytest
+from sqlmodel import Session, SQLModel, create_engine
+
+import database.changes  # noqa: F401  (change_log table, which every write batch appends to)
+from database.writer import StaleVersionError, WriteQueue
+from models.weapons import Weapon
+
+
+def rapier(**values) -> Weapon:
+    return Weapon(**{"id": 1, "name": "rapier", "weight": 3, "min_damage": 2, "max_damage": 9,
+                     "description": "A thin blade.", "buy_value": 10, "sell_value": 5, **values})
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'game.db'}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(rapier())
+        session.commit()
+    yield engine
+    engine.dispose()
+
+
+def run_queue(engine, writes):
+    """
+    Submit every (values, expected_version) in one go, then wait for all of them.
+
+    :param engine: The database engine.
+    :param writes: The writes to submit.
+    :return: The queue and the results, exceptions included.
+    """
+    async def main():
+        queue = WriteQueue(engine)
+        futures = [queue.submit(Weapon, 1, values, expected_version) for values, expected_version in writes]
+        results = await asyncio.gather(*futures, return_exceptions=True)
+        await queue.close()
+        return queue, results
+
+    return asyncio.run(main())
+
+
+def read_weapon(engine) -> Weapon:
+    with Session(engine) as session:
+        return session.get(Weapon, 1)
+
+
+def test_unconditional_writes_to_one_row_coalesce(engine):
+    queue, results = run_queue(engine, [({"min_damage": 3}, None), ({"max_damage": 12}, None)])
+
+    assert results == [2, 2]
+    assert queue.coalesced == 1
+    assert queue.writes == 1
+    weapon = read_weapon(engine)
+    assert (weapon.min_damage, weapon.max_damage, weapon.version) == (3, 12, 2)
+
+
+def test_stale_expected_version_raises(engine):
+    queue, results = run_queue(engine, [({"min_damage": 3}, 1), ({"min_damage": 4}, 1)])
+
+    assert results[0] == 2
+    assert isinstance(results[1], StaleVersionError)
+    assert (results[1].expected_version, results[1].current_version) == (1, 2)
+    weapon = read_weapon(engine)
+    assert (weapon.min_damage, weapon.version) == (3, 2)
@@ -0,0 +1,149 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Fingerprinted, precompressed text assets.
+
+Every text asset directly under static/ (styles.css, license.txt, ...) is copied to static/build
+as <stem>.<content hash><suffix> alongside .gz and, when the brotli package is installed, .br
+encodings.  manifest.json maps each logical name to its fingerprinted file, and templates link
+assets through asset_url() so a changed file always gets a new URL.
+
+Build ahead of a deploy with `python -m web.assets`; the app also builds at startup, which only
+rewrites assets whose content has changed.
+"""
+
+from hashlib import sha256
+from os.path import join
+from pathlib import Path
+from typing import Dict, Set
+import gzip
+import json
+import logging
+import os
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger("assets")
+
+top = Path(__file__).resolve().parent.parent
+STATIC_DIR = join(f"{top}", "static")
+BUILD_DIR = join(STATIC_DIR, "build")
+BUILD_URL = "/static/build"
+STATIC_URL = "/static"
+MANIFEST = join(BUILD_DIR, "manifest.json")
+
+TEXT_SUFFIXES = {".css", ".js", ".txt", ".svg", ".json", ".html"}
+
+# Encoding name -> (file suffix, compress function).  Listed best first.
+ENCODINGS = {}
+if brotli is not None:
+    ENCODINGS["br"] = (".br", lambda data: brotli.compress(data, quality=11))
+ENCODINGS["gzip"] = (".gz", lambda data: gzip.compress(data, compresslevel=9, mtime=0))
+
+
+def accepted_encodings(header: str) -> Set[str]:
+    """
+    Return which of ENCODINGS an Accept-Encoding header allows.
+
+    An entry with q=0 refuses that encoding, and * stands for every encoding not named.
+
+    :param header: The header value, possibly empty.
+    :return: The allowed encoding names.
+    """
+    qualities = {}
+    for entry in header.split(","):
+        name, *parameters = entry.split(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for parameter in parameters:
+            key, _, value = parameter.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name] = quality
+    wildcard = qualities.pop("*", 0.0)
+    return {encoding for encoding in ENCODINGS if qualities.get(encoding, wildcard) > 0}
+
+_manifest: Dict[str, str] = {}
+
+
+def _write_atomically(path: str, data: bytes) -> None:
+    # Several workers may build at once; each writes a private temp file and renames it into place.
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(data)
+    os.replace(temporary, path)
+
+
+def build_assets() -> Dict[str, str]:
+    """
+    Fingerprint and precompress the text assets and rewrite the manifest.
+
+    :return: The manifest mapping logical names to fingerprinted file names.
+    """
+    global _manifest
+    os.makedirs(BUILD_DIR, exist_ok=True)
+    manifest = {}
+
+    for entry in sorted(os.scandir(STATIC_DIR), key=lambda e: e.name):
+        if not entry.is_file() or Path(entry.name).suffix.lower() not in TEXT_SUFFIXES:
+            continue
+        with open(entry.path, "rb") as f:
+            data = f.read()
+        path = Path(entry.name)
+        name = f"{path.stem}.{sha256(data).hexdigest()[:12]}{path.suffix}"
+        manifest[entry.name] = name
+
+        target = join(BUILD_DIR, name)
+        if not os.path.exists(target):
+            logger.info("Building asset %s.", name)
+            _write_atomically(target, data)
+        for suffix, compress in ENCODINGS.values():
+            if not os.path.exists(target + suffix):
+                _write_atomically(target + suffix, compress(data))
+
+    _write_atomically(MANIFEST, json.dumps(manifest, indent=2).encode())
+    _manifest = manifest
+    return manifest
+
+
+def asset_url(name: str) -> str:
+    """
+    Return the URL of a static asset, fingerprinted if it has been built.
+
+    :param name: The asset's file name under static/, e.g. "styles.css".
+    :return: An absolute URL.
+    """
+    built = _manifest.get(name)
+    if built is None:
+        return f"{STATIC_URL}/{name}"
+    return f"{BUILD_URL}/{built}"
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    for logical, built in build_assets().items():
+        print(f"{logical} -> {built} ({', '.join(ENCODINGS)})")
@@ -0,0 +1,184 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Image derivatives for static/images.
+
+Every source image is resized to each of WIDTHS and encoded as AVIF and WebP (whichever this
+Pillow build supports) under static/derived/images, named <stem>.<content hash>.<width>.<format>.
+Because the name changes whenever the source changes, derived files can be served as immutable.
+manifest.json maps each source image to its variants; picture() uses it to emit a responsive
+<picture> element and falls back to the original URL for anything not in the manifest.
+
+Build ahead of a deploy with `python -m web.images`; the app also runs build_image_derivatives()
+at startup, which only encodes images whose content has changed.
+"""
+
+from hashlib import sha256
+from os.path import join
+from pathlib import Path
+from threading import Event
+from typing import Dict, Optional
+import json
+import logging
+import os
+
+from markupsafe import Markup, escape
+from PIL import Image, features
+
+logger = logging.getLogger("images")
+
+top = Path(__file__).resolve().parent.parent
+SOURCE_DIR = join(f"{top}", "static", "images")
+DERIVED_DIR = join(f"{top}", "static", "derived", "images")
+DERIVED_URL = "/static/derived/images"
+MANIFEST = join(DERIVED_DIR, "manifest.json")
+
+WIDTHS = (160, 320)
+DEFAULT_WIDTH = 320
+SOURCE_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp", ".gif"}
+# Best first; formats this Pillow build cannot encode are skipped.
+FORMATS = tuple(fmt for fmt in ("avif", "webp") if features.check(fmt))
+QUALITY = {"avif": 60, "webp": 80}
+
+_manifest: Dict[str, dict] = {}
+
+
+def _content_hash(path: str) -> str:
+    with open(path, "rb") as f:
+        return sha256(f.read()).hexdigest()[:12]
+
+
+def _write_atomically(path: str, write) -> None:
+    # Several workers may build at once; each writes a private temp file and renames it into place.
+    temporary = f"{path}.{os.getpid()}.tmp"
+    write(temporary)
+    os.replace(temporary, path)
+
+
+def _derive(source: str, relative: str, digest: str) -> dict:
+    stem = Path(relative).with_suffix("")
+    variants: Dict[str, Dict[str, str]] = {fmt: {} for fmt in FORMATS}
+    with Image.open(source) as image:
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+        for width in WIDTHS:
+            if width > image.width:
+                continue
+            height = round(image.height * width / image.width)
+            resized = image.resize((width, height), Image.LANCZOS)
+            for fmt in FORMATS:
+                name = f"{stem}.{digest}.{width}.{fmt}"
+                path = join(DERIVED_DIR, name)
+                if not os.path.exists(path):
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    _write_atomically(path, lambda temporary: resized.save(temporary, fmt.upper(),
+                                                                          quality=QUALITY[fmt]))
+                variants[fmt][str(width)] = name
+        return {"hash": digest, "width": image.width, "height": image.height, "variants": variants}
+
+
+def build_image_derivatives(stop: Optional[Event] = None) -> Dict[str, dict]:
+    """
+    Generate any missing derivatives and rewrite the manifest.
+
+    Setting stop ends the build after the image in progress, leaving the manifest as it was.
+    Derivatives already written are found on disk and reused by the next build.
+
+    :param stop: Set from another thread to give up early.
+    :return: The manifest, keyed by image path relative to static/images.
+    """
+    global _manifest
+    previous = load_manifest()
+    manifest = {}
+
+    for directory, _, files in os.walk(SOURCE_DIR):
+        for file in sorted(files):
+            if Path(file).suffix.lower() not in SOURCE_SUFFIXES:
+                continue
+            if stop is not None and stop.is_set():
+                logger.info("Image derivative build stopped.")
+                return previous
+            source = join(directory, file)
+            relative = Path(os.path.relpath(source, SOURCE_DIR)).as_posix()
+            digest = _content_hash(source)
+            entry = previous.get(relative)
+            if entry and entry["hash"] == digest and set(entry["variants"]) == set(FORMATS):
+                manifest[relative] = entry
+            else:
+                logger.info("Deriving image variants for %s.", relative)
+                manifest[relative] = _derive(source, relative, digest)
+
+    os.makedirs(DERIVED_DIR, exist_ok=True)
+    _write_atomically(MANIFEST, lambda temporary: Path(temporary).write_text(json.dumps(manifest, indent=2)))
+    _manifest = manifest
+    return manifest
+
+
+def load_manifest() -> Dict[str, dict]:
+    """
+    Load the manifest written by the last build.
+
+    :return: The manifest, or an empty one if nothing has been built.
+    """
+    global _manifest
+    try:
+        with open(MANIFEST, "r") as f:
+            _manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        _manifest = {}
+    return _manifest
+
+
+def _manifest_entry(image_url: str) -> Optional[dict]:
+    # Stored image URLs look like "../../../static/images/items/monster_rat.png".
+    marker = "static/images/"
+    if not image_url or marker not in image_url:
+        return None
+    return _manifest.get(image_url.split(marker, 1)[1])
+
+
+def picture(image_url: Optional[str], alt: str, width: int = DEFAULT_WIDTH) -> Markup:
+    """
+    Render a responsive <picture> for an item, monster or player image.
+
+    :param image_url: The image_url stored on the row.
+    :param alt: Alternative text.
+    :param width: Display width in CSS pixels.
+    :return: The HTML, or a plain <img> of the original if no derivatives exist.
+    """
+    entry = _manifest_entry(image_url)
+    if entry is None or not any(entry["variants"].values()):
+        return Markup('<img src="{}" alt="{}">').format(image_url or "", alt)
+
+    height = round(entry["height"] * min(width, entry["width"]) / entry["width"])
+    sources = []
+    for fmt, files in entry["variants"].items():
+        if not files:
+            continue
+        srcset = ", ".join(f"{DERIVED_URL}/{name} {size}w" for size, name in files.items())
+        sources.append(f'<source type="image/{fmt}" srcset="{escape(srcset)}" sizes="{width}px">')
+
+    # Browsers without AVIF/WebP support fall back to the original image.
+    return Markup('<picture>{}<img src="{}" alt="{}" width="{}" height="{}" loading="lazy"></picture>').format(
+        Markup("".join(sources)), image_url, alt, min(width, entry["width"]), height)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    built = build_image_derivatives()
+    print(f"{len(built)} images, formats: {', '.join(FORMATS)}, widths: {', '.join(map(str, WIDTHS))}")
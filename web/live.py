@@ -0,0 +1,255 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Live entity updates pushed over WebSockets.
+
+A subscriber watches one row.  It first gets the row's state, then one diff per committed save
+holding only the columns whose values changed, plus the new version.  Each diff is encoded
+once and the same string is queued for every subscriber of the row, so a save costs one JSON
+encode and a deque append per subscriber.  Rows nobody watches cost a dictionary miss.
+
+Every connection has its own bounded queue drained by its own sender task, so a slow client
+never holds up the save or the other clients.  When a queue is full the oldest message is
+dropped, and the client is told how many it missed before its next message so it can reload.
+"""
+
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple, Type
+import asyncio
+import json
+import logging
+import os
+
+from sqlmodel import SQLModel
+
+logger = logging.getLogger("live")
+
+LIVE_QUEUE_SIZE = int(os.environ.get("SONZO_LIVE_QUEUE", "64"))
+# Columns never sent to the browser.
+HIDDEN_FIELDS = {"password", "name_key", "username_key"}
+
+Loader = Callable[[], Awaitable[Optional[SQLModel]]]
+Sender = Callable[[str], Awaitable[None]]
+
+
+def _encode(message: dict) -> str:
+    return json.dumps(message, default=str, separators=(",", ":"))
+
+
+def _state(row: SQLModel) -> dict:
+    return row.model_dump(exclude=HIDDEN_FIELDS)
+
+
+class Subscription:
+    """
+    One connection's queue of encoded messages and the task that sends them.
+    """
+
+    def __init__(self, topic: "Topic", send: Sender, max_queue: int):
+        self.topic = topic
+        self.send = send
+        self.queue: deque = deque(maxlen=max_queue)
+        self.sent = 0
+        self.dropped = 0
+        self._missed = 0
+        self._ready = asyncio.Event()
+
+    def push(self, message: str) -> None:
+        if len(self.queue) == self.queue.maxlen:
+            self._missed += 1
+            self.dropped += 1
+        self.queue.append(message)
+        self._ready.set()
+
+    async def run(self) -> None:
+        """
+        Send queued messages until cancelled or the connection fails.
+
+        :return:
+        """
+        try:
+            while True:
+                await self._ready.wait()
+                self._ready.clear()
+                while self.queue:
+                    if self._missed:
+                        missed, self._missed = self._missed, 0
+                        await self.send(_encode({"type": "dropped", "count": missed}))
+                    await self.send(self.queue.popleft())
+                    self.sent += 1
+        except (OSError, RuntimeError) as error:
+            # The client went away mid-send; the receiving side notices the disconnect too.
+            logger.debug("Live update connection closed: %s", error)
+
+
+class Topic:
+    """
+    The subscribers of one row and the state they were last sent.
+    """
+
+    def __init__(self, model: Type[SQLModel], entity_id: int, load: Loader):
+        self.model = model
+        self.entity_id = entity_id
+        self.load = load
+        self.subscribers: Set[Subscription] = set()
+        self.state: Optional[dict] = None
+        # A save arrived while the state was being loaded, so the load may be stale.
+        self.missed = False
+
+
+class LiveHub:
+    """
+    Topics by row, kept current by the save listener.
+    """
+
+    def __init__(self, max_queue: int = LIVE_QUEUE_SIZE):
+        self.max_queue = max_queue
+        self.messages = 0
+        # Counters of subscriptions that have ended.
+        self._sent = 0
+        self._dropped = 0
+        self._topics: Dict[Tuple[Type[SQLModel], int], Topic] = {}
+
+    async def subscribe(self, model: Type[SQLModel], entity_id: int, send: Sender,
+                        load: Loader) -> Optional[Subscription]:
+        """
+        Start watching a row.  The row's current state is the subscription's first message.
+
+        :param model: The table model of the row.
+        :param entity_id: The id of the row.
+        :param send: Sends one text message to the client.
+        :param load: Reads the row, or returns None if it does not exist.
+        :return: The subscription, whose run() must be driven by the caller, or None if there is no such row.
+        """
+        key = (model, entity_id)
+        topic = self._topics.get(key)
+        if topic is None:
+            topic = self._topics[key] = Topic(model, entity_id, load)
+        subscription = Subscription(topic, send, self.max_queue)
+        topic.subscribers.add(subscription)
+        if topic.state is None:
+            try:
+                row = await load()
+            except Exception:
+                self.unsubscribe(subscription)
+                raise
+            if row is None:
+                self.unsubscribe(subscription)
+                return None
+            if topic.state is None:
+                topic.state = _state(row)
+                if topic.missed:
+                    topic.missed = False
+                    await self._reload(topic)
+        subscription.push(_encode({"type": "state", "table": model.__tablename__, "id": entity_id,
+                                   "state": topic.state}))
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """
+        Stop watching, dropping the row's topic when nobody is left.
+
+        :param subscription: A subscription returned by subscribe().
+        :return:
+        """
+        topic = subscription.topic
+        if subscription not in topic.subscribers:
+            return
+        topic.subscribers.remove(subscription)
+        self._sent += subscription.sent
+        self._dropped += subscription.dropped
+        if not topic.subscribers and self._topics.get((topic.model, topic.entity_id)) is topic:
+            del self._topics[(topic.model, topic.entity_id)]
+
+    def on_save(self, model: Type[SQLModel], entity_id: int, values: Optional[dict]) -> None:
+        """
+        Save listener: send the changed columns to everyone watching the row.
+
+        :param model: The model class that was saved.
+        :param entity_id: The id of the saved row.
+        :param values: The column values written, or None if another worker saved the row.
+        :return:
+        """
+        topic = self._topics.get((model, entity_id))
+        if topic is None:
+            return
+        if topic.state is None:
+            topic.missed = True
+        elif values is None:
+            asyncio.get_running_loop().create_task(self._reload(topic))
+        else:
+            self.publish(topic, values)
+
+    def reset(self) -> None:
+        """
+        Reset listener: re-read every watched row, since saves may have been missed.
+
+        :return:
+        """
+        loop = asyncio.get_running_loop()
+        for topic in list(self._topics.values()):
+            if topic.state is not None:
+                loop.create_task(self._reload(topic))
+
+    def publish(self, topic: Topic, values: dict) -> None:
+        """
+        Queue a diff of the columns that changed for every subscriber of a topic.
+
+        :param topic: The watched row.
+        :param values: New column values.
+        :return:
+        """
+        changes = {field: value for field, value in values.items()
+                   if field not in HIDDEN_FIELDS and topic.state.get(field, value) != value}
+        if not changes:
+            return
+        topic.state.update(changes)
+        message = _encode({"type": "diff", "table": topic.model.__tablename__, "id": topic.entity_id,
+                           "changes": changes})
+        for subscription in topic.subscribers:
+            subscription.push(message)
+        self.messages += 1
+
+    def stats(self) -> dict:
+        """
+        Report the number of watched rows and subscribers and the messages sent and dropped.
+
+        :return: A dictionary of counters.
+        """
+        subscriptions = [subscription for topic in self._topics.values() for subscription in topic.subscribers]
+        return {"topics": len(self._topics), "subscribers": len(subscriptions), "messages": self.messages,
+                "sent": self._sent + sum(subscription.sent for subscription in subscriptions),
+                "dropped": self._dropped + sum(subscription.dropped for subscription in subscriptions)}
+
+    async def _reload(self, topic: Topic) -> None:
+        try:
+            row = await topic.load()
+        except Exception:
+            logger.exception("Reloading %s %d failed.", topic.model.__tablename__, topic.entity_id)
+            return
+        if row is None:
+            message = _encode({"type": "deleted", "table": topic.model.__tablename__, "id": topic.entity_id})
+            for subscription in topic.subscribers:
+                subscription.push(message)
+            return
+        if topic.state is not None:
+            self.publish(topic, _state(row))
+
+
+live_hub = LiveHub()
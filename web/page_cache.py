@@ -0,0 +1,248 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import hashlib
+import os
+from collections import OrderedDict
+from threading import Lock
+from typing import Awaitable, Callable, Dict, Hashable, Iterable, NamedTuple, Optional, Set, Tuple, Type
+
+from fastapi import Request
+from fastapi.responses import HTMLResponse, Response
+from fastapi.templating import Jinja2Templates
+from sqlmodel import SQLModel
+
+# Browsers may keep the page but must revalidate it, which costs a 304 while the row is unchanged.
+PAGE_CACHE_CONTROL = "no-cache"
+
+
+class Page(NamedTuple):
+    etag: str
+    body: bytes
+
+
+# (template, model, entity id, row version)
+PageKey = Tuple[str, Type[SQLModel], int, int]
+# (model, entity id)
+RowKey = Tuple[Type[SQLModel], int]
+
+
+class PageCache:
+    """
+    A bounded LRU cache of rendered explorer pages keyed by (template, model, entity id, version).
+
+    Routes look pages up by whatever identifies them in the URL (a name or username), so an
+    alias maps that lookup to the page key it last resolved to.  A cached alias answers both a
+    conditional GET (304) and a plain GET without touching the database or Jinja.  A save drops
+    every alias and page for the row, and the next request renders the new version.  A page
+    that also shows other rows, such as a player's weapon, is dropped when those are saved too.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._pages: "OrderedDict[PageKey, Page]" = OrderedDict()
+        self._aliases: Dict[Hashable, PageKey] = {}
+        self._aliases_by_row: Dict[RowKey, Set[Hashable]] = {}
+        self._dependencies: Dict[PageKey, Tuple[RowKey, ...]] = {}
+        self._generation = 0
+        self._lock = Lock()
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, alias: Hashable) -> Optional[Page]:
+        """
+        Return the cached page for a lookup, or None on a miss.
+
+        :param alias: The route's lookup key.
+        :return: The cached page if present.
+        """
+        with self._lock:
+            key = self._aliases.get(alias)
+            page = self._pages.get(key) if key is not None else None
+            if page is None:
+                self.misses += 1
+                return None
+            self._pages.move_to_end(key)
+            self.hits += 1
+            return page
+
+    def put(self, alias: Hashable, key: PageKey, body: bytes, generation: int,
+            depends_on: Iterable[RowKey] = ()) -> Page:
+        """
+        Store a rendered page, unless its row was invalidated while it was being rendered.
+
+        :param alias: The route's lookup key.
+        :param key: The (template, model, entity id, version) the page was rendered from.
+        :param body: The rendered HTML.
+        :param generation: The cache generation read before the row was loaded.
+        :param depends_on: Other (model, id) rows shown on the page.
+        :return: The page with its ETag.
+        """
+        page = Page(f'"{hashlib.sha256(body).hexdigest()[:32]}"', body)
+        with self._lock:
+            if generation != self._generation:
+                return page
+            previous = self._aliases.get(alias)
+            if previous is not None and previous != key:
+                self._drop_page(previous)
+            self._pages[key] = page
+            self._pages.move_to_end(key)
+            self._aliases[alias] = key
+            dependencies = tuple((model, int(entity_id)) for model, entity_id in depends_on)
+            if dependencies:
+                self._dependencies[key] = dependencies
+            for row in (key[1:3], *dependencies):
+                self._aliases_by_row.setdefault(row, set()).add(alias)
+            while len(self._pages) > self.max_entries:
+                evicted = next(iter(self._pages))
+                self.evictions += 1
+                self._drop_page(evicted)
+        return page
+
+    def invalidate(self, model: Type[SQLModel], entity_id: int) -> None:
+        """
+        Drop every page of a row after its save has committed.
+
+        :param model: The model class of the saved row.
+        :param entity_id: The id of the saved row.
+        :return:
+        """
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            row = (model, int(entity_id))
+            for key in {self._aliases[alias] for alias in self._aliases_by_row.pop(row, ()) if alias in self._aliases}:
+                self._drop_page(key)
+
+    def clear(self) -> None:
+        """
+        Drop every cached page, e.g. after the image manifest or assets change.
+
+        :return:
+        """
+        with self._lock:
+            self._generation += 1
+            self._pages.clear()
+            self._aliases.clear()
+            self._aliases_by_row.clear()
+            self._dependencies.clear()
+
+    def stats(self) -> dict:
+        """
+        Return the cache counters.
+
+        :return: A dictionary of counters and the current size.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._pages),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "not_modified": self.not_modified,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+    def _drop_page(self, key: PageKey) -> None:
+        # Every alias of a page is filed under its own row, and also under each row it depends on.
+        self._pages.pop(key, None)
+        rows = (key[1:3], *self._dependencies.pop(key, ()))
+        aliases = [alias for alias in self._aliases_by_row.get(rows[0], ()) if self._aliases.get(alias) == key]
+        for alias in aliases:
+            del self._aliases[alias]
+        for row in rows:
+            filed = self._aliases_by_row.get(row)
+            if filed is not None:
+                filed.difference_update(aliases)
+                if not filed:
+                    del self._aliases_by_row[row]
+
+
+def _matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in (tag.strip() for tag in header.split(","))
+
+
+def page_response(request: Request, page: Page) -> Response:
+    """
+    Answer a request from a rendered page, with 304 Not Modified if the client's copy is current.
+
+    :param request: The incoming request.
+    :param page: The rendered page.
+    :return: The response.
+    """
+    headers = {"ETag": page.etag, "Cache-Control": PAGE_CACHE_CONTROL}
+    if _matches(request, page.etag):
+        page_cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(content=page.body, headers=headers)
+
+
+async def cached_page(request: Request, templates: Jinja2Templates, template_name: str, context_name: str,
+                      alias: Hashable, load: Callable[[], Awaitable[Optional[SQLModel]]],
+                      depends_on: Optional[Callable[[SQLModel], Iterable[RowKey]]] = None) -> Optional[Response]:
+    """
+    Serve an explorer lookup page from the page cache, loading and rendering its row on a miss.
+
+    :param request: The incoming request.
+    :param templates: The templates to render with.
+    :param template_name: The page template.
+    :param context_name: The template variable holding the row.
+    :param alias: What identifies the page in the URL, e.g. ("monster", "name", "Rat").
+    :param load: Loads the row; called only on a miss.
+    :param depends_on: Returns the other (model, id) rows a page shows, whose saves must drop it too.
+    :return: The response, or None if load() found no row.
+    """
+    alias = (template_name, alias)
+    page = page_cache.get(alias)
+    if page is None:
+        generation = page_cache.generation
+        row = await load()
+        if row is None:
+            return None
+        body = templates.get_template(template_name).render({"request": request, context_name: row}).encode()
+        page = page_cache.put(alias, (template_name, type(row), row.id, row.version), body, generation,
+                              depends_on(row) if depends_on else ())
+    return page_response(request, page)
+
+
+def invalidate_page(model: Type[SQLModel], entity_id: int, values: Optional[dict]) -> None:
+    """
+    Save listener that drops the cached pages of a saved row.
+
+    :param model: The model class of the saved row.
+    :param entity_id: The id of the saved row.
+    :param values: The column values that were written.
+    :return:
+    """
+    page_cache.invalidate(model, entity_id)
+
+
+PAGE_CACHE_SIZE = int(os.environ.get("SONZO_PAGE_CACHE_SIZE", "1024"))
+page_cache = PageCache(PAGE_CACHE_SIZE)
@@ -0,0 +1,61 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from os.path import isfile
+
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.types import Scope
+
+from web.assets import ENCODINGS, accepted_encodings
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """
+    Static files whose names carry a content hash, so browsers may cache them forever.
+    """
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        response = await super().get_response(path, scope)
+        if response.status_code in (200, 304):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+
+class PrecompressedStaticFiles(ImmutableStaticFiles):
+    """
+    Immutable static files that prefer a precompressed .br or .gz sibling when the client accepts it.
+    """
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        response = await super().get_response(path, scope)
+        if not isinstance(response, FileResponse) or response.status_code != 200:
+            return response
+
+        accepted = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        for encoding, (suffix, _) in ENCODINGS.items():
+            compressed = response.path + suffix
+            if encoding in accepted and isfile(compressed):
+                response = FileResponse(compressed, media_type=response.media_type,
+                                        headers={"Content-Encoding": encoding, "Cache-Control": IMMUTABLE_CACHE_CONTROL})
+                break
+        response.headers["Vary"] = "Accept-Encoding"
+        return response
@@ -0,0 +1,34 @@
+"""
+The Legend of the Sonzo Dragon
+
+Copyright [2025] David C. Brown
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    https://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from fastapi.templating import Jinja2Templates
+
+from web.assets import asset_url
+from web.images import picture
+
+
+def configure_templates(templates: Jinja2Templates) -> Jinja2Templates:
+    """
+    Install the shared template helpers on a Jinja2Templates instance.
+
+    :param templates: The templates to configure.
+    :return: The same templates.
+    """
+    templates.env.globals["asset_url"] = asset_url
+    templates.env.globals["picture"] = picture
+    return templates